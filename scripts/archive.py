@@ -0,0 +1,744 @@
+#!/usr/bin/env python3
+
+"""
+转录归档（zstd 压缩）
+每个节目一个 SQLite 容器，保存 Show Notes、转录文本和逐字时间戳的压缩数据
+- 按节目训练 zstd 字典（同一节目的开场白、固定栏目、人名重复出现），小块数据也能压得动
+- 文字稿和时间戳按时间切块分别压缩，读取某一时间段只解压对应的块
+- README.md 中的转录文本以同一期的文字稿块为字典压缩，只存储分段和说话人标记等差异
+- 随时按 merge-and-clean.sh 的格式重新生成 README.md
+"""
+
+import argparse
+import re
+import sqlite3
+import struct
+import sys
+import time
+from pathlib import Path
+
+from downloader import format_size
+from podcast_asr.text import format_timestamp
+from search_index import ASR_TOKEN, SENTENCE_END, TRANSCRIPT_MARKER, collect_episode
+
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+DEFAULT_ROOT = Path.home() / "Research" / "Podcast" / ".archive"
+DEFAULT_LEVEL = 19
+DEFAULT_DICT_SIZE = 110 * 1024
+
+# 每块约 5 分钟音频；没有时间戳时按字数切块
+CHUNK_MS = 5 * 60 * 1000
+CHUNK_CHARS = 4000
+
+# 节目累计到这么多期还没有字典时自动训练
+AUTO_TRAIN_EPISODES = 10
+
+# merge-and-clean.sh 在 Show Notes 和转录文本之间插入的内容
+MERGE_SEPARATOR = f"\n---\n\n{TRANSCRIPT_MARKER}\n\n<!-- 使用 FunASR paraformer-zh 自动生成 -->\n\n"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dictionaries (
+    dict_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data BLOB NOT NULL,
+    samples INTEGER,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    episode_id TEXT PRIMARY KEY,
+    title TEXT,
+    published_date TEXT,
+    episode_dir TEXT,
+    dict_id INTEGER,
+    show_notes BLOB,
+    transcript BLOB,
+    chunk_count INTEGER,
+    duration_ms INTEGER,
+    raw_bytes INTEGER,
+    stored_bytes INTEGER,
+    archived_at TEXT
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    episode_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    start_ms INTEGER,
+    end_ms INTEGER,
+    text BLOB NOT NULL,
+    timestamps BLOB,
+    PRIMARY KEY (episode_id, seq)
+);
+"""
+
+def show_filename(podcast_name):
+    """节目名 -> 容器文件名"""
+    name = re.sub(r'[\\/:*?"<>|\s]+', "_", podcast_name or "").strip("_.")
+    return f"{name or 'unknown'}.db"
+
+def parse_time(value):
+    """
+    解析时间点：秒数、MM:SS 或 HH:MM:SS（秒可带小数）
+
+    Returns:
+        毫秒
+    """
+    seconds = 0.0
+    try:
+        for part in value.split(":"):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        raise ValueError(f"无效的时间: {value}（应为秒数、MM:SS 或 HH:MM:SS）")
+    return int(seconds * 1000)
+
+def split_pieces(text):
+    """按句末标点切分，保留原文中的所有字符（拼接后与原文完全相同）"""
+    parts = SENTENCE_END.split(text)
+    pieces = [''.join(pair) for pair in zip(parts[0::2], parts[1::2] + [''])]
+    return [piece for piece in pieces if piece]
+
+def assign_spans(pieces, spans):
+    """
+    按 token 计数把逐字时间戳分配给每个片段（与 search_index.align_sentences 相同的规则）
+
+    Returns:
+        [(piece, [(start_ms, end_ms), ...]), ...]
+    """
+    assigned = []
+    cursor = 0
+    for piece in pieces:
+        count = len(ASR_TOKEN.findall(piece))
+        assigned.append((piece, spans[cursor:cursor + count]))
+        cursor += count
+    return assigned
+
+def chunk_transcript(text, spans, chunk_ms=CHUNK_MS, chunk_chars=CHUNK_CHARS):
+    """
+    将文字稿切成按时间连续的块，块边界落在句末
+
+    Returns:
+        [(块文本, 块内时间戳列表), ...]，各块文本拼接后等于原文
+    """
+    chunks = []
+    chunk_text = ""
+    chunk_spans = []
+    for piece, piece_spans in assign_spans(split_pieces(text), spans):
+        chunk_text += piece
+        chunk_spans += piece_spans
+        long_enough = chunk_spans and chunk_spans[-1][1] - chunk_spans[0][0] >= chunk_ms
+        if long_enough or len(chunk_text) >= chunk_chars:
+            chunks.append((chunk_text, chunk_spans))
+            chunk_text, chunk_spans = "", []
+    if chunk_text:
+        chunks.append((chunk_text, chunk_spans))
+    return chunks
+
+def encode_spans(spans):
+    """时间戳编码为相邻差值（与上一个词结束的间隔、本词时长），数值小、压缩率高"""
+    values = []
+    previous = spans[0][0] if spans else 0
+    for start, end in spans:
+        values += [start - previous, end - start]
+        previous = end
+    return struct.pack(f"<{len(values)}i", *values)
+
+def decode_spans(data, start_ms):
+    """encode_spans() 的逆运算"""
+    values = struct.unpack(f"<{len(data) // 4}i", data)
+    spans = []
+    previous = start_ms
+    for gap, duration in zip(values[0::2], values[1::2]):
+        start = previous + gap
+        spans.append((start, start + duration))
+        previous = start + duration
+    return spans
+
+def read_documents(episode_dir):
+    """
+    读取 README.md 的两部分原文：Show Notes 和转录文本
+
+    .cache 还在时按 merge-and-clean.sh 的规则选文件（转录优先使用 _formatted.md），
+    否则从已合并的 README.md 中拆分。
+
+    Returns:
+        (show_notes, transcript)，没有转录时 transcript 为 None
+    """
+    episode_dir = Path(episode_dir)
+    cache_dir = episode_dir / ".cache"
+    if cache_dir.is_dir():
+        show_notes = [p for p in sorted(cache_dir.glob("*.md")) if not p.name.endswith("_formatted.md")]
+        transcripts = (sorted(cache_dir.glob("*_formatted.md"))
+                       or [p for p in sorted(cache_dir.glob("*.txt")) if not p.name.endswith("_timestamp.txt")])
+        if show_notes:
+            transcript = transcripts[0].read_text(encoding="utf-8") if transcripts else None
+            return show_notes[0].read_text(encoding="utf-8"), transcript
+
+    readme = episode_dir / "README.md"
+    if not readme.exists():
+        raise ValueError(f"未找到 Show Notes 或 README.md: {episode_dir}")
+    content = readme.read_text(encoding="utf-8")
+    if MERGE_SEPARATOR in content:
+        show_notes, transcript = content.split(MERGE_SEPARATOR, 1)
+        return show_notes, transcript
+    return content, None
+
+def render_readme(show_notes, transcript):
+    """按 merge-and-clean.sh 的格式拼出 README.md"""
+    if transcript is None:
+        return show_notes
+    return show_notes + MERGE_SEPARATOR + transcript
+
+class ShowArchive:
+    """
+    一个节目的归档容器
+
+    用于检索和按时间读取的原始文字稿与逐字时间戳按 CHUNK_MS 切块，每块的文本和时间戳分别压缩；
+    Show Notes 整体压缩。这些数据用该期归档时节目最新的字典压缩，dict_id 为空表示未使用字典。
+
+    完整转录（README.md 中的版本）是原始文字稿加上分段和说话人标记，两者内容几乎相同：
+    有文字稿块时以各块原文拼接成的 raw content 字典压缩，只存储差异；没有文字稿块时用节目字典。
+    """
+
+    def __init__(self, path, level=DEFAULT_LEVEL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.level = level
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+        self._dictionaries = {}
+        self._compressors = {}
+        self._decompressors = {}
+
+    def close(self):
+        self.conn.close()
+
+    def current_dict_id(self):
+        row = self.conn.execute("SELECT MAX(dict_id) FROM dictionaries").fetchone()
+        return row[0]
+
+    def _dictionary(self, dict_id):
+        if dict_id not in self._dictionaries:
+            row = self.conn.execute("SELECT data FROM dictionaries WHERE dict_id = ?", (dict_id,)).fetchone()
+            if row is None:
+                raise ValueError(f"归档损坏：缺少字典 {dict_id}（{self.path}）")
+            self._dictionaries[dict_id] = zstd.ZstdCompressionDict(row[0])
+        return self._dictionaries[dict_id]
+
+    def compress(self, data, dict_id):
+        if dict_id not in self._compressors:
+            dictionary = self._dictionary(dict_id) if dict_id is not None else None
+            self._compressors[dict_id] = zstd.ZstdCompressor(level=self.level, dict_data=dictionary)
+        return self._compressors[dict_id].compress(data)
+
+    def decompress(self, data, dict_id):
+        if dict_id not in self._decompressors:
+            dictionary = self._dictionary(dict_id) if dict_id is not None else None
+            self._decompressors[dict_id] = zstd.ZstdDecompressor(dict_data=dictionary)
+        return self._decompressors[dict_id].decompress(data)
+
+    def compress_transcript(self, transcript, chunk_text, dict_id):
+        """压缩 README.md 中的转录文本：有文字稿块时以块原文为字典，否则用节目字典"""
+        if not chunk_text:
+            return self.compress(transcript, dict_id)
+        dictionary = zstd.ZstdCompressionDict(chunk_text, dict_type=zstd.DICT_TYPE_RAWCONTENT)
+        return zstd.ZstdCompressor(level=self.level, dict_data=dictionary).compress(transcript)
+
+    def decompress_transcript(self, data, chunk_text, dict_id):
+        """compress_transcript() 的逆运算"""
+        if not chunk_text:
+            return self.decompress(data, dict_id)
+        dictionary = zstd.ZstdCompressionDict(chunk_text, dict_type=zstd.DICT_TYPE_RAWCONTENT)
+        return zstd.ZstdDecompressor(dict_data=dictionary).decompress(data)
+
+    def _chunk_text(self, episode_id, dict_id):
+        """一期所有文字稿块原文拼接（UTF-8），作为转录文本的压缩字典"""
+        return b"".join(self.decompress(text, dict_id) for (text,) in self.conn.execute(
+            "SELECT text FROM chunks WHERE episode_id = ? ORDER BY seq", (episode_id,)
+        ).fetchall())
+
+    def _rows(self, episode_id, show_notes, transcript, chunks, dict_id):
+        """压缩一期的所有数据，返回 (episode 列, chunk 行列表, 原始字节数, 压缩后字节数)"""
+        raw_bytes = 0
+        stored_bytes = 0
+
+        def pack(data, compress=None):
+            nonlocal raw_bytes, stored_bytes
+            if data is None:
+                return None
+            blob = compress(data) if compress else self.compress(data, dict_id)
+            raw_bytes += len(data)
+            stored_bytes += len(blob)
+            return blob
+
+        chunk_rows = []
+        for seq, (text, spans) in enumerate(chunks):
+            chunk_rows.append((
+                episode_id,
+                seq,
+                spans[0][0] if spans else None,
+                spans[-1][1] if spans else None,
+                pack(text.encode("utf-8")),
+                pack(encode_spans(spans)) if spans else None,
+            ))
+        chunk_text = "".join(text for text, _ in chunks).encode("utf-8")
+        columns = (
+            pack(show_notes.encode("utf-8")),
+            pack(transcript.encode("utf-8"), lambda data: self.compress_transcript(data, chunk_text, dict_id))
+            if transcript is not None else None,
+        )
+        return columns, chunk_rows, raw_bytes, stored_bytes
+
+    def _chunks(self, episode_id, dict_id):
+        """解压一期的所有块：[(块文本, 块内时间戳列表), ...]"""
+        chunks = []
+        for start_ms, text, spans in self.conn.execute(
+            "SELECT start_ms, text, timestamps FROM chunks WHERE episode_id = ? ORDER BY seq", (episode_id,)
+        ).fetchall():
+            spans = decode_spans(self.decompress(spans, dict_id), start_ms) if spans is not None else []
+            chunks.append((self.decompress(text, dict_id).decode("utf-8"), spans))
+        return chunks
+
+    def add(self, metadata, episode_dir, show_notes, transcript, text, spans):
+        """
+        归档一期（同一 Episode 重复归档时覆盖）
+
+        已合并清理的目录没有时间戳；已归档的版本带时间戳时保留原来的文字稿块，只更新文档。
+
+        Returns:
+            (原始字节数, 压缩后字节数)
+        """
+        episode_id = metadata["episode_id"]
+        dict_id = self.current_dict_id()
+        chunks = chunk_transcript(text, spans)
+        if not spans:
+            row = self.conn.execute(
+                "SELECT e.dict_id FROM episodes e JOIN chunks c USING (episode_id) "
+                "WHERE episode_id = ? AND c.timestamps IS NOT NULL LIMIT 1",
+                (episode_id,),
+            ).fetchone()
+            if row is not None:
+                chunks = self._chunks(episode_id, row[0])
+                spans = [span for _, chunk_spans in chunks for span in chunk_spans]
+        (notes_blob, transcript_blob), chunk_rows, raw_bytes, stored_bytes = self._rows(
+            episode_id, show_notes, transcript, chunks, dict_id
+        )
+
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE episode_id = ?", (episode_id,))
+            self.conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)", chunk_rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    episode_id,
+                    metadata.get("title", ""),
+                    metadata.get("published_date", ""),
+                    str(Path(episode_dir).resolve()),
+                    dict_id,
+                    notes_blob,
+                    transcript_blob,
+                    len(chunk_rows),
+                    spans[-1][1] if spans else None,
+                    raw_bytes,
+                    stored_bytes,
+                    time.strftime("%Y-%m-%d %H:%M:%S"),
+                ),
+            )
+        return raw_bytes, stored_bytes
+
+    def episode(self, episode_id):
+        """
+        Returns:
+            {"episode_id", "title", "episode_dir", "show_notes", "transcript", ...}，不存在时为 None
+        """
+        row = self.conn.execute(
+            "SELECT episode_id, title, published_date, episode_dir, dict_id, show_notes, transcript, "
+            "duration_ms FROM episodes WHERE episode_id = ?",
+            (episode_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        dict_id = row[4]
+        transcript = None
+        if row[6] is not None:
+            transcript = self.decompress_transcript(
+                row[6], self._chunk_text(episode_id, dict_id), dict_id
+            ).decode("utf-8")
+        return {
+            "episode_id": row[0],
+            "title": row[1],
+            "published_date": row[2],
+            "episode_dir": row[3],
+            "show_notes": self.decompress(row[5], dict_id).decode("utf-8"),
+            "transcript": transcript,
+            "duration_ms": row[7],
+        }
+
+    def read(self, episode_id, start_ms=None, end_ms=None):
+        """
+        读取原始文字稿，指定时间段时只解压与之重叠的块
+
+        Returns:
+            [(片段, start_ms, end_ms), ...]，按句切分；没有时间戳的片段起止为 None
+        """
+        row = self.conn.execute("SELECT dict_id FROM episodes WHERE episode_id = ?", (episode_id,)).fetchone()
+        if row is None:
+            raise ValueError(f"归档中没有 Episode: {episode_id}")
+        dict_id = row[0]
+
+        ranged = start_ms is not None or end_ms is not None
+        query = "SELECT start_ms, text, timestamps FROM chunks WHERE episode_id = ?"
+        params = [episode_id]
+        if ranged:
+            query += " AND start_ms IS NOT NULL AND end_ms >= ? AND start_ms <= ?"
+            params += [start_ms if start_ms is not None else 0, end_ms if end_ms is not None else 2 ** 62]
+        query += " ORDER BY seq"
+
+        pieces = []
+        for chunk_start, text_blob, spans_blob in self.conn.execute(query, params).fetchall():
+            text = self.decompress(text_blob, dict_id).decode("utf-8")
+            spans = decode_spans(self.decompress(spans_blob, dict_id), chunk_start) if spans_blob else []
+            for piece, piece_spans in assign_spans(split_pieces(text), spans):
+                if piece_spans:
+                    pieces.append((piece, piece_spans[0][0], piece_spans[-1][1]))
+                else:
+                    pieces.append((piece, None, None))
+
+        if not ranged:
+            return pieces
+        # 块内按句筛选；没有时间戳的片段（纯标点、空白）跟随前一句
+        selected = []
+        keep = False
+        for piece, start, end in pieces:
+            if start is not None:
+                keep = ((start_ms is None or end >= start_ms) and (end_ms is None or start <= end_ms))
+            if keep:
+                selected.append((piece, start, end))
+        return selected
+
+    def samples(self):
+        """训练字典用的样本：本节目所有用节目字典压缩的数据的原文"""
+        samples = []
+        for dict_id, show_notes, transcript, chunk_count in self.conn.execute(
+            "SELECT dict_id, show_notes, transcript, chunk_count FROM episodes"
+        ).fetchall():
+            samples.append(self.decompress(show_notes, dict_id))
+            # 有文字稿块的转录文本以块原文为字典，不用节目字典
+            if transcript is not None and not chunk_count:
+                samples.append(self.decompress(transcript, dict_id))
+        for dict_id, text, spans in self.conn.execute(
+            "SELECT e.dict_id, c.text, c.timestamps FROM chunks c JOIN episodes e USING (episode_id)"
+        ).fetchall():
+            samples.append(self.decompress(text, dict_id))
+            if spans is not None:
+                samples.append(self.decompress(spans, dict_id))
+        return samples
+
+    def train(self, dict_size=DEFAULT_DICT_SIZE):
+        """
+        用本节目已归档的数据训练字典，并用新字典重新压缩所有期
+
+        Returns:
+            (训练前字节数, 训练后字节数)
+
+        Raises:
+            ValueError: 样本不足
+        """
+        samples = self.samples()
+        total = sum(len(sample) for sample in samples)
+        # zstd 建议样本总量约为字典大小的 100 倍，样本少时缩小字典
+        dict_size = min(dict_size, total // 10)
+        if dict_size < 4096:
+            raise ValueError(f"样本不足（{format_size(total)}），至少需要约 40 KB 已归档文本")
+        try:
+            dictionary = zstd.train_dictionary(dict_size, samples, level=self.level)
+        except zstd.ZstdError as e:
+            raise ValueError(f"字典训练失败: {e}")
+
+        before = self.conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM episodes").fetchone()[0]
+        episodes = self.conn.execute("SELECT episode_id FROM episodes").fetchall()
+
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO dictionaries (data, samples, created_at) VALUES (?, ?, ?)",
+                (dictionary.as_bytes(), len(samples), time.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            dict_id = cursor.lastrowid
+            for (episode_id,) in episodes:
+                self._recompress(episode_id, dict_id)
+            self.conn.execute("DELETE FROM dictionaries WHERE dict_id != ?", (dict_id,))
+
+        self._dictionaries = {}
+        self._compressors = {}
+        self._decompressors = {}
+        after = self.conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM episodes").fetchone()[0]
+        self.conn.execute("VACUUM")
+        return before, after
+
+    def _recompress(self, episode_id, dict_id):
+        """用新字典重新压缩一期（在调用方的事务中执行）"""
+        old_dict_id, show_notes, transcript = self.conn.execute(
+            "SELECT dict_id, show_notes, transcript FROM episodes WHERE episode_id = ?", (episode_id,)
+        ).fetchone()
+        chunks = self._chunks(episode_id, old_dict_id)
+        if transcript is not None:
+            chunk_text = "".join(text for text, _ in chunks).encode("utf-8")
+            transcript = self.decompress_transcript(transcript, chunk_text, old_dict_id).decode("utf-8")
+
+        (notes_blob, transcript_blob), chunk_rows, _, stored_bytes = self._rows(
+            episode_id,
+            self.decompress(show_notes, old_dict_id).decode("utf-8"),
+            transcript,
+            chunks,
+            dict_id,
+        )
+        self.conn.execute("DELETE FROM chunks WHERE episode_id = ?", (episode_id,))
+        self.conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)", chunk_rows)
+        self.conn.execute(
+            "UPDATE episodes SET dict_id = ?, show_notes = ?, transcript = ?, stored_bytes = ? WHERE episode_id = ?",
+            (dict_id, notes_blob, transcript_blob, stored_bytes, episode_id),
+        )
+
+    def stats(self):
+        """
+        Returns:
+            (期数, 原始字节数, 压缩后字节数, 字典大小)
+        """
+        count, raw_bytes, stored_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(stored_bytes), 0) FROM episodes"
+        ).fetchone()
+        dict_size = self.conn.execute(
+            "SELECT COALESCE(LENGTH(data), 0) FROM dictionaries ORDER BY dict_id DESC LIMIT 1"
+        ).fetchone()
+        return count, raw_bytes, stored_bytes, dict_size[0] if dict_size else 0
+
+    def sizes(self):
+        """
+        各部分压缩后的字节数，用来检查转录文本与文字稿块是否重复占用空间
+
+        Returns:
+            {"show_notes", "transcript", "chunk_text", "timestamps"}
+        """
+        show_notes, transcript = self.conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(show_notes)), 0), COALESCE(SUM(LENGTH(transcript)), 0) FROM episodes"
+        ).fetchone()
+        chunk_text, timestamps = self.conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(text)), 0), COALESCE(SUM(LENGTH(timestamps)), 0) FROM chunks"
+        ).fetchone()
+        return {"show_notes": show_notes, "transcript": transcript, "chunk_text": chunk_text, "timestamps": timestamps}
+
+def find_episode(root, episode_id, level=DEFAULT_LEVEL):
+    """在所有节目容器中查找 Episode，返回打开的 ShowArchive（调用方负责关闭）"""
+    for path in sorted(Path(root).glob("*.db")):
+        archive = ShowArchive(path, level)
+        if archive.conn.execute("SELECT 1 FROM episodes WHERE episode_id = ?", (episode_id,)).fetchone():
+            return archive
+        archive.close()
+    raise ValueError(f"归档中没有 Episode: {episode_id}")
+
+def archive_episode(root, episode_dir, level=DEFAULT_LEVEL, auto_train=True):
+    """
+    归档一个播客目录
+
+    Returns:
+        (episode_id, 容器路径, 原始字节数, 压缩后字节数)
+    """
+    metadata, text, spans = collect_episode(episode_dir)
+    if not metadata.get("episode_id"):
+        raise ValueError(f"无法确定 Episode ID: {episode_dir}")
+    show_notes, transcript = read_documents(episode_dir)
+
+    archive = ShowArchive(Path(root) / show_filename(metadata.get("podcast_name")), level)
+    try:
+        raw_bytes, stored_bytes = archive.add(metadata, episode_dir, show_notes, transcript, text, spans)
+        if auto_train and archive.current_dict_id() is None and archive.stats()[0] >= AUTO_TRAIN_EPISODES:
+            try:
+                before, after = archive.train()
+                print(f"[INFO] 已为节目训练字典: {format_size(before)} -> {format_size(after)}")
+            except ValueError as e:
+                print(f"[WARN] {e}")
+        return metadata["episode_id"], archive.path, raw_bytes, stored_bytes
+    finally:
+        archive.close()
+
+def cmd_add(args):
+    failed = 0
+    for episode_dir in args.episode_dirs:
+        try:
+            episode_id, path, raw_bytes, stored_bytes = archive_episode(
+                args.root, episode_dir, level=args.level, auto_train=not args.no_train
+            )
+            print(f"[INFO] 已归档 {episode_id} -> {path.name}: "
+                  f"{format_size(raw_bytes)} -> {format_size(stored_bytes)}")
+        except (ValueError, OSError) as e:
+            print(f"[ERROR] 归档失败: {e}")
+            failed += 1
+            continue
+
+        if args.remove_readme:
+            readme = Path(episode_dir) / "README.md"
+            archive = find_episode(args.root, episode_id)
+            try:
+                episode = archive.episode(episode_id)
+            finally:
+                archive.close()
+            if readme.exists() and readme.read_text(encoding="utf-8") == render_readme(
+                episode["show_notes"], episode["transcript"]
+            ):
+                readme.unlink()
+                print(f"[INFO] 已删除 {readme}（可用 render {episode_id} 重新生成）")
+            elif readme.exists():
+                print(f"[WARN] README.md 与归档内容不一致，未删除: {readme}")
+    return 1 if failed else 0
+
+def cmd_train(args):
+    root = Path(args.root)
+    paths = [root / show_filename(name) for name in args.shows] if args.shows else sorted(root.glob("*.db"))
+    failed = 0
+    for path in paths:
+        if not path.exists():
+            print(f"[ERROR] 没有该节目的归档: {path}")
+            failed += 1
+            continue
+        archive = ShowArchive(path, args.level)
+        try:
+            before, after = archive.train(args.dict_size)
+            print(f"[INFO] {path.stem}: {format_size(before)} -> {format_size(after)}")
+        except ValueError as e:
+            print(f"[WARN] {path.stem}: {e}")
+        finally:
+            archive.close()
+    return 1 if failed else 0
+
+def cmd_cat(args):
+    start_ms = parse_time(args.start) if args.start else None
+    end_ms = parse_time(args.end) if args.end else None
+    archive = find_episode(args.root, args.episode_id)
+    try:
+        if args.notes or args.formatted:
+            episode = archive.episode(args.episode_id)
+            if args.notes:
+                sys.stdout.write(episode["show_notes"])
+            if args.formatted:
+                sys.stdout.write(episode["transcript"] or "")
+            return 0
+        pieces = archive.read(args.episode_id, start_ms, end_ms)
+    finally:
+        archive.close()
+
+    if (start_ms is not None or end_ms is not None) and not pieces:
+        print("[WARN] 该时间段没有内容（或该期归档时没有时间戳）", file=sys.stderr)
+        return 1
+
+    if args.timestamps:
+        for piece, start, _ in pieces:
+            if piece.strip():
+                position = format_timestamp(start) if start is not None else "--:--:--.---"
+                print(f"[{position}] {piece.strip()}")
+    else:
+        text = "".join(piece for piece, _, _ in pieces)
+        print(text.strip() if start_ms is not None or end_ms is not None else text)
+    return 0
+
+def cmd_render(args):
+    archive = find_episode(args.root, args.episode_id)
+    try:
+        episode = archive.episode(args.episode_id)
+    finally:
+        archive.close()
+
+    content = render_readme(episode["show_notes"], episode["transcript"])
+    if args.output == "-":
+        sys.stdout.write(content)
+        return 0
+
+    output = Path(args.output) if args.output else Path(episode["episode_dir"]) / "README.md"
+    if not output.parent.is_dir():
+        raise ValueError(f"目录不存在: {output.parent}（可用 --output 指定输出路径）")
+    output.write_text(content, encoding="utf-8")
+    print(f"[INFO] 已生成: {output}")
+    return 0
+
+def cmd_stats(args):
+    paths = sorted(Path(args.root).glob("*.db"))
+    total_raw = 0
+    total_stored = 0
+    for path in paths:
+        archive = ShowArchive(path)
+        count, raw_bytes, stored_bytes, dict_size = archive.stats()
+        sizes = archive.sizes()
+        archive.close()
+        ratio = raw_bytes / stored_bytes if stored_bytes else 0
+        dictionary = format_size(dict_size) if dict_size else "无"
+        print(f"{path.stem:30s} {count:5d} 期  {format_size(raw_bytes):>10s} -> "
+              f"{format_size(stored_bytes):>10s}  ({ratio:.1f}x，字典 {dictionary})")
+        print(f"{'':30s} Show Notes {format_size(sizes['show_notes'])}，文字稿块 {format_size(sizes['chunk_text'])}，"
+              f"时间戳 {format_size(sizes['timestamps'])}，转录文本（相对文字稿块的差异） {format_size(sizes['transcript'])}")
+        total_raw += raw_bytes
+        total_stored += stored_bytes
+    print(f"\n共 {len(paths)} 个节目，{format_size(total_raw)} -> {format_size(total_stored)}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="转录归档（按节目训练 zstd 字典压缩，按时间段读取，按需生成 README.md）"
+    )
+
+    parser.add_argument(
+        "--root",
+        default=str(DEFAULT_ROOT),
+        help=f"归档目录（默认 {DEFAULT_ROOT}）"
+    )
+
+    parser.add_argument(
+        "--level",
+        type=int,
+        default=DEFAULT_LEVEL,
+        help=f"zstd 压缩级别（默认 {DEFAULT_LEVEL}）"
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="归档播客目录（合并清理前归档可保留逐字时间戳）")
+    add_parser.add_argument("episode_dirs", nargs="+", help="播客目录路径")
+    add_parser.add_argument("--remove-readme", action="store_true", help="归档后删除与归档内容一致的 README.md")
+    add_parser.add_argument("--no-train", action="store_true", help=f"节目达到 {AUTO_TRAIN_EPISODES} 期时不自动训练字典")
+    add_parser.set_defaults(func=cmd_add)
+
+    train_parser = subparsers.add_parser("train", help="训练节目字典并重新压缩（默认所有节目）")
+    train_parser.add_argument("shows", nargs="*", help="节目名")
+    train_parser.add_argument("--dict-size", type=int, default=DEFAULT_DICT_SIZE, help=f"字典大小（字节，默认 {DEFAULT_DICT_SIZE}）")
+    train_parser.set_defaults(func=cmd_train)
+
+    cat_parser = subparsers.add_parser("cat", help="输出一期的文字稿")
+    cat_parser.add_argument("episode_id", help="Episode ID")
+    cat_parser.add_argument("--start", help="起始时间（秒、MM:SS 或 HH:MM:SS）")
+    cat_parser.add_argument("--end", help="结束时间")
+    cat_parser.add_argument("--timestamps", action="store_true", help="每句前加起始时间")
+    cat_parser.add_argument("--notes", action="store_true", help="输出 Show Notes")
+    cat_parser.add_argument("--formatted", action="store_true", help="输出 README.md 中的转录文本（分段、说话人）")
+    cat_parser.set_defaults(func=cmd_cat)
+
+    render_parser = subparsers.add_parser("render", help="重新生成 README.md（格式与 merge-and-clean.sh 相同）")
+    render_parser.add_argument("episode_id", help="Episode ID")
+    render_parser.add_argument("--output", help="输出路径（默认为归档时的播客目录，- 表示标准输出）")
+    render_parser.set_defaults(func=cmd_render)
+
+    stats_parser = subparsers.add_parser("stats", help="各节目归档大小和压缩率")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    args = parser.parse_args()
+
+    if zstd is None:
+        print("[ERROR] zstandard 未安装")
+        print("[INFO] 请运行: pip3 install zstandard")
+        sys.exit(1)
+
+    try:
+        sys.exit(args.func(args))
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+
+"""
+全局音频存储
+按 Episode ID 保存已下载的音频，重新转录（换热词、换模型、开启说话人分离）时直接复用
+- 磁盘预算：超出时按最近使用时间（LRU）淘汰，也可按未使用天数淘汰（XYZ_AUDIO_MAX_AGE）
+- 可选转码为 Opus（单声道 32kbps，约为原始 m4a 的 1/3）
+播客目录仍然只保留 README.md
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from downloader import format_size, parse_size
+from podcast_meta import load_metadata
+
+DEFAULT_STORE = Path.home() / "Research" / "Podcast" / ".audio-store"
+DEFAULT_BUDGET = "20G"
+AUDIO_SUFFIXES = (".m4a", ".mp3", ".opus")
+
+def store_dir():
+    """存储目录，可用环境变量 XYZ_AUDIO_STORE 覆盖"""
+    return Path(os.getenv("XYZ_AUDIO_STORE", str(DEFAULT_STORE)))
+
+def store_budget(value=None):
+    """
+    磁盘预算（字节），可用环境变量 XYZ_AUDIO_BUDGET 覆盖
+
+    "0" 表示不保留音频（与旧版合并后直接删除的行为一致），"unlimited" 表示不限。
+    """
+    value = value if value is not None else os.getenv("XYZ_AUDIO_BUDGET", DEFAULT_BUDGET)
+    if value.strip() == "0":
+        return 0
+    if value.strip().lower() == "unlimited":
+        return None
+    return parse_size(value)
+
+def store_max_age(value=None):
+    """
+    超过多少天未使用的音频直接淘汰，可用环境变量 XYZ_AUDIO_MAX_AGE 覆盖
+
+    未设置（默认）时不按天数淘汰。
+    """
+    value = value if value is not None else os.getenv("XYZ_AUDIO_MAX_AGE", "")
+    if not str(value).strip():
+        return None
+    try:
+        days = float(value)
+    except ValueError:
+        raise ValueError(f"无法解析天数: {value}")
+    if days <= 0:
+        raise ValueError(f"天数必须大于 0: {value}")
+    return days
+
+def open_store(root=None, budget=None, max_age=None):
+    """
+    按参数（未指定时取环境变量）创建 AudioStore
+
+    Raises:
+        ValueError: 预算或天数配置无效，错误信息注明对应的参数和环境变量
+    """
+    try:
+        budget = store_budget(budget)
+    except ValueError as e:
+        raise ValueError(f"音频存储预算无效（--budget / XYZ_AUDIO_BUDGET）: {e}")
+    try:
+        max_age_days = store_max_age(max_age)
+    except ValueError as e:
+        raise ValueError(f"音频存储淘汰天数无效（--max-age / XYZ_AUDIO_MAX_AGE）: {e}")
+    return AudioStore(root=root, budget=budget, max_age_days=max_age_days)
+
+def _link_or_copy(src, dest):
+    """同一文件系统上用硬链接（不占额外空间），否则复制"""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dest)
+
+class AudioStore:
+    """
+    以 Episode ID 为键的音频存储
+
+    文件名为 {episode_id}{扩展名}，最近使用时间记录在文件 mtime 上
+    （存入和取出时更新），淘汰时按 mtime 从旧到新删除。
+    """
+
+    def __init__(self, root=None, budget=None, max_age_days=None):
+        """
+        Args:
+            root: 存储目录，默认 ~/Research/Podcast/.audio-store
+            budget: 磁盘预算（字节），None 表示不限，0 表示不保留音频
+            max_age_days: 超过此天数未使用的音频直接淘汰，None 表示不按天数淘汰
+        """
+        self.root = Path(root) if root else store_dir()
+        self.budget = budget
+        self.max_age_days = max_age_days
+
+    def entries(self):
+        """
+        Returns:
+            [(path, size, mtime), ...]，按最近使用时间从旧到新排序
+        """
+        if not self.root.is_dir():
+            return []
+        entries = []
+        for path in self.root.iterdir():
+            if path.suffix in AUDIO_SUFFIXES and re.fullmatch(r'[0-9a-f]{24}', path.stem):
+                stat = path.stat()
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def lookup(self, episode_id):
+        """查找 Episode 的音频，不存在时返回 None"""
+        for suffix in AUDIO_SUFFIXES:
+            path = self.root / f"{episode_id}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def put(self, episode_id, audio, opus=False):
+        """
+        存入音频并按预算淘汰
+
+        Args:
+            episode_id: Episode ID
+            audio: 音频文件路径
+            opus: 转码为 Opus 后保存（需要 ffmpeg）
+
+        Returns:
+            存储中的文件路径；预算为 0（不保留音频）时返回 None
+        """
+        if self.budget == 0:
+            return None
+
+        audio = Path(audio)
+        existing = self.lookup(episode_id)
+        if existing:
+            os.utime(existing)
+            return existing
+
+        if opus and audio.suffix != ".opus":
+            dest = self.root / f"{episode_id}.opus"
+            self.transcode(audio, dest)
+        else:
+            dest = self.root / f"{episode_id}{audio.suffix}"
+            _link_or_copy(audio, dest)
+
+        os.utime(dest)
+        self.evict(keep=dest)
+        return dest
+
+    def stash(self, cache_dir, opus=False):
+        """
+        合并清理前将播客缓存目录中的音频存入存储
+
+        Episode ID 取自 Show Notes，缺失时取自播客目录名。
+
+        Returns:
+            存储中的文件路径；没有音频、无法确定 Episode ID 或预算为 0 时返回 None
+        """
+        cache_dir = Path(cache_dir)
+        audio = next((p for suffix in AUDIO_SUFFIXES for p in sorted(cache_dir.glob(f"*{suffix}"))), None)
+        if audio is None:
+            return None
+
+        episode_id = ""
+        for show_notes in sorted(cache_dir.glob("*.md")):
+            if not show_notes.name.endswith("_formatted.md"):
+                episode_id = load_metadata(show_notes).get("episode_id", "")
+                break
+        if not episode_id:
+            match = re.search(r'[0-9a-f]{24}', cache_dir.parent.name)
+            episode_id = match.group(0) if match else ""
+        if not episode_id:
+            return None
+
+        return self.put(episode_id, audio, opus=opus)
+
+    def get(self, episode_id, dest_dir, name=None):
+        """
+        将存储中的音频放入目标目录（硬链接或复制），更新最近使用时间，
+        并顺带淘汰超过天数/预算的其他音频
+
+        Args:
+            episode_id: Episode ID
+            dest_dir: 目标目录（通常是播客目录的 .cache）
+            name: 目标文件名（不含扩展名），默认使用 Episode ID
+
+        Returns:
+            目标文件路径；存储中没有该 Episode 时返回 None
+        """
+        path = self.lookup(episode_id)
+        if path is None:
+            return None
+        os.utime(path)
+        dest = Path(dest_dir) / f"{name or episode_id}{path.suffix}"
+        if not dest.exists():
+            _link_or_copy(path, dest)
+        self.evict(keep=path)
+        return dest
+
+    def transcode(self, src, dest):
+        """用 ffmpeg 转码为 16kHz 单声道 Opus（ASR 只需要 16kHz 单声道）"""
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError("转码需要 ffmpeg，请先安装: brew install ffmpeg")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.stem + ".tmp.opus")
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", str(src),
+             "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "32k", str(tmp)],
+            check=True,
+        )
+        os.replace(tmp, dest)
+
+    def evict(self, keep=None):
+        """
+        按天数和磁盘预算淘汰最久未使用的音频
+
+        Args:
+            keep: 不淘汰的文件（刚存入的音频）
+
+        Returns:
+            被删除的文件列表
+        """
+        removed = []
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            for entry in list(entries):
+                path, size, mtime = entry
+                if mtime < cutoff and path != keep:
+                    path.unlink()
+                    removed.append(path)
+                    entries.remove(entry)
+                    total -= size
+
+        if self.budget:
+            for path, size, _ in entries:
+                if total <= self.budget:
+                    break
+                if path == keep:
+                    continue
+                path.unlink()
+                removed.append(path)
+                total -= size
+
+        return removed
+
+def cmd_put(store, args):
+    path = store.put(args.episode_id, args.audio, opus=args.opus)
+    if path is None:
+        print("[INFO] 音频存储已禁用（XYZ_AUDIO_BUDGET=0），未保存")
+    else:
+        print(f"[INFO] 已存入音频存储: {path}")
+    return 0
+
+def cmd_stash(store, args):
+    if store.budget == 0:
+        print("[INFO] 音频存储已禁用（XYZ_AUDIO_BUDGET=0），不保留音频")
+        return 0
+    path = store.stash(args.cache_dir, opus=args.opus or os.getenv("XYZ_AUDIO_OPUS") == "1")
+    if path is None:
+        print("[WARN] 未找到可保存的音频或 Episode ID")
+    else:
+        print(f"[INFO] 音频已保留到存储: {path}")
+    return 0
+
+def cmd_get(store, args):
+    path = store.get(args.episode_id, args.dest_dir, name=args.name)
+    if path is None:
+        return 1
+    print(path)
+    return 0
+
+def cmd_evict(store, args):
+    for path in store.evict():
+        print(f"[INFO] 已淘汰: {path.name}")
+    return 0
+
+def cmd_list(store, args):
+    entries = store.entries()
+    total = sum(size for _, size, _ in entries)
+    for path, size, mtime in reversed(entries):
+        used = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
+        print(f"{path.name:32s} {format_size(size):>10s}  {used}")
+    budget = "不限" if store.budget is None else format_size(store.budget)
+    print(f"\n共 {len(entries)} 个文件，{format_size(total)} / 预算 {budget}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="全局音频存储（按 Episode ID 复用音频，磁盘预算 + LRU 淘汰）"
+    )
+
+    parser.add_argument("--store", help=f"存储目录（默认 {DEFAULT_STORE}，或环境变量 XYZ_AUDIO_STORE）")
+    parser.add_argument("--budget", help=f"磁盘预算，如 20G；0 不保留音频，unlimited 不限（默认 {DEFAULT_BUDGET}，或环境变量 XYZ_AUDIO_BUDGET）")
+    parser.add_argument("--max-age", help="超过指定天数未使用的音频直接淘汰（默认不按天数淘汰，或环境变量 XYZ_AUDIO_MAX_AGE）")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    put_parser = subparsers.add_parser("put", help="存入音频")
+    put_parser.add_argument("episode_id", help="Episode ID")
+    put_parser.add_argument("audio", help="音频文件路径")
+    put_parser.add_argument("--opus", action="store_true", help="转码为 Opus 后保存（需要 ffmpeg）")
+    put_parser.set_defaults(func=cmd_put)
+
+    stash_parser = subparsers.add_parser("stash", help="保存播客缓存目录中的音频（合并清理前调用）")
+    stash_parser.add_argument("cache_dir", help="播客目录下的 .cache 目录")
+    stash_parser.add_argument("--opus", action="store_true", help="转码为 Opus 后保存（或环境变量 XYZ_AUDIO_OPUS=1）")
+    stash_parser.set_defaults(func=cmd_stash)
+
+    get_parser = subparsers.add_parser("get", help="取出音频到目录，存储中不存在时退出码为 1")
+    get_parser.add_argument("episode_id", help="Episode ID")
+    get_parser.add_argument("dest_dir", help="目标目录")
+    get_parser.add_argument("--name", help="目标文件名（不含扩展名）")
+    get_parser.set_defaults(func=cmd_get)
+
+    evict_parser = subparsers.add_parser("evict", help="按预算/天数淘汰")
+    evict_parser.set_defaults(func=cmd_evict)
+
+    list_parser = subparsers.add_parser("list", help="列出存储内容")
+    list_parser.set_defaults(func=cmd_list)
+
+    args = parser.parse_args()
+
+    try:
+        store = open_store(root=args.store, budget=args.budget, max_age=args.max_age)
+        sys.exit(args.func(store, args))
+    except (OSError, RuntimeError, ValueError, subprocess.CalledProcessError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+小宇宙播客批量 ASR 转录（跨节目分段打包）
+多期节目先分别做 VAD，再把所有语音片段按长度排序、打包成满额的 batch_size_s 批次
+送入 paraformer-zh，最后按节目拆回文本和时间戳并分别恢复标点
+打包逻辑位于 podcast_asr.batch，本脚本只负责命令行参数和输出文件
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+from podcast_asr import (
+    Profiler,
+    TranscriptionError,
+    TranscriptionResult,
+    configure_logging,
+    default_output_dir,
+    default_profile_dir,
+    finish_profile,
+    transcribe_batch,
+    write_outputs,
+)
+
+logger = logging.getLogger("batch_transcribe")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="小宇宙播客批量 ASR 转录（跨节目分段打包，适合大量短节目）"
+    )
+
+    parser.add_argument(
+        "--audio",
+        required=True,
+        nargs="+",
+        help="音频文件路径（可多个）"
+    )
+
+    parser.add_argument(
+        "--hotword",
+        default="",
+        help="热词（用空格分隔）"
+    )
+
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=300,
+        help="每批最大累计时长（秒），默认 300"
+    )
+
+    parser.add_argument(
+        "--segmentation",
+        action="store_true",
+        help="同时输出智能分段的 _formatted.md"
+    )
+
+    parser.add_argument(
+        "--retries",
+        type=int,
+        help="模型加载的最多尝试次数（默认 3）"
+    )
+
+    parser.add_argument(
+        "--status-json",
+        metavar="PATH",
+        help="将每期的结果（done / failed 及错误信息）以 JSON 写入 PATH，供 pipeline.py 逐期判断"
+    )
+
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="DIR",
+        help="性能剖析：各阶段的 CPU 调用栈采样和内存峰值写入 DIR（默认为第一期输出目录下的 batch_profile，输出到 .cache 时改为节目目录下的 .profile/batch_profile）"
+    )
+
+    args = parser.parse_args()
+    configure_logging()
+
+    print("="*50)
+    print("小宇宙播客批量 ASR 转录工具")
+    print("="*50)
+    print()
+
+    # 每期的结果：没有处理到的节目（例如模型加载失败）保持 failed
+    statuses = [{"audio": audio, "status": "failed", "error": "未处理", "text": None} for audio in args.audio]
+    profiler = Profiler().start() if args.profile is not None else None
+    try:
+        results, stats = transcribe_batch(
+            args.audio,
+            hotword=args.hotword,
+            batch_size_s=args.batch_size,
+            model_retries=args.retries or 3,
+        )
+
+        done = 0
+        for status, result in zip(statuses, results):
+            if not isinstance(result, TranscriptionResult):
+                status["error"] = str(result)
+                continue
+            try:
+                paths = write_outputs(
+                    result,
+                    default_output_dir(Path(status["audio"])),
+                    formatted=args.segmentation,
+                    source="FunASR paraformer-zh（跨节目批量转录）",
+                )
+            except OSError as e:
+                logger.error(f"写入失败: {status['audio']} ({e})")
+                status["error"] = f"写入失败: {e}"
+                continue
+            logger.info(f"已保存: {paths['text']} ({len(result.text)} 字)")
+            status.update(status="done", error=None, text=str(paths["text"]))
+            done += 1
+    except TranscriptionError as e:
+        logger.error(str(e))
+        for status in statuses:
+            status["error"] = str(e)
+        sys.exit(1)
+    finally:
+        if args.status_json:
+            with open(args.status_json, "w", encoding="utf-8") as f:
+                json.dump(statuses, f, ensure_ascii=False, indent=2)
+        if profiler is not None:
+            finish_profile(profiler, args.profile or default_profile_dir(default_output_dir(Path(args.audio[0])), "batch_profile"))
+
+    audio_hours = stats["audio_ms"] / 3600000
+    print("\n" + "="*50)
+    print(f"[SUCCESS] 批量转录完成: {done}/{len(args.audio)} 期")
+    print("="*50)
+    print(f"音频时长: {audio_hours:.2f} 小时（其中语音 {stats['speech_ms'] / 3600000:.2f} 小时）")
+    print(f"耗时: {stats['elapsed']:.1f}s，CPU 时间: {stats['cpu_seconds']:.1f}s")
+    if stats["cpu_seconds"] > 0:
+        print(f"吞吐: {audio_hours / (stats['cpu_seconds'] / 3600):.1f} 音频小时 / CPU 小时")
+
+    sys.exit(0 if done == len(args.audio) else 1)
+
+if __name__ == "__main__":
+    main()
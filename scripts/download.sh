@@ -2,9 +2,12 @@
 
 # 小宇宙播客下载脚本
 # 下载音频和 Show Notes 到临时缓存目录
+# Show Notes 由 xyz-dl 生成，音频由 downloader.py 下载（断点续传、多连接）
 
 set -e
 
+SCRIPTS_DIR="$HOME/.claude/skills/xiaoyuzhou-podcast/scripts"
+
 # 颜色输出
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -20,12 +23,19 @@ echo_success() {
     echo -e "${GREEN}[SUCCESS]${NC} $1"
 }
 
+echo_warn() {
+    echo -e "${YELLOW}[WARN]${NC} $1"
+}
+
 echo_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
 echo_usage() {
-    echo "用法: $0 <URL 或 Episode ID> [输出根目录]"
+    echo "用法: $0 [--notes-only] <URL 或 Episode ID> [输出根目录]"
+    echo ""
+    echo "选项:"
+    echo "  --notes-only      只下载 Show Notes，不下载音频（由调用方自行下载）"
     echo ""
     echo "示例:"
     echo "  $0 https://www.xiaoyuzhoufm.com/episode/6942f3e852d4707aaa1feba3"
@@ -72,21 +82,21 @@ check_xyzdl() {
     fi
 }
 
-# 下载播客
-download_podcast() {
+# 下载 Show Notes
+download_show_notes() {
     local url="$1"
     local cache_dir="$2"
 
-    echo_info "正在下载播客..."
+    echo_info "正在下载 Show Notes..."
     echo_info "URL: $url"
     echo_info "临时缓存: $cache_dir"
     echo ""
 
-    # 调用 xyz-dl，下载到缓存目录（带重试）
+    # 调用 xyz-dl，下载到缓存目录（带重试；任务队列中由 XYZ_RETRIES=1 关闭，改由队列重试）
     cd "$XYZDL_PATH"
-    max_retries=3
+    max_retries=${XYZ_RETRIES:-3}
     for attempt in $(seq 1 $max_retries); do
-        if uv run xyz-dl --mode both --dir "$cache_dir" "$url"; then
+        if uv run xyz-dl --mode md --dir "$cache_dir" "$url"; then
             # 下载成功
             break
         else
@@ -100,17 +110,47 @@ download_podcast() {
         fi
     done
 
-    # 检查下载结果
     echo ""
-    echo_info "下载完成！"
+    echo_info "Show Notes 下载完成！"
+}
+
+# 下载音频：按 Show Notes 中的 audio_url 断点续传，失败时回退到 xyz-dl
+download_audio() {
+    local url="$1"
+    local cache_dir="$2"
+    local show_notes="$3"
+
+    # 音频存储中已有（之前处理过）则直接复用
+    if python3 "$SCRIPTS_DIR/audio_store.py" get "$EPISODE_ID" "$cache_dir" --name "$(basename "$show_notes" .md)" > /dev/null; then
+        echo_info "复用音频存储中的音频，跳过下载"
+        return
+    fi
+
+    echo_info "正在下载音频..."
+
+    if [ -f "$show_notes" ] && python3 "$SCRIPTS_DIR/downloader.py" --show-notes "$show_notes"; then
+        :
+    else
+        echo_warn "断点续传下载失败，回退到 xyz-dl"
+        (cd "$XYZDL_PATH" && uv run xyz-dl --mode audio --dir "$cache_dir" "$url") || {
+            echo_error "音频下载失败"
+            exit 1
+        }
+    fi
 
     # 查找下载的文件
     echo_info "文件列表:"
-    ls -lh "$cache_dir"/ | grep -E '\.(md|m4a|mp3)$' || true
+    ls -lh "$cache_dir"/ | grep -E '\.(md|m4a|mp3|opus)$' || true
 }
 
 # 主函数
 main() {
+    local notes_only=false
+    if [ "$1" = "--notes-only" ]; then
+        notes_only=true
+        shift
+    fi
+
     if [ $# -lt 1 ]; then
         echo_usage
     fi
@@ -139,10 +179,9 @@ main() {
     # 创建目录结构
     mkdir -p "$CACHE_DIR"
 
-    download_podcast "$URL" "$CACHE_DIR"
+    download_show_notes "$URL" "$CACHE_DIR"
 
-    # 查找下载的音频和 Markdown 文件
-    AUDIO_FILE=$(find "$CACHE_DIR" -name "*.m4a" -o -name "*.mp3" | head -1)
+    # 查找下载的 Markdown 文件
     SHOW_NOTES=$(find "$CACHE_DIR" -name "*.md" | head -1)
 
     # 重命名目录为可读格式
@@ -150,26 +189,52 @@ main() {
         echo ""
         echo_info "正在重命名目录..."
 
-        SCRIPTS_DIR="$HOME/.claude/skills/xiaoyuzhou-podcast/scripts"
         NEW_DIR_NAME=$("$SCRIPTS_DIR/format-dirname.sh" "$EPISODE_ID" "$SHOW_NOTES")
 
         NEW_EPISODE_DIR="$OUTPUT_ROOT/$NEW_DIR_NAME"
 
         # 检查目标目录是否已存在
         if [ -d "$NEW_EPISODE_DIR" ] && [ "$NEW_EPISODE_DIR" != "$EPISODE_DIR" ]; then
-            echo_error "目标目录已存在: $NEW_EPISODE_DIR"
-            echo_info "保留原目录: $EPISODE_DIR"
+            # 目录已存在（上次未完成的下载，或重新处理已合并的节目）：
+            # 沿用原目录，新下载的 Show Notes 放入其 .cache，音频可续传或从音频存储复用
+            mkdir -p "$NEW_EPISODE_DIR/.cache"
+            find "$CACHE_DIR" -mindepth 1 -maxdepth 1 -exec mv -n {} "$NEW_EPISODE_DIR/.cache/" \;
+            # mv -n 不覆盖已有文件：与已有文件内容相同的直接删除，其余保留并报告；
+            # 临时目录清空后才删除，不会丢掉已有目录中没有的文件
+            find "$CACHE_DIR" -mindepth 1 -maxdepth 1 -type f | while read -r leftover; do
+                if cmp -s "$leftover" "$NEW_EPISODE_DIR/.cache/$(basename "$leftover")"; then
+                    rm -f "$leftover"
+                fi
+            done
+            if ! rmdir "$CACHE_DIR" "$EPISODE_DIR" 2>/dev/null; then
+                echo_warn "以下文件与已有目录中的同名文件不同，未覆盖，保留在 $EPISODE_DIR:"
+                find "$EPISODE_DIR" -mindepth 1 -type f | sed 's/^/    /'
+            fi
+            EPISODE_DIR="$NEW_EPISODE_DIR"
+            CACHE_DIR="$EPISODE_DIR/.cache"
+            SHOW_NOTES=$(find "$CACHE_DIR" -name "*.md" ! -name "*_formatted.md" | head -1)
+
+            echo_info "沿用已有目录: $NEW_DIR_NAME"
         else
             # 重命名目录
             mv "$EPISODE_DIR" "$NEW_EPISODE_DIR"
             EPISODE_DIR="$NEW_EPISODE_DIR"
             CACHE_DIR="$EPISODE_DIR/.cache"
-            AUDIO_FILE=$(find "$CACHE_DIR" -name "*.m4a" -o -name "*.mp3" | head -1)
+            SHOW_NOTES=$(find "$CACHE_DIR" -name "*.md" | head -1)
 
             echo_success "目录已重命名: $NEW_DIR_NAME"
         fi
     fi
 
+    if [ "$notes_only" = true ]; then
+        echo "===EPISODE_DIR:$EPISODE_DIR==="
+        exit 0
+    fi
+
+    echo ""
+    download_audio "$URL" "$CACHE_DIR" "$SHOW_NOTES"
+    AUDIO_FILE=$(find "$CACHE_DIR" -name "*.m4a" -o -name "*.mp3" -o -name "*.opus" | head -1)
+
     echo ""
     echo_success "下载完成！"
     echo_info "音频文件: $AUDIO_FILE"
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+
+"""
+播客音频下载器
+- HTTP Range 断点续传（.part 文件 + .part.json 进度）
+- 大文件多连接分段下载
+- 多期并发下载，全局带宽和连接数上限
+- 校验完整性后才重命名为最终文件：大小、音频文件头，以及服务器给出的 MD5（ETag/Content-MD5）；
+  没有 MD5 时用 ffmpeg 完整解码一遍
+"""
+
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from podcast_meta import load_metadata
+
+USER_AGENT = "Mozilla/5.0 (xiaoyuzhou-podcast-skill)"
+CHUNK_SIZE = 256 * 1024
+# 每下载多少字节保存一次进度
+STATE_INTERVAL = 4 * 1024 * 1024
+
+class DownloadError(Exception):
+    """下载失败或完整性校验失败"""
+
+class RemoteChanged(DownloadError):
+    """续传时远端文件已变化（ETag/Last-Modified 不一致）"""
+
+class DownloadCancelled(DownloadError):
+    """下载被调用方中止（cancel 已设置），.part 和续传进度保留"""
+
+def parse_size(value):
+    """
+    解析带单位的大小："500K"、"2M"、"1.5G" -> 字节数
+
+    纯数字按字节处理，空值返回 None。
+    """
+    if value in (None, "", "0"):
+        return None
+    match = re.fullmatch(r'\s*([0-9.]+)\s*([KMGT]?)i?B?\s*', str(value), re.I)
+    if not match:
+        raise ValueError(f"无法解析大小: {value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMGT".index(unit.upper() or " "))
+
+def format_size(num_bytes):
+    """将字节数格式化为人类可读大小"""
+    if num_bytes < 1024:
+        return f"{num_bytes}B"
+    size = num_bytes / 1024
+    for unit in ("KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f}{unit}"
+        size /= 1024
+
+def remote_md5(headers, whole_body):
+    """
+    从响应头取整个文件的 MD5（十六进制小写），没有时返回 None
+
+    Content-MD5 是本次响应体的摘要，只有完整响应（200）才代表整个文件；
+    对象存储/CDN 的强 ETag 是 32 位十六进制时即为文件 MD5（分片上传的 "xxx-3" 形式不是）。
+    """
+    content_md5 = headers.get("Content-MD5")
+    if content_md5 and whole_body:
+        try:
+            return base64.b64decode(content_md5, validate=True).hex()
+        except ValueError:
+            pass
+    etag = headers.get("ETag") or ""
+    match = re.fullmatch(r'"([0-9a-fA-F]{32})"', etag.strip())
+    return match.group(1).lower() if match else None
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def verify_decode(path):
+    """
+    用 ffmpeg 完整解码一遍，发现解码错误（例如续传留下的空洞）时失败
+
+    Returns:
+        是否进行了检查（没有 ffmpeg 时为 False）
+    """
+    if shutil.which("ffmpeg") is None:
+        return False
+    result = subprocess.run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-i", str(path), "-f", "null", "-"],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0 or result.stderr.strip():
+        error = (result.stderr.strip().splitlines() or ["ffmpeg 退出码非零"])[-1]
+        raise DownloadError(f"音频解码失败: {error}")
+    return True
+
+def verify_audio(path, expected_size=None, md5=None, decode=False):
+    """
+    检查下载结果：大小与服务器声明一致，文件头是音频格式；
+    给出 md5 时校验内容，否则 decode 为 True 时用 ffmpeg 完整解码
+
+    Raises:
+        DownloadError: 校验失败
+    """
+    size = os.path.getsize(path)
+    if expected_size is not None and size != expected_size:
+        raise DownloadError(f"文件大小不一致: {size} != {expected_size}")
+    if size < 16:
+        raise DownloadError(f"文件过小: {size} 字节")
+
+    with open(path, "rb") as f:
+        header = f.read(16)
+
+    if not (header[4:8] == b"ftyp"                              # MP4/M4A
+            or header[:3] == b"ID3"                             # 带 ID3 标签的 MP3
+            or (header[0] == 0xFF and header[1] & 0xE0 == 0xE0)  # MP3 帧同步
+            or header[:4] in (b"OggS", b"RIFF", b"fLaC")):
+        raise DownloadError(f"文件头不是可识别的音频格式: {header[:8]!r}")
+
+    if md5:
+        actual = file_md5(path)
+        if actual != md5:
+            raise DownloadError(f"内容校验失败: MD5 {actual} != {md5}")
+    elif decode:
+        verify_decode(path)
+
+def audio_destination(show_notes, audio_url=None):
+    """
+    根据 Show Notes 推断音频保存路径：与 Show Notes 同目录、同名，扩展名取自音频 URL
+
+    Returns:
+        (audio_url, 目标路径)
+    """
+    show_notes = Path(show_notes)
+    if audio_url is None:
+        audio_url = load_metadata(show_notes).get("audio_url", "")
+    if not audio_url:
+        raise DownloadError(f"Show Notes 中没有 audio_url: {show_notes}")
+
+    suffix = os.path.splitext(urllib.parse.urlparse(audio_url).path)[1] or ".m4a"
+    return audio_url, show_notes.with_suffix(suffix)
+
+class RateLimiter:
+    """令牌桶限速器，所有下载线程共享"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, amount):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+class Downloader:
+    """
+    可在多个线程间共享的下载器
+
+    同一个实例的所有下载共用连接数上限和带宽上限。
+    """
+
+    def __init__(self, max_connections=8, connections_per_file=4, rate_limit=None,
+                 retries=5, min_split_size=8 * 1024 * 1024, timeout=30, quiet=False,
+                 decode_check=True):
+        """
+        Args:
+            max_connections: 全局最大并发连接数
+            connections_per_file: 单个文件最多分段数
+            rate_limit: 全局带宽上限（字节/秒），None 表示不限
+            retries: 每个分段的最大重试次数（续传不从头开始）
+            min_split_size: 每段最小字节数，小文件不分段
+            timeout: 网络超时（秒）
+            quiet: 不输出进度信息
+            decode_check: 服务器没有给出 MD5 时用 ffmpeg 完整解码校验（需要 ffmpeg）
+        """
+        self.connections = threading.BoundedSemaphore(max_connections)
+        self.connections_per_file = max(1, connections_per_file)
+        self.limiter = RateLimiter(rate_limit)
+        self.retries = retries
+        self.min_split_size = min_split_size
+        self.timeout = timeout
+        self.quiet = quiet
+        self.decode_check = decode_check
+
+    def log(self, message):
+        if not self.quiet:
+            print(f"[INFO] {message}", flush=True)
+
+    def open(self, url, headers=None):
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT, **(headers or {})})
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def probe(self, url):
+        """
+        探测文件大小、是否支持 Range、校验标识和文件 MD5
+
+        Returns:
+            {"size": int 或 None, "ranges": bool, "validator": str, "md5": str 或 None}
+        """
+        with self.connections:
+            with self.open(url, {"Range": "bytes=0-0"}) as response:
+                validator = response.headers.get("ETag") or response.headers.get("Last-Modified") or ""
+                md5 = remote_md5(response.headers, whole_body=response.status == 200)
+                if response.status == 206:
+                    match = re.search(r'/(\d+)$', response.headers.get("Content-Range", ""))
+                    return {
+                        "size": int(match.group(1)) if match else None,
+                        "ranges": match is not None,
+                        "validator": validator,
+                        "md5": md5,
+                    }
+                length = response.headers.get("Content-Length")
+                return {
+                    "size": int(length) if length else None,
+                    "ranges": False,
+                    "validator": validator,
+                    "md5": md5,
+                }
+
+    def plan(self, info):
+        """按文件大小划分分段：[[起始, 结束(含), 下一个待下载字节], ...]"""
+        size = info["size"]
+        count = min(self.connections_per_file, max(1, math.ceil(size / self.min_split_size)))
+        step = math.ceil(size / count)
+        return [[start, min(start + step, size) - 1, start] for start in range(0, size, step)]
+
+    def fetch(self, url, dest, cancel=None):
+        """
+        下载单个文件，支持断点续传
+
+        已存在的最终文件视为完成；已存在的 .part/.part.json 会从断点继续。
+
+        Args:
+            url: 下载地址
+            dest: 最终文件路径
+            cancel: threading.Event，设置后尽快停止下载（已落盘的进度保留）
+
+        Returns:
+            最终文件路径
+
+        Raises:
+            DownloadCancelled: cancel 已设置
+            DownloadError: 多次重试后仍失败或校验不通过
+        """
+        dest = Path(dest)
+        if dest.exists():
+            self.log(f"已存在，跳过下载: {dest.name}")
+            return dest
+
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(dest.name + ".part")
+        state_file = dest.with_name(dest.name + ".part.json")
+
+        try:
+            info = self.fetch_to_part(url, part, state_file, cancel)
+        except RemoteChanged:
+            # 远端文件在两次下载之间被替换：丢弃断点，从头下载一次
+            self.log(f"远端文件已变化，重新下载: {dest.name}")
+            for stale in (part, state_file):
+                if stale.exists():
+                    stale.unlink()
+            info = self.fetch_to_part(url, part, state_file, cancel)
+
+        try:
+            verify_audio(part, info["size"], md5=info["md5"], decode=self.decode_check)
+        except DownloadError:
+            part.unlink()
+            if state_file.exists():
+                state_file.unlink()
+            raise
+
+        os.replace(part, dest)
+        if state_file.exists():
+            state_file.unlink()
+        self.log(f"下载完成: {dest.name} ({format_size(os.path.getsize(dest))})")
+        return dest
+
+    def fetch_to_part(self, url, part, state_file, cancel=None):
+        """
+        下载到 .part 文件
+
+        Returns:
+            probe 得到的文件信息
+        """
+        for attempt in range(1, self.retries + 2):
+            try:
+                info = self.probe(url)
+                break
+            except (OSError, http.client.HTTPException) as e:
+                if attempt > self.retries:
+                    raise DownloadError(f"无法连接: {e}")
+                time.sleep(min(30, 2 ** attempt))
+
+        if not info["ranges"] or not info["size"]:
+            # 服务器不支持 Range：只能单连接整体下载
+            self.fetch_whole(url, part, cancel)
+            return info
+
+        state = self.load_state(state_file, url, info)
+        if state is None:
+            state = {"url": url, "size": info["size"], "validator": info["validator"],
+                     "segments": self.plan(info)}
+            with open(part, "wb") as f:
+                f.truncate(info["size"])
+        else:
+            done = sum(seg[2] - seg[0] for seg in state["segments"])
+            self.log(f"从断点续传 {part.name}: 已完成 {format_size(done)}/{format_size(info['size'])}")
+
+        self.fetch_segments(url, part, state, state_file, cancel)
+        return info
+
+    def load_state(self, state_file, url, info):
+        """读取续传进度；远端文件已变化时丢弃"""
+        part = state_file.with_name(state_file.name[:-len(".json")])
+        if state_file.exists() and part.exists():
+            try:
+                with open(state_file, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+            if state and state.get("size") == info["size"] and state.get("validator") == info["validator"]:
+                state["url"] = url
+                return state
+
+        if part.exists() and not state_file.exists() and 0 < part.stat().st_size < info["size"]:
+            # 旧的单连接 .part（无进度文件）：按已有长度续传
+            offset = part.stat().st_size
+            with open(part, "r+b") as f:
+                f.truncate(info["size"])
+            return {"url": url, "size": info["size"], "validator": info["validator"],
+                    "segments": [[0, info["size"] - 1, offset]]}
+
+        return None
+
+    def save_state(self, state_file, state, lock):
+        with lock:
+            tmp = state_file.with_name(state_file.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, state_file)
+
+    def fetch_segments(self, url, part, state, state_file, cancel=None):
+        """
+        并发下载所有未完成的分段
+
+        任一分段发现远端文件变化或调用方设置 cancel 时，其余分段立即停止。
+        """
+        lock = threading.Lock()
+        abort = threading.Event()
+        errors = []
+        pending = [seg for seg in state["segments"] if seg[2] <= seg[1]]
+
+        def run(segment):
+            try:
+                self.fetch_segment(url, part, segment, state, state_file, lock, abort)
+            except Exception as e:
+                if isinstance(e, RemoteChanged):
+                    abort.set()
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(seg,), daemon=True) for seg in pending]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+                if cancel is not None and cancel.is_set():
+                    abort.set()
+
+        self.save_state(state_file, state, lock)
+        if errors:
+            raise next((e for e in errors if isinstance(e, RemoteChanged)), errors[0])
+        if cancel is not None and cancel.is_set():
+            raise DownloadCancelled("下载已中止")
+
+    def fetch_segment(self, url, part, segment, state, state_file, lock, abort):
+        """
+        下载一个分段，失败后从已落盘的位置继续重试
+
+        segment[2] 只在本分段 flush + fsync 之后才前移：save_state 会写出所有分段的
+        segment[2]，其他分段缓冲区里尚未落盘的数据不会被记为已完成，
+        崩溃后续传不会在预分配的 .part 中留下全零空洞。
+        """
+        start, end, _ = segment
+        attempt = 0
+        with open(part, "r+b") as f:
+            def checkpoint(position):
+                f.flush()
+                os.fsync(f.fileno())
+                with lock:
+                    segment[2] = position
+                self.save_state(state_file, state, lock)
+
+            while segment[2] <= end and not abort.is_set():
+                position = segment[2]
+                headers = {"Range": f"bytes={position}-{end}"}
+                if state["validator"]:
+                    headers["If-Range"] = state["validator"]
+                try:
+                    with self.connections:
+                        with self.open(url, headers) as response:
+                            if response.status != 206:
+                                raise RemoteChanged("远端文件已变化，需要重新下载")
+                            f.seek(position)
+                            unsaved = 0
+                            while position <= end and not abort.is_set():
+                                data = response.read(min(CHUNK_SIZE, end - position + 1))
+                                if not data:
+                                    break
+                                self.limiter.consume(len(data))
+                                f.write(data)
+                                position += len(data)
+                                unsaved += len(data)
+                                if unsaved >= STATE_INTERVAL:
+                                    checkpoint(position)
+                                    unsaved = 0
+                    checkpoint(position)
+                    if position <= end and not abort.is_set():
+                        raise DownloadError(f"连接提前关闭 (bytes {position}-{end})")
+                except RemoteChanged:
+                    raise
+                except (OSError, http.client.HTTPException, DownloadError) as e:
+                    attempt += 1
+                    checkpoint(position)
+                    if attempt > self.retries:
+                        raise DownloadError(f"分段 {start}-{end} 下载失败: {e}")
+                    wait = min(30, 2 ** attempt)
+                    self.log(f"分段 {start}-{end} 中断 ({e})，{wait}s 后从 {segment[2]} 续传 "
+                             f"(尝试 {attempt}/{self.retries})")
+                    time.sleep(wait)
+
+    def fetch_whole(self, url, part, cancel=None):
+        """不支持 Range 时单连接下载，失败只能从头重来"""
+        for attempt in range(1, self.retries + 2):
+            try:
+                with self.connections:
+                    with self.open(url) as response, open(part, "wb") as f:
+                        while True:
+                            if cancel is not None and cancel.is_set():
+                                raise DownloadCancelled("下载已中止")
+                            data = response.read(CHUNK_SIZE)
+                            if not data:
+                                break
+                            self.limiter.consume(len(data))
+                            f.write(data)
+                return
+            except (OSError, http.client.HTTPException) as e:
+                if attempt > self.retries:
+                    raise DownloadError(f"下载失败: {e}")
+                wait = min(30, 2 ** attempt)
+                self.log(f"下载中断 ({e})，{wait}s 后重试 (尝试 {attempt}/{self.retries})")
+                time.sleep(wait)
+
+    def fetch_many(self, items, jobs=3):
+        """
+        并发下载多个文件
+
+        Args:
+            items: [(url, dest), ...]
+            jobs: 同时下载的文件数
+
+        Returns:
+            [(dest, 异常或 None), ...]，顺序与输入一致
+        """
+        def run(item):
+            url, dest = item
+            try:
+                self.fetch(url, dest)
+                return Path(dest), None
+            except Exception as e:
+                return Path(dest), e
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            return list(pool.map(run, items))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="播客音频下载器（断点续传 / 多连接 / 限速）"
+    )
+
+    parser.add_argument("url", nargs="?", help="音频 URL")
+    parser.add_argument("dest", nargs="?", help="保存路径")
+
+    parser.add_argument(
+        "--show-notes",
+        action="append",
+        default=[],
+        help="从 Show Notes 的 audio_url 下载，保存到同目录同名音频文件（可多次指定）"
+    )
+
+    parser.add_argument("--jobs", type=int, default=3, help="同时下载的文件数（默认 3）")
+    parser.add_argument("--connections", type=int, default=4, help="单个文件最多连接数（默认 4）")
+    parser.add_argument("--max-connections", type=int, default=8, help="全局最大连接数（默认 8）")
+    parser.add_argument("--limit-rate", help="全局带宽上限，如 2M（字节/秒）")
+    parser.add_argument("--retries", type=int, default=5, help="每个分段最大重试次数（默认 5）")
+    parser.add_argument(
+        "--no-decode-check",
+        action="store_true",
+        help="服务器没有给出 MD5 时不用 ffmpeg 解码校验（默认有 ffmpeg 时校验）"
+    )
+
+    args = parser.parse_args()
+
+    items = []
+    if args.url:
+        if not args.dest:
+            parser.error("指定 URL 时需要保存路径")
+        items.append((args.url, args.dest))
+    try:
+        for show_notes in args.show_notes:
+            items.append(audio_destination(show_notes))
+        rate_limit = parse_size(args.limit_rate)
+    except (DownloadError, ValueError, OSError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    if not items:
+        parser.error("需要 URL 和保存路径，或 --show-notes")
+
+    downloader = Downloader(
+        max_connections=args.max_connections,
+        connections_per_file=args.connections,
+        rate_limit=rate_limit,
+        retries=args.retries,
+        decode_check=not args.no_decode_check,
+    )
+
+    failed = 0
+    for dest, error in downloader.fetch_many(items, jobs=args.jobs):
+        if error:
+            print(f"[ERROR] {dest.name}: {error}")
+            failed += 1
+        else:
+            print(f"[SUCCESS] {dest}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@
 
 set -e
 
+SCRIPTS_DIR="$HOME/.claude/skills/xiaoyuzhou-podcast/scripts"
+
 # 颜色输出
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -28,34 +30,10 @@ parse_show_notes() {
         exit 1
     fi
 
-    # 提取 YAML Front Matter
-    local in_front_matter=0
-    while IFS= read -r line; do
-        if [[ "$line" == "---" ]]; then
-            if [ $in_front_matter -eq 0 ]; then
-                in_front_matter=1
-                continue
-            else
-                break
-            fi
-        fi
-
-        if [ $in_front_matter -eq 1 ]; then
-            # 解析键值对
-            key=$(echo "$line" | cut -d: -f1 | xargs)
-            value=$(echo "$line" | cut -d: -f2- | xargs)
-
-            case "$key" in
-                title) TITLE="$value" ;;
-                podcast_name) PODCAST_NAME="$value" ;;
-                duration_text) DURATION="$value" ;;
-                audio_url) AUDIO_URL="$value" ;;
-                url) EPISODE_URL="$value" ;;
-                published_date) PUBLISHED_DATE="$value" ;;
-                episode_id) EPISODE_ID="$value" ;;
-            esac
-        fi
-    done < "$md_file"
+    # 一次解析 Front Matter，输出 TITLE=... 等 Shell 变量赋值
+    local assignments
+    assignments=$(python3 "$SCRIPTS_DIR/podcast_meta.py" --format shell "$md_file")
+    eval "$assignments"
 }
 
 # 输出结构化信息
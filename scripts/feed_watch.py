@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+
+"""
+小宇宙播客订阅
+记录订阅的节目，定时轮询节目页（或任意 RSS/HTML 页面），发现新的 Episode 后直接送入处理流水线
+- 条件请求（ETag / If-Modified-Since）：节目没有更新时只有一次 304 往返
+- 本地记录已见过的 Episode，重复轮询不会重复处理
+- 首次轮询只记录现有节目，不处理历史节目（--backfill 除外）
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from downloader import USER_AGENT
+
+DEFAULT_DB = Path.home() / "Research" / "Podcast" / ".feeds" / "feeds.db"
+PODCAST_URL = "https://www.xiaoyuzhoufm.com/podcast/{}"
+
+# 节目页和 RSS 中的 Episode 链接
+EPISODE_LINK = re.compile(r'/episode/([0-9a-f]{24})')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    url TEXT PRIMARY KEY,
+    name TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT,
+    last_checked REAL,
+    last_status TEXT,
+    added_at REAL
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    episode_id TEXT PRIMARY KEY,
+    feed_url TEXT,
+    status TEXT,
+    attempts INTEGER DEFAULT 0,
+    first_seen REAL,
+    updated_at REAL
+);
+"""
+
+class FeedError(Exception):
+    """订阅源请求失败"""
+
+def normalize_feed(value):
+    """
+    规范化订阅地址：小宇宙节目 ID（24 位十六进制）转换为节目页 URL，其他 URL 原样保留
+    """
+    value = value.strip()
+    if re.fullmatch(r'[0-9a-f]{24}', value):
+        return PODCAST_URL.format(value)
+    if not re.match(r'https?://', value):
+        raise ValueError(f"无效的节目 ID 或 URL: {value}")
+    return value
+
+def extract_episode_ids(body):
+    """提取页面中的 Episode ID（按出现顺序去重）"""
+    seen = []
+    for episode_id in EPISODE_LINK.findall(body):
+        if episode_id not in seen:
+            seen.append(episode_id)
+    return seen
+
+def fetch_feed(url, etag=None, last_modified=None, timeout=30):
+    """
+    条件请求订阅源
+
+    Returns:
+        (status, body, etag, last_modified)；未更新时 status 为 304，body 为 None
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read().decode("utf-8", errors="replace")
+            return (response.status, body,
+                    response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, None, etag, last_modified
+        raise FeedError(f"HTTP {e.code}: {url}")
+    except (urllib.error.URLError, OSError) as e:
+        raise FeedError(f"请求失败: {url} ({e})")
+
+class FeedWatcher:
+    """
+    订阅列表与已见 Episode 记录（SQLite）
+
+    Episode 状态：seen（首次轮询时已存在，不处理）、new（待处理）、backfill（--backfill 加入的
+    历史节目，待处理）、queued（已交给任务队列，由队列负责重试）、done（处理完成）、
+    failed（处理失败，下次轮询重试，最多 max_attempts 次）。
+    处理中途退出时节目仍为 new/backfill，下次轮询会重新处理。
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, timeout=30, max_attempts=3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, value, name=None):
+        """添加订阅，返回规范化后的 URL"""
+        url = normalize_feed(value)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO feeds (url, name, added_at) VALUES (?, ?, ?)",
+                (url, name, time.time()),
+            )
+            if name:
+                self.conn.execute("UPDATE feeds SET name = ? WHERE url = ?", (name, url))
+        return url
+
+    def remove(self, value):
+        """取消订阅（已见记录保留，重新订阅时不会重复处理）"""
+        url = normalize_feed(value)
+        with self.conn:
+            return self.conn.execute("DELETE FROM feeds WHERE url = ?", (url,)).rowcount > 0
+
+    def feeds(self):
+        return self.conn.execute("SELECT * FROM feeds ORDER BY added_at").fetchall()
+
+    def poll_feed(self, feed, backfill=False, record=True):
+        """
+        轮询单个订阅源，记录新出现的 Episode
+
+        Args:
+            feed: feeds 表中的一行
+            backfill: 首次轮询时也把现有节目作为待处理节目
+            record: 为 False 时只返回结果，不修改数据库（--dry-run）
+
+        Returns:
+            新 Episode ID 列表（未更新时为空）
+        """
+        now = time.time()
+        try:
+            status, body, etag, last_modified = fetch_feed(
+                feed["url"], feed["etag"], feed["last_modified"], self.timeout
+            )
+        except FeedError as e:
+            if not record:
+                raise
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE feeds SET last_checked = ?, last_status = ? WHERE url = ?",
+                    (now, str(e), feed["url"]),
+                )
+            raise
+
+        content_hash = hashlib.sha1(body.encode("utf-8")).hexdigest() if body is not None else None
+        # 服务器不支持条件请求时，内容未变也不重新解析
+        unchanged = status == 304 or content_hash == feed["content_hash"]
+
+        new_ids = []
+        if not unchanged:
+            # 以是否成功取到过内容判断首次轮询（之前请求失败不算）
+            first_poll = feed["content_hash"] is None
+            if not first_poll:
+                initial = "new"
+            else:
+                initial = "backfill" if backfill else "seen"
+            for episode_id in extract_episode_ids(body):
+                known = self.conn.execute(
+                    "SELECT 1 FROM episodes WHERE episode_id = ?", (episode_id,)
+                ).fetchone()
+                if known:
+                    continue
+                if initial != "seen":
+                    new_ids.append(episode_id)
+                if record:
+                    self.conn.execute(
+                        "INSERT INTO episodes (episode_id, feed_url, status, first_seen, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (episode_id, feed["url"], initial, now, now),
+                    )
+
+        if not record:
+            return new_ids
+
+        with self.conn:
+            self.conn.execute(
+                "UPDATE feeds SET etag = ?, last_modified = ?, content_hash = COALESCE(?, content_hash), "
+                "last_checked = ?, last_status = ? WHERE url = ?",
+                (etag, last_modified, content_hash, now, "304" if status == 304 else str(status), feed["url"]),
+            )
+        return new_ids
+
+    def pending(self):
+        """待处理的 Episode：新节目和尚未超过重试次数的失败节目（按发现时间排序）"""
+        rows = self.conn.execute(
+            "SELECT episode_id FROM episodes WHERE status IN ('new', 'backfill') "
+            "OR (status = 'failed' AND attempts < ?) ORDER BY first_seen",
+            (self.max_attempts,),
+        ).fetchall()
+        return [row["episode_id"] for row in rows]
+
+    def poll(self, backfill=False, record=True):
+        """
+        轮询全部订阅源
+
+        Returns:
+            待处理的 Episode ID 列表（新节目 + 可重试的失败节目）
+        """
+        new_ids = []
+        for feed in self.feeds():
+            try:
+                feed_ids = self.poll_feed(feed, backfill=backfill, record=record)
+            except FeedError as e:
+                print(f"[WARN] {feed['name'] or feed['url']}: {e}")
+                continue
+            if feed_ids:
+                print(f"[INFO] {feed['name'] or feed['url']}: {len(feed_ids)} 期新节目")
+            new_ids.extend(feed_ids)
+        if not record:
+            return new_ids + [episode_id for episode_id in self.pending() if episode_id not in new_ids]
+        return self.pending()
+
+    def status(self, episode_id):
+        row = self.conn.execute("SELECT status FROM episodes WHERE episode_id = ?", (episode_id,)).fetchone()
+        return row["status"] if row else None
+
+    def mark(self, episode_id, status):
+        """记录处理结果（queued / done / failed）"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE episodes SET status = ?, updated_at = ?, "
+                "attempts = attempts + (CASE WHEN ? = 'failed' THEN 1 ELSE 0 END) WHERE episode_id = ?",
+                (status, time.time(), status, episode_id),
+            )
+
+def run_pipeline(watcher, pipeline, episode_ids):
+    """将新节目送入流水线并记录结果"""
+    from pipeline import print_summary
+
+    started = time.time()
+    jobs = pipeline.run(episode_ids)
+    for job in jobs:
+        watcher.mark(job["episode_id"], "done" if job["status"] == "done" else "failed")
+    print_summary(jobs, time.time() - started)
+
+def cmd_add(watcher, args):
+    for value in args.feeds:
+        url = watcher.add(value, name=args.name)
+        print(f"[INFO] 已订阅: {url}")
+    return 0
+
+def cmd_remove(watcher, args):
+    for value in args.feeds:
+        if watcher.remove(value):
+            print(f"[INFO] 已取消订阅: {normalize_feed(value)}")
+        else:
+            print(f"[WARN] 未订阅: {value}")
+    return 0
+
+def cmd_list(watcher, args):
+    feeds = watcher.feeds()
+    if not feeds:
+        print("[INFO] 没有订阅")
+        return 0
+    for feed in feeds:
+        checked = "从未" if feed["last_checked"] is None else time.strftime(
+            "%Y-%m-%d %H:%M", time.localtime(feed["last_checked"]))
+        count = watcher.conn.execute(
+            "SELECT COUNT(*) FROM episodes WHERE feed_url = ?", (feed["url"],)
+        ).fetchone()[0]
+        print(f"{feed['name'] or feed['url']}")
+        print(f"    {feed['url']}")
+        print(f"    上次检查: {checked} ({feed['last_status'] or '-'})，已见 {count} 期")
+    return 0
+
+def enqueue_jobs(watcher, job_queue, episode_ids):
+    """将新节目加入任务队列：新节目高优先级，历史节目（backfill）低优先级"""
+    from job_queue import PRIORITY_BACKFILL, PRIORITY_NEW
+
+    backfill = [episode_id for episode_id in episode_ids if watcher.status(episode_id) == "backfill"]
+    fresh = [episode_id for episode_id in episode_ids if episode_id not in backfill]
+    added = job_queue.enqueue(fresh, priority=PRIORITY_NEW) + job_queue.enqueue(backfill, priority=PRIORITY_BACKFILL)
+    for episode_id in episode_ids:
+        watcher.mark(episode_id, "queued")
+    print(f"[INFO] 已加入任务队列: {added} 期（新节目 {len(fresh)}，历史节目 {len(backfill)}）")
+
+def cmd_poll(watcher, args):
+    pipeline = None
+    job_queue = None
+    if args.queue:
+        from job_queue import JobQueue
+        job_queue = JobQueue(args.queue_db) if args.queue_db else JobQueue()
+    elif not args.dry_run:
+        from pipeline import pipeline_from_args
+        pipeline = pipeline_from_args(args)
+
+    while True:
+        pending = watcher.poll(backfill=args.backfill, record=not args.dry_run)
+        if not pending:
+            print("[INFO] 没有新节目")
+        elif args.dry_run:
+            for episode_id in pending:
+                print(episode_id)
+        elif job_queue is not None:
+            enqueue_jobs(watcher, job_queue, pending)
+        else:
+            print(f"[INFO] 送入流水线: {len(pending)} 期")
+            run_pipeline(watcher, pipeline, pending)
+
+        if not args.interval:
+            return 0
+        time.sleep(args.interval)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="小宇宙播客订阅（条件请求轮询，新节目自动进入流水线）"
+    )
+
+    parser.add_argument(
+        "--db",
+        default=str(DEFAULT_DB),
+        help=f"订阅数据库路径（默认 {DEFAULT_DB}）"
+    )
+
+    parser.add_argument("--timeout", type=int, default=30, help="请求超时（秒，默认 30）")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="订阅节目（小宇宙节目 ID、节目页 URL 或 RSS URL）")
+    add_parser.add_argument("feeds", nargs="+", help="节目 ID 或 URL")
+    add_parser.add_argument("--name", help="显示名称")
+    add_parser.set_defaults(func=cmd_add)
+
+    remove_parser = subparsers.add_parser("remove", help="取消订阅")
+    remove_parser.add_argument("feeds", nargs="+", help="节目 ID 或 URL")
+    remove_parser.set_defaults(func=cmd_remove)
+
+    list_parser = subparsers.add_parser("list", help="列出订阅")
+    list_parser.set_defaults(func=cmd_list)
+
+    poll_parser = subparsers.add_parser("poll", help="轮询订阅，新节目送入流水线")
+    poll_parser.add_argument("--interval", type=int, default=0, help="轮询间隔（秒），默认只轮询一次")
+    poll_parser.add_argument("--backfill", action="store_true", help="首次轮询时也处理已有的历史节目")
+    poll_parser.add_argument("--dry-run", action="store_true", help="只输出新节目 ID，不处理")
+    poll_parser.add_argument("--max-attempts", type=int, default=3, help="失败节目最多处理次数（默认 3）")
+    poll_parser.add_argument("--queue", action="store_true", help="加入任务队列（job_queue.py worker 处理），而不是在本进程运行流水线")
+    poll_parser.add_argument("--queue-db", help="任务队列数据库路径（默认与 job_queue.py 相同）")
+    from pipeline import add_pipeline_arguments
+    add_pipeline_arguments(poll_parser)
+    poll_parser.set_defaults(func=cmd_poll)
+
+    args = parser.parse_args()
+
+    watcher = FeedWatcher(args.db, timeout=args.timeout, max_attempts=getattr(args, "max_attempts", 3))
+    try:
+        sys.exit(args.func(watcher, args))
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n[INFO] 已停止")
+        sys.exit(130)
+    finally:
+        watcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,10 @@ echo_error() {
     echo -e "${RED}[ERROR]${NC} $1"
 }
 
-# 从 Markdown 文件的 YAML front matter 中提取元数据
+SCRIPTS_DIR="$HOME/.claude/skills/xiaoyuzhou-podcast/scripts"
+
+# 从 Markdown 文件的 YAML front matter 中提取元数据并生成目录名
+# 目录名规则见 podcast_meta.py 的 format_dirname：日期_节目名-E序号-主题
 extract_metadata() {
     local md_file="$1"
 
@@ -31,45 +34,8 @@ extract_metadata() {
         exit 1
     fi
 
-    # 提取各个字段
-    TITLE=$(grep '^title:' "$md_file" | sed 's/title: *//' | sed 's/^"//;s/"$//')
-    PODCAST_NAME=$(grep '^podcast_name:' "$md_file" | sed 's/podcast_name: *//' | sed 's/^"//;s/"$//')
-    PUBLISHED_DATE=$(grep '^published_date:' "$md_file" | sed 's/published_date: *//')
-
-    # 解析标题提取序号和主题
-    # 例如: "E080 稳定币与RWA：里世界向你敞开的一角"
-    # 序号: E080
-    # 主题: 稳定币与RWA
-
-    EPISODE_NUMBER=$(echo "$TITLE" | grep -oE '^[A-Z]?[0-9]+' | head -1)
-
-    # 提取主题（序号后的第一个冒号或竖线前的内容）
-    # 支持 "E080 主题：副标题" 和 "27 | 主题 - 副标题" 格式
-    TOPIC=$(echo "$TITLE" | sed "s/^${EPISODE_NUMBER} //" | sed 's/ |.*//' | sed 's/：.*//' | sed 's/:.*//' | sed 's/ -.*//')
-
-    # 格式化日期（从 "2025年07月16日" 到 "20250716"）
-    FORMATTED_DATE=$(echo "$PUBLISHED_DATE" | grep -oE '[0-9]{4}年[0-9]{2}月[0-9]{2}日' | sed 's/年//;s/月//;s/日//')
-
-    # 清理节目名中的特殊字符（保留中文）
-    CLEAN_PODCAST_NAME=$(echo "$PODCAST_NAME" | sed 's/ | /-/g' | sed 's/ /-/g' | sed 's/[|():]//g')
-
-    # 清理主题中的特殊字符（保留中文）
-    CLEAN_TOPIC=$(echo "$TOPIC" | sed 's/ /-/g' | sed 's/[|():]//g' | sed 's/^-*//' | sed 's/-*$//')
-
-    # 生成目录名：日期_节目名-E序号-主题
-    if [ -n "$EPISODE_NUMBER" ] && [ -n "$CLEAN_TOPIC" ] && [ ${#CLEAN_TOPIC} -gt 0 ]; then
-        # 确保序号有 E 前缀
-        if [[ ! "$EPISODE_NUMBER" =~ ^E ]]; then
-            EPISODE_NUMBER="E${EPISODE_NUMBER}"
-        fi
-        NEW_DIR_NAME="${FORMATTED_DATE}_${CLEAN_PODCAST_NAME}-${EPISODE_NUMBER}-${CLEAN_TOPIC}"
-    else
-        # 如果无法提取序号和主题，使用原标题
-        CLEAN_TITLE=$(echo "$TITLE" | sed 's/ /-/g' | sed 's/[|():]//g')
-        NEW_DIR_NAME="${FORMATTED_DATE}_${CLEAN_TITLE}"
-    fi
-
-    echo "$NEW_DIR_NAME"
+    # 一次解析完成，不再为每个字段启动 grep/sed
+    python3 "$SCRIPTS_DIR/podcast_meta.py" --format dirname "$md_file"
 }
 
 # 主函数
@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+
+"""
+小宇宙播客持久化任务队列
+多台机器上的任意数量 worker 共同消费同一个 SQLite 队列（放在共享文件系统上）：
+- 优先级：新节目优先于历史节目（backfill）
+- 租约 + 心跳：worker 领取任务后定期续约，节点崩溃后租约过期，任务被其他 worker 重新领取
+- 按阶段重试：下载/转录/合并/同步任一阶段失败时指数退避后从该阶段重试，
+  子脚本和音频下载内部的重试循环关闭（XYZ_RETRIES=1 / --retries 1），统一由队列负责
+- 租约被其他 worker 接管时立即终止正在运行的阶段，不再写入任何状态
+各阶段直接复用 pipeline.py 的实现
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from pipeline import add_pipeline_arguments, parse_episode_input, pipeline_from_args, read_inputs
+
+DEFAULT_DB = Path.home() / "Research" / "Podcast" / ".queue" / "jobs.db"
+
+PRIORITY_NEW = 10
+PRIORITY_BACKFILL = 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE,
+    input TEXT,
+    episode_id TEXT,
+    stage TEXT DEFAULT 'download',
+    priority INTEGER DEFAULT 0,
+    state TEXT DEFAULT 'pending',
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires REAL,
+    not_before REAL DEFAULT 0,
+    payload TEXT DEFAULT '{}',
+    error TEXT,
+    created_at REAL,
+    updated_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority DESC, created_at);
+"""
+
+def default_owner():
+    """worker 标识：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class JobQueue:
+    """
+    SQLite 任务队列
+
+    每期节目一行，stage 记录当前阶段。任务状态：
+    pending（等待领取，not_before 之前不会被领取）、running（已被领取，租约有效）、
+    done（全部阶段完成）、failed（某阶段失败次数达到上限）。
+    running 状态的任务租约过期后视为 pending，可被任何 worker 重新领取。
+
+    数据库使用默认的回滚日志模式（WAL 依赖共享内存，不能跨机器使用），
+    领取任务使用 BEGIN IMMEDIATE 加写锁，需要支持 POSIX 文件锁的文件系统（如 NFSv4）。
+    各节点的时钟需要大致同步（租约按 time.time() 计算）。
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, lease_seconds=300):
+        """
+        Args:
+            db_path: 队列数据库路径
+            lease_seconds: 租约时长（秒），心跳间隔为其 1/3
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.conn = sqlite3.connect(str(self.db_path), timeout=60, isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    def enqueue(self, inputs, priority=PRIORITY_NEW, max_attempts=3, requeue=False):
+        """
+        加入任务，已在队列中的节目跳过
+
+        Args:
+            inputs: URL、Episode ID 或播客目录列表
+            priority: 优先级，数值大的先处理
+            max_attempts: 每个阶段最多尝试次数
+            requeue: 已完成或已失败的节目重新排队（从下载阶段开始）
+
+        Returns:
+            新加入（或重新排队）的任务数
+        """
+        now = time.time()
+        added = 0
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for value in inputs:
+                    episode_id, value = parse_episode_input(value)
+                    key = episode_id or value
+                    cursor = self.conn.execute(
+                        "INSERT OR IGNORE INTO jobs (key, input, episode_id, priority, max_attempts, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, value, episode_id, priority, max_attempts, now, now),
+                    )
+                    if cursor.rowcount == 0:
+                        # 已在排队的节目按较高的优先级处理（历史节目又作为新节目出现时提前）
+                        self.conn.execute(
+                            "UPDATE jobs SET priority = MAX(priority, ?) WHERE key = ? AND state = 'pending'",
+                            (priority, key),
+                        )
+                    if cursor.rowcount == 0 and requeue:
+                        cursor = self.conn.execute(
+                            "UPDATE jobs SET stage = 'download', state = 'pending', attempts = 0, not_before = 0, "
+                            "priority = ?, max_attempts = ?, error = NULL, payload = '{}', updated_at = ?, "
+                            "finished_at = NULL WHERE key = ? AND state IN ('done', 'failed')",
+                            (priority, max_attempts, now, key),
+                        )
+                    added += cursor.rowcount
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def claim(self, owner):
+        """
+        领取优先级最高的可运行任务（包括租约已过期的任务）
+
+        Returns:
+            任务字典；没有可运行任务时返回 None
+        """
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self.conn.execute(
+                        "SELECT * FROM jobs WHERE (state = 'pending' AND not_before <= ?) "
+                        "OR (state = 'running' AND lease_expires < ?) "
+                        "ORDER BY priority DESC, created_at LIMIT 1",
+                        (now, now),
+                    ).fetchone()
+                    if row is None:
+                        self.conn.execute("COMMIT")
+                        return None
+
+                    attempts = row["attempts"]
+                    if row["state"] == "running":
+                        # 租约过期（worker 崩溃或失联）计为一次失败，避免反复拖垮节点的任务无限循环
+                        print(f"[WARN] [{row['key']}] 回收过期租约（原 worker: {row['lease_owner']}）", flush=True)
+                        attempts += 1
+                        if attempts >= row["max_attempts"]:
+                            self.conn.execute(
+                                "UPDATE jobs SET state = 'failed', attempts = ?, error = ?, lease_owner = NULL, "
+                                "lease_expires = NULL, updated_at = ?, finished_at = ? WHERE id = ?",
+                                (attempts, f"{row['stage']}: 租约过期 {attempts} 次（worker 崩溃或失联）",
+                                 now, now, row["id"]),
+                            )
+                            continue
+
+                    self.conn.execute(
+                        "UPDATE jobs SET state = 'running', attempts = ?, lease_owner = ?, lease_expires = ?, "
+                        "updated_at = ? WHERE id = ?",
+                        (attempts, owner, now + self.lease_seconds, now, row["id"]),
+                    )
+                    self.conn.execute("COMMIT")
+                    break
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        job = dict(row)
+        job["attempts"] = attempts
+        job["payload"] = json.loads(job["payload"] or "{}")
+        return job
+
+    # 以下写操作都带 lease_owner 条件：租约已被其他 worker 接管时不修改任务，返回 False
+
+    def heartbeat(self, job, owner):
+        """
+        续约
+
+        Returns:
+            仍持有租约时返回 True；租约已被其他 worker 接管时返回 False
+        """
+        now = time.time()
+        cursor = self.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND state = 'running'",
+            (now + self.lease_seconds, now, job["id"], owner),
+        )
+        return cursor.rowcount > 0
+
+    def advance(self, job, owner, stage):
+        """记录阶段完成：进入下一阶段（重置尝试次数），保存中间结果"""
+        cursor = self.execute(
+            "UPDATE jobs SET stage = ?, attempts = 0, payload = ?, error = NULL, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ?",
+            (stage, json.dumps(job["payload"], ensure_ascii=False), time.time(), job["id"], owner),
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job, owner):
+        now = time.time()
+        cursor = self.execute(
+            "UPDATE jobs SET state = 'done', stage = 'done', payload = ?, lease_owner = NULL, lease_expires = NULL, "
+            "error = NULL, updated_at = ?, finished_at = ? WHERE id = ? AND lease_owner = ?",
+            (json.dumps(job["payload"], ensure_ascii=False), now, now, job["id"], owner),
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, job, owner, error, backoff=60):
+        """
+        记录当前阶段失败：未达上限时指数退避后重新排队，否则标记为 failed
+
+        Returns:
+            (是否写入, 是否会重试)：租约已被接管时不写入
+        """
+        now = time.time()
+        attempts = job["attempts"] + 1
+        retry = attempts < job["max_attempts"]
+        cursor = self.execute(
+            "UPDATE jobs SET state = ?, attempts = ?, not_before = ?, error = ?, payload = ?, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ?, finished_at = ? "
+            "WHERE id = ? AND lease_owner = ?",
+            (
+                "pending" if retry else "failed",
+                attempts,
+                now + backoff * 2 ** (attempts - 1) if retry else 0,
+                error,
+                json.dumps(job["payload"], ensure_ascii=False),
+                now,
+                None if retry else now,
+                job["id"],
+                owner,
+            ),
+        )
+        return cursor.rowcount > 0, retry
+
+    def release(self, job, owner):
+        """worker 退出时归还未完成的任务（不计失败次数）"""
+        cursor = self.execute(
+            "UPDATE jobs SET state = 'pending', stage = ?, payload = ?, lease_owner = NULL, lease_expires = NULL, "
+            "updated_at = ? WHERE id = ? AND lease_owner = ?",
+            (job["stage"], json.dumps(job["payload"], ensure_ascii=False), time.time(), job["id"], owner),
+        )
+        return cursor.rowcount > 0
+
+    def retry_failed(self, keys=None):
+        """将失败的任务从失败阶段重新排队"""
+        sql = "UPDATE jobs SET state = 'pending', attempts = 0, not_before = 0, finished_at = NULL, updated_at = ? WHERE state = 'failed'"
+        params = [time.time()]
+        if keys:
+            sql += f" AND key IN ({','.join('?' * len(keys))})"
+            params += list(keys)
+        return self.execute(sql, params).rowcount
+
+    def purge(self, state="done"):
+        return self.execute("DELETE FROM jobs WHERE state = ?", (state,)).rowcount
+
+    def stats(self):
+        """
+        Returns:
+            队列深度、运行中任务和吞吐统计
+        """
+        now = time.time()
+        counts = {row["state"]: row["n"] for row in self.execute(
+            "SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")}
+        stages = {row["stage"]: row["n"] for row in self.execute(
+            "SELECT stage, COUNT(*) AS n FROM jobs WHERE state = 'pending' GROUP BY stage")}
+        delayed = self.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'pending' AND not_before > ?", (now,)).fetchone()[0]
+        oldest = self.execute(
+            "SELECT MIN(created_at) FROM jobs WHERE state = 'pending'").fetchone()[0]
+        running = [dict(row) for row in self.execute(
+            "SELECT key, stage, lease_owner, lease_expires FROM jobs WHERE state = 'running' ORDER BY updated_at")]
+        throughput = {}
+        for label, seconds in (("1h", 3600), ("24h", 86400)):
+            throughput[label] = self.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'done' AND finished_at >= ?", (now - seconds,)).fetchone()[0]
+        durations = self.execute(
+            "SELECT AVG(finished_at - created_at) FROM jobs WHERE state = 'done' AND finished_at >= ?",
+            (now - 86400,)).fetchone()[0]
+        return {
+            "counts": counts,
+            "pending_by_stage": stages,
+            "delayed": delayed,
+            "oldest_pending": now - oldest if oldest else None,
+            "running": running,
+            "done_last": throughput,
+            "avg_latency_24h": durations,
+        }
+
+class QueueWorker:
+    """
+    从队列领取任务并逐阶段执行
+
+    领取后启动心跳线程定期续约；阶段成功后记录进度，失败时交给队列按阶段退避重试。
+    """
+
+    def __init__(self, job_queue, pipeline, owner=None, poll_interval=10, backoff=60):
+        """
+        Args:
+            job_queue: JobQueue
+            pipeline: 提供各阶段实现的 Pipeline（应以 retries=1 创建）
+            owner: worker 标识，默认 主机名:进程号:线程名
+            poll_interval: 队列为空时的轮询间隔（秒）
+            backoff: 首次重试的等待时间（秒），之后每次翻倍
+        """
+        self.queue = job_queue
+        self.pipeline = pipeline
+        self.owner = owner or default_owner()
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self.stages = [name for name, _, _ in pipeline.stages]
+        self.functions = {
+            "download": pipeline.download,
+            "transcribe": pipeline.transcribe,
+            "merge": pipeline.merge,
+            "sync": pipeline.sync,
+        }
+        self.stopping = threading.Event()
+
+    def log(self, job, message, level="INFO"):
+        print(f"[{level}] [{self.owner}] [{job['key']}] {message}", flush=True)
+
+    def run(self, drain=False, max_jobs=None):
+        """
+        循环处理任务
+
+        Args:
+            drain: 队列中没有可运行任务时退出（否则持续等待新任务）
+            max_jobs: 最多处理的任务数
+
+        Returns:
+            处理的任务数
+        """
+        processed = 0
+        while not self.stopping.is_set():
+            if max_jobs is not None and processed >= max_jobs:
+                break
+            job = self.queue.claim(self.owner)
+            if job is None:
+                if drain:
+                    break
+                self.stopping.wait(self.poll_interval)
+                continue
+            self.process(job)
+            processed += 1
+        return processed
+
+    def heartbeat(self, job, stop, lost):
+        while not stop.wait(self.queue.lease_seconds / 3):
+            if not self.queue.heartbeat(job, self.owner):
+                lost.set()
+                return
+
+    def to_pipeline_job(self, job):
+        """队列任务 -> pipeline 阶段函数使用的任务字典"""
+        payload = job["payload"]
+        return {
+            "input": job["input"],
+            "episode_id": job["episode_id"],
+            "episode_dir": Path(payload["episode_dir"]) if payload.get("episode_dir") else None,
+            "audio": Path(payload["audio"]) if payload.get("audio") else None,
+        }
+
+    def resume_stage(self, job, work):
+        """
+        确定从哪个阶段继续
+
+        上一个 worker 在其他节点上完成了下载但播客目录不在共享存储上时，从下载阶段重新开始。
+        """
+        stage = job["stage"] if job["stage"] in self.stages else self.stages[0]
+        if stage != "download":
+            missing = work["episode_dir"] is None or not work["episode_dir"].is_dir()
+            if stage == "transcribe" and (work["audio"] is None or not work["audio"].exists()):
+                missing = True
+            if missing:
+                self.log(job, f"本机没有 {stage} 阶段所需的文件，从下载阶段重新开始", "WARN")
+                stage = "download"
+        return stage
+
+    def record_paths(self, job, work):
+        """阶段写出的播客目录和音频路径存入 payload，下次从该阶段继续时使用"""
+        for key in ("episode_dir", "audio"):
+            if work.get(key):
+                job["payload"][key] = str(work[key])
+
+    def process(self, job):
+        stop = threading.Event()
+        lost = threading.Event()
+        beat = threading.Thread(target=self.heartbeat, args=(job, stop, lost), daemon=True)
+        beat.start()
+
+        work = self.to_pipeline_job(job)
+        # 租约丢失时心跳线程设置 lost，正在运行的子脚本和下载随之中止
+        work["cancel"] = lost
+        stage = self.resume_stage(job, work)
+        timings = job["payload"].setdefault("timings", {})
+        try:
+            for name in self.stages[self.stages.index(stage):]:
+                if lost.is_set():
+                    self.log(job, "租约已被其他 worker 接管，放弃任务", "WARN")
+                    return
+                if self.stopping.is_set():
+                    job["stage"] = name
+                    if self.queue.release(job, self.owner):
+                        self.log(job, f"worker 退出，任务归还队列（{name} 阶段）")
+                    else:
+                        self.log(job, "worker 退出，租约已被其他 worker 接管", "WARN")
+                    return
+
+                self.log(job, f"{name} 开始")
+                started = time.time()
+                try:
+                    self.functions[name](work)
+                except Exception as e:
+                    self.record_paths(job, work)
+                    if lost.is_set():
+                        self.log(job, f"租约已被其他 worker 接管，{name} 已中止", "WARN")
+                        return
+                    written, retry = self.queue.fail(job, self.owner, f"{name}: {e}", self.backoff)
+                    if not written:
+                        self.log(job, f"{name} 失败，但租约已被其他 worker 接管，不记录: {e}", "WARN")
+                    elif retry:
+                        delay = self.backoff * 2 ** job["attempts"]
+                        self.log(job, f"{name} 失败（第 {job['attempts'] + 1} 次），{delay:.0f}s 后重试: {e}", "WARN")
+                    else:
+                        self.log(job, f"{name} 失败，已达最大尝试次数: {e}", "ERROR")
+                    return
+                self.record_paths(job, work)
+
+                timings[name] = time.time() - started
+                self.log(job, f"{name} 完成 ({timings[name]:.1f}s)")
+                following = self.stages.index(name) + 1
+                if following < len(self.stages):
+                    if not self.queue.advance(job, self.owner, self.stages[following]):
+                        self.log(job, f"租约已被其他 worker 接管，{name} 的结果不记录", "WARN")
+                        return
+                    job["attempts"] = 0
+
+            if not self.queue.complete(job, self.owner):
+                self.log(job, "租约已被其他 worker 接管，完成状态不记录", "WARN")
+        finally:
+            stop.set()
+            beat.join()
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+def cmd_enqueue(job_queue, args):
+    inputs = list(args.inputs)
+    if args.file:
+        inputs.extend(read_inputs(args.file))
+    priority = args.priority if args.priority is not None else (PRIORITY_BACKFILL if args.backfill else PRIORITY_NEW)
+    added = job_queue.enqueue(inputs, priority=priority, max_attempts=args.max_attempts, requeue=args.requeue)
+    print(f"[INFO] 已加入队列: {added} 期（跳过 {len(inputs) - added} 期已在队列中的节目）")
+    return 0
+
+def cmd_worker(job_queue, args):
+    if args.pack > 1:
+        # 队列按节目逐期领取、逐阶段推进，无法跨节目打包；转录脚本也不接受打包专用参数
+        raise ValueError("worker 逐期转录，不支持 --pack；跨节目打包请使用 pipeline.py --pack")
+    pipeline = pipeline_from_args(args, retries=1)
+    workers = [
+        QueueWorker(
+            JobQueue(args.db, lease_seconds=args.lease),
+            pipeline,
+            owner=f"{default_owner()}:{index}",
+            poll_interval=args.poll_interval,
+            backoff=args.backoff,
+        )
+        for index in range(args.workers)
+    ]
+    threads = [
+        threading.Thread(target=worker.run, kwargs={"drain": args.drain}, daemon=True)
+        for worker in workers
+    ]
+    print(f"[INFO] 启动 {len(workers)} 个 worker（{default_owner()}），阶段: {' → '.join(workers[0].stages)}")
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(1)
+    except KeyboardInterrupt:
+        print("\n[INFO] 正在停止：当前阶段完成后归还任务（再次 Ctrl-C 强制退出）")
+        for worker in workers:
+            worker.stopping.set()
+        for thread in threads:
+            thread.join()
+    return 0
+
+def cmd_status(job_queue, args):
+    stats = job_queue.stats()
+    if args.json:
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        return 0
+
+    counts = stats["counts"]
+    print(f"队列: {args.db}")
+    print(f"等待: {counts.get('pending', 0)}（其中退避中 {stats['delayed']}，最久已等待 {format_duration(stats['oldest_pending'])}）")
+    if stats["pending_by_stage"]:
+        print("  按阶段: " + ", ".join(f"{stage} {n}" for stage, n in stats["pending_by_stage"].items()))
+    print(f"运行: {counts.get('running', 0)}")
+    now = time.time()
+    for job in stats["running"]:
+        remaining = job["lease_expires"] - now
+        lease = f"租约剩余 {format_duration(remaining)}" if remaining > 0 else "租约已过期，等待回收"
+        print(f"  {job['key']}  {job['stage']:<10s} {job['lease_owner']}  {lease}")
+    print(f"完成: {counts.get('done', 0)}（最近 1 小时 {stats['done_last']['1h']}，24 小时 {stats['done_last']['24h']}）")
+    print(f"失败: {counts.get('failed', 0)}")
+    if stats["avg_latency_24h"] is not None:
+        print(f"平均耗时（入队到完成，24 小时内）: {format_duration(stats['avg_latency_24h'])}")
+
+    if args.failed:
+        for row in job_queue.execute("SELECT key, stage, attempts, error FROM jobs WHERE state = 'failed'"):
+            first_line = (row["error"] or "").splitlines()[0] if row["error"] else ""
+            print(f"  ✗ {row['key']}  {row['stage']}  {first_line}")
+    return 0
+
+def cmd_retry(job_queue, args):
+    count = job_queue.retry_failed(args.keys)
+    print(f"[INFO] 已重新排队: {count} 期")
+    return 0
+
+def cmd_purge(job_queue, args):
+    count = job_queue.purge(args.state)
+    print(f"[INFO] 已删除 {args.state} 任务: {count} 条")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="小宇宙播客持久化任务队列（多机 worker、优先级、租约、按阶段重试）"
+    )
+
+    parser.add_argument(
+        "--db",
+        default=str(DEFAULT_DB),
+        help=f"队列数据库路径，多机共享时放在共享文件系统上（默认 {DEFAULT_DB}）"
+    )
+
+    parser.add_argument("--lease", type=int, default=300, help="租约时长（秒，默认 300），心跳间隔为其 1/3")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="加入任务")
+    enqueue_parser.add_argument("inputs", nargs="*", help="URL、Episode ID 或已下载的播客目录")
+    enqueue_parser.add_argument("--file", help="输入列表文件（每行一个，- 表示标准输入）")
+    enqueue_parser.add_argument("--backfill", action="store_true", help=f"历史节目，低优先级（{PRIORITY_BACKFILL}，新节目为 {PRIORITY_NEW}）")
+    enqueue_parser.add_argument("--priority", type=int, help="指定优先级（数值大的先处理）")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=3, help="每个阶段最多尝试次数（默认 3）")
+    enqueue_parser.add_argument("--requeue", action="store_true", help="已完成或已失败的节目重新处理")
+    enqueue_parser.set_defaults(func=cmd_enqueue)
+
+    worker_parser = subparsers.add_parser("worker", help="启动 worker 消费队列")
+    worker_parser.add_argument("--workers", type=int, default=1, help="本机 worker 数（默认 1，每个 worker 单独加载转录模型）")
+    worker_parser.add_argument("--drain", action="store_true", help="队列中没有可运行任务时退出")
+    worker_parser.add_argument("--poll-interval", type=int, default=10, help="队列为空时的轮询间隔（秒，默认 10）")
+    worker_parser.add_argument("--backoff", type=int, default=60, help="首次重试等待（秒，默认 60，之后每次翻倍）")
+    add_pipeline_arguments(worker_parser)
+    worker_parser.set_defaults(func=cmd_worker)
+
+    status_parser = subparsers.add_parser("status", help="队列深度、运行中任务和吞吐")
+    status_parser.add_argument("--failed", action="store_true", help="列出失败的任务")
+    status_parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    status_parser.set_defaults(func=cmd_status)
+
+    retry_parser = subparsers.add_parser("retry", help="失败的任务从失败阶段重新排队")
+    retry_parser.add_argument("keys", nargs="*", help="Episode ID（默认全部失败任务）")
+    retry_parser.set_defaults(func=cmd_retry)
+
+    purge_parser = subparsers.add_parser("purge", help="删除已结束的任务记录")
+    purge_parser.add_argument("--state", choices=["done", "failed"], default="done", help="删除的状态（默认 done）")
+    purge_parser.set_defaults(func=cmd_purge)
+
+    args = parser.parse_args()
+
+    job_queue = JobQueue(args.db, lease_seconds=args.lease)
+    try:
+        sys.exit(args.func(job_queue, args))
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    finally:
+        job_queue.close()
+
+if __name__ == "__main__":
+    main()
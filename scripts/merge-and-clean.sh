@@ -4,6 +4,8 @@
 
 set -e
 
+SCRIPTS_DIR="$HOME/.claude/skills/xiaoyuzhou-podcast/scripts"
+
 # 颜色输出
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -84,11 +86,13 @@ cleanup_cache() {
 
     echo_info "正在清理临时文件..."
 
-    # 删除整个 .cache 目录
+    # 删除整个 .cache 目录，音频先保留到全局音频存储（按磁盘预算淘汰），供重新转录复用
     if [ -d "$cache_dir" ]; then
+        if ! python3 "$SCRIPTS_DIR/audio_store.py" stash "$cache_dir"; then
+            echo_warn "音频未能保留到音频存储"
+        fi
         rm -rf "$cache_dir"
         echo_info "缓存目录已完全删除: $cache_dir"
-        echo_info "已节省音频和临时文件占用空间"
     else
         echo_info "缓存目录不存在，无需清理"
     fi
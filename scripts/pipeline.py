@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+
+"""
+小宇宙播客批量处理流水线
+多期节目按 下载 → 转录 → 索引 → 合并清理 → (可选) Notion 同步 流水线并行处理：
+转录当前节目时继续下载后续节目，合并和同步在后台进行
+每个阶段的并发数可单独配置，已下载未清理的节目数量有上限，避免音频缓存占满磁盘
+"""
+
+import argparse
+import json
+import os
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from audio_store import open_store
+from downloader import DownloadCancelled, DownloadError, Downloader, audio_destination, parse_size
+from search_index import DEFAULT_DB, connect, index_episode
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_OUTPUT_ROOT = Path.home() / "Research" / "Podcast"
+
+# 阶段结束信号
+_STOP = object()
+
+def parse_episode_input(value):
+    """
+    规范化输入：URL、Episode ID 或已下载的播客目录
+
+    Returns:
+        (episode_id 或 None, 原始输入)
+    """
+    value = value.strip()
+    if os.path.isdir(value):
+        match = re.search(r'[0-9a-f]{24}', os.path.basename(value.rstrip('/')))
+        return (match.group(0) if match else None), value
+    match = re.search(r'[0-9a-f]{24}', value)
+    if not match:
+        raise ValueError(f"无效的 URL 或 Episode ID: {value}")
+    return match.group(0), value
+
+def read_inputs(path):
+    """读取输入列表文件（每行一个 URL/ID，# 开头为注释，- 表示标准输入）"""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        return [line.strip() for line in stream if line.strip() and not line.startswith("#")]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def downloader_retries(retries):
+    """最多尝试次数 -> Downloader 的参数（Downloader 的 retries 是失败后的重试次数）"""
+    return {} if retries is None else {"retries": max(0, retries - 1)}
+
+def find_audio(cache_dir):
+    """在缓存目录中查找音频文件"""
+    for pattern in ("*.m4a", "*.mp3", "*.opus"):
+        matches = sorted(Path(cache_dir).glob(pattern))
+        if matches:
+            return matches[0]
+    return None
+
+class StageError(Exception):
+    """某个阶段处理失败"""
+
+class StageCancelled(StageError):
+    """阶段被调用方中止（例如任务队列中租约已被其他 worker 接管）"""
+
+def run_script(args, label, env=None, cancel=None):
+    """
+    运行子脚本，成功时静默，失败时输出最后 20 行日志
+
+    Args:
+        args: 命令行
+        label: 出错时显示的名称
+        env: 额外的环境变量
+        cancel: threading.Event，设置后终止子进程
+
+    Returns:
+        子进程标准输出
+
+    Raises:
+        StageCancelled: cancel 已设置，子进程已终止
+        StageError: 子进程退出码非 0
+    """
+    process = subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env={**os.environ, **env} if env else None,
+    )
+    while True:
+        try:
+            # communicate 超时后可以再次调用，已读取的输出不会丢失
+            stdout, _ = process.communicate(timeout=None if cancel is None else 1)
+            break
+        except subprocess.TimeoutExpired:
+            if not cancel.is_set():
+                continue
+            process.terminate()
+            try:
+                process.communicate(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+            raise StageCancelled(f"{label} 已中止")
+    if process.returncode != 0:
+        tail = "\n".join(stdout.splitlines()[-20:])
+        raise StageError(f"{label} 退出码 {process.returncode}\n{tail}")
+    return stdout
+
+class Pipeline:
+    """
+    多阶段流水线
+
+    每个阶段由若干工作线程组成，阶段之间用有界队列连接；
+    max_cached 限制同时占用 .cache 的节目数（下载开始时占用，合并清理或失败时释放），
+    下载线程在名额用尽时阻塞，从而对上游形成反压。
+    """
+
+    def __init__(self, output_root=DEFAULT_OUTPUT_ROOT, download_workers=2,
+                 transcribe_workers=1, merge_workers=1, sync_workers=1,
+                 max_cached=3, transcribe_args=None, enhanced=True,
+                 index_db=DEFAULT_DB, notion=None, downloader=None, audio_store=None,
+                 pack=1, retries=None, profile=False, archive=False):
+        """
+        Args:
+            output_root: 播客根目录
+            download_workers: 并发下载数
+            transcribe_workers: 并发转录数（每个转录进程都会加载一份模型）
+            merge_workers: 并发索引/合并数
+            sync_workers: 并发 Notion 同步数
+            max_cached: 最多同时保留音频缓存的节目数
+            transcribe_args: 传给转录脚本的额外参数列表
+            enhanced: 使用 transcribe_enhanced.py（否则使用 transcribe.py）
+            index_db: 检索索引路径，None 表示跳过索引
+            notion: (token, database_id)，None 表示不同步
+            downloader: 共享的 Downloader（全局连接数/带宽上限），默认新建
+            audio_store: 音频存储，已处理过的节目直接复用音频，默认使用全局存储
+            pack: 大于 1 时转录线程一次取走队列中已就绪的最多 pack 期，
+                用 batch_transcribe.py 跨节目打包转录（不做说话人分离）
+            retries: 子脚本和默认 Downloader 的最多尝试次数（download.sh 下载、音频下载、
+                模型加载和转录），None 使用各自的默认值；任务队列中设为 1，失败后由队列按阶段重试
+            profile: 转录时做性能剖析，结果写入节目目录的 .profile
+                （打包转录写入 <output_root>/.profile/batch-<时间>）
+            archive: 合并清理前写入压缩归档（archive.py，保留逐字时间戳）
+        """
+        self.output_root = Path(output_root)
+        self.transcribe_args = list(transcribe_args or [])
+        self.enhanced = enhanced
+        self.index_db = index_db
+        self.notion = notion
+        self.downloader = downloader or Downloader(quiet=True, **downloader_retries(retries))
+        self.audio_store = audio_store or open_store()
+        self.cache_slots = threading.BoundedSemaphore(max_cached)
+        self.pack = max(1, pack)
+        self.profile = profile
+        self.archive = archive
+        self.env = None
+        if retries is not None:
+            self.env = {"XYZ_RETRIES": str(retries)}
+            self.transcribe_args += ["--retries", str(retries)]
+
+        self.stages = [
+            ("download", self.download, download_workers),
+            ("transcribe", self.transcribe_packed if self.pack > 1 else self.transcribe, transcribe_workers),
+            ("merge", self.merge, merge_workers),
+        ]
+        if notion:
+            self.stages.append(("sync", self.sync, sync_workers))
+
+        self.lock = threading.Lock()
+        self.jobs = []
+
+    def log(self, job, message):
+        with self.lock:
+            print(f"[INFO] [{job['episode_id'] or job['input']}] {message}", flush=True)
+
+    # ---- 各阶段实现 ----
+
+    def download(self, job):
+        """
+        下载 Show Notes（download.sh）和音频（共享 Downloader），已有目录直接跳过
+
+        所有下载线程共用同一个 Downloader，连接数和带宽上限对整个流水线生效。
+        """
+        if os.path.isdir(job["input"]):
+            job["episode_dir"] = Path(job["input"])
+        else:
+            output = run_script(
+                [str(SCRIPTS_DIR / "download.sh"), "--notes-only", job["input"], str(self.output_root)],
+                "download.sh",
+                env=self.env,
+                cancel=job.get("cancel"),
+            )
+            match = re.search(r'===EPISODE_DIR:(.*)===', output)
+            if not match:
+                raise StageError("下载输出中未找到播客目录")
+            job["episode_dir"] = Path(match.group(1))
+
+        cache_dir = job["episode_dir"] / ".cache"
+        job["audio"] = find_audio(cache_dir)
+        if job["audio"] is None:
+            show_notes = [p for p in sorted(cache_dir.glob("*.md")) if not p.name.endswith("_formatted.md")]
+            if not show_notes:
+                raise StageError(f"未找到 Show Notes: {cache_dir}")
+            if job["episode_id"]:
+                job["audio"] = self.audio_store.get(job["episode_id"], cache_dir, name=show_notes[0].stem)
+                if job["audio"]:
+                    self.log(job, "复用音频存储中的音频")
+                    return
+            try:
+                job["audio"] = self.downloader.fetch(*audio_destination(show_notes[0]), cancel=job.get("cancel"))
+            except DownloadCancelled as e:
+                raise StageCancelled(f"音频下载已中止: {e}")
+            except DownloadError as e:
+                raise StageError(f"音频下载失败: {e}")
+
+    def transcribe(self, job):
+        """ASR 转录"""
+        script = "transcribe_enhanced.py" if self.enhanced else "transcribe.py"
+        args = [sys.executable, str(SCRIPTS_DIR / script), "--audio", str(job["audio"])] + self.transcribe_args
+        if self.profile:
+            # .cache 合并后会删除，剖析结果放在节目目录
+            args += ["--profile", str(job["episode_dir"] / ".profile")]
+        run_script(args, script, cancel=job.get("cancel"))
+
+    def transcribe_packed(self, jobs):
+        """
+        多期合并转录：所有节目的语音片段一起按长度打包成批次
+
+        Returns:
+            与 jobs 对应的错误列表，成功的节目为 None
+        """
+        error = None
+        fd, status_file = tempfile.mkstemp(prefix="batch-status-", suffix=".json")
+        os.close(fd)
+        args = ([sys.executable, str(SCRIPTS_DIR / "batch_transcribe.py"), "--audio"]
+                + [str(job["audio"]) for job in jobs] + self.transcribe_args
+                + ["--status-json", status_file])
+        if self.profile:
+            args += ["--profile", str(self.output_root / ".profile" / time.strftime("batch-%Y%m%d-%H%M%S"))]
+        try:
+            # 同一批节目共用一个子进程，按第一期的取消信号终止
+            run_script(args, "batch_transcribe.py", cancel=jobs[0].get("cancel"))
+        except StageError as e:
+            error = e
+
+        # 部分节目失败时退出码非 0，按脚本输出的逐期状态判断
+        try:
+            with open(status_file, "r", encoding="utf-8") as f:
+                statuses = {entry["audio"]: entry for entry in json.load(f)}
+        except (OSError, ValueError):
+            statuses = {}
+        finally:
+            os.unlink(status_file)
+
+        errors = []
+        for job in jobs:
+            entry = statuses.get(str(job["audio"]))
+            if entry is None:
+                errors.append(error or StageError("batch_transcribe.py 未输出该期状态"))
+            elif entry["status"] == "done":
+                errors.append(None)
+            else:
+                errors.append(StageError(entry["error"]))
+        return errors
+
+    def merge(self, job):
+        """写入检索索引和归档，然后合并文档并清理缓存"""
+        if self.index_db:
+            conn = connect(self.index_db)
+            try:
+                index_episode(conn, job["episode_dir"])
+            except ValueError as e:
+                self.log(job, f"索引跳过: {e}")
+            finally:
+                conn.close()
+
+        if self.archive:
+            # 归档失败不影响合并，之后可以从 README.md 补归档（没有时间戳）
+            try:
+                run_script([sys.executable, str(SCRIPTS_DIR / "archive.py"), "add", str(job["episode_dir"])], "archive.py",
+                           cancel=job.get("cancel"))
+            except StageCancelled:
+                raise
+            except StageError as e:
+                self.log(job, f"归档跳过: {str(e).splitlines()[-1]}")
+
+        run_script([str(SCRIPTS_DIR / "merge-and-clean.sh"), str(job["episode_dir"])], "merge-and-clean.sh",
+                   cancel=job.get("cancel"))
+        self.release(job)
+
+    def sync(self, job):
+        """同步到 Notion"""
+        token, database_id = self.notion
+        run_script(
+            [sys.executable, str(SCRIPTS_DIR / "sync-to-notion.py"),
+             "--file", str(job["episode_dir"] / "README.md"),
+             "--token", token, "--database-id", database_id],
+            "sync-to-notion.py",
+            cancel=job.get("cancel"),
+        )
+
+    # ---- 调度 ----
+
+    def release(self, job):
+        """释放音频缓存名额"""
+        if job.pop("cache_slot", False):
+            self.cache_slots.release()
+
+    def worker(self, name, func, inbox, outbox):
+        batch = self.pack if name == "transcribe" else 1
+        while True:
+            job = inbox.get()
+            if job is _STOP:
+                return
+
+            if name == "download":
+                # 占用缓存名额后才开始下载；名额用尽时阻塞形成反压
+                self.cache_slots.acquire()
+                job["cache_slot"] = True
+
+            # 打包转录：顺带取走队列中已经就绪的节目，不等待
+            jobs = [job]
+            stopped = False
+            while len(jobs) < batch:
+                try:
+                    job = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if job is _STOP:
+                    stopped = True
+                    break
+                jobs.append(job)
+
+            started = time.time()
+            if batch > 1:
+                try:
+                    errors = func(jobs)
+                except Exception as e:
+                    errors = [e] * len(jobs)
+            else:
+                try:
+                    func(jobs[0])
+                    errors = [None]
+                except Exception as e:
+                    errors = [e]
+            elapsed = time.time() - started
+
+            for job, error in zip(jobs, errors):
+                if error is not None:
+                    self.release(job)
+                    job["status"] = "failed"
+                    job["error"] = f"{name}: {error}"
+                    with self.lock:
+                        print(f"[ERROR] [{job['episode_id'] or job['input']}] {name} 失败: {error}", flush=True)
+                    continue
+
+                job["timings"][name] = elapsed
+                if len(jobs) > 1:
+                    self.log(job, f"{name} 完成 ({elapsed:.1f}s，{len(jobs)} 期合并)")
+                else:
+                    self.log(job, f"{name} 完成 ({elapsed:.1f}s)")
+
+                if outbox is None:
+                    self.release(job)
+                    job["status"] = "done"
+                else:
+                    outbox.put(job)
+
+            if stopped:
+                return
+
+    def run(self, inputs):
+        """
+        处理一批输入，阻塞直到全部完成（可多次调用，每次返回本批任务）
+
+        Args:
+            inputs: URL、Episode ID 或播客目录列表
+
+        Returns:
+            任务列表，每项包含 status（done/failed）、timings 和 error
+        """
+        self.jobs = []
+        seen = set()
+        for value in inputs:
+            episode_id, value = parse_episode_input(value)
+            key = episode_id or value
+            if key in seen:
+                continue
+            seen.add(key)
+            self.jobs.append({
+                "input": value,
+                "episode_id": episode_id,
+                "status": "pending",
+                "timings": {},
+                "error": None,
+            })
+
+        queues = [
+            queue.Queue(maxsize=max(1, workers, self.pack if name == "transcribe" else 1))
+            for name, _, workers in self.stages
+        ]
+        threads = []
+        for index, (name, func, workers) in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            stage_threads = [
+                threading.Thread(target=self.worker, args=(name, func, queues[index], outbox), daemon=True)
+                for _ in range(workers)
+            ]
+            for thread in stage_threads:
+                thread.start()
+            threads.append(stage_threads)
+
+        for job in self.jobs:
+            queues[0].put(job)
+
+        # 按阶段顺序关闭：上游全部退出后再通知下游
+        for index, (_, _, workers) in enumerate(self.stages):
+            for _ in range(workers):
+                queues[index].put(_STOP)
+            for thread in threads[index]:
+                thread.join()
+
+        return self.jobs
+
+def print_summary(jobs, elapsed):
+    """输出处理汇总"""
+    done = [job for job in jobs if job["status"] == "done"]
+    failed = [job for job in jobs if job["status"] != "done"]
+
+    print("\n" + "="*50)
+    print(f"[SUCCESS] 完成 {len(done)}/{len(jobs)} 期，总耗时 {elapsed:.1f}s")
+    print("="*50)
+
+    for job in done:
+        timings = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in job["timings"].items())
+        print(f"  ✓ {job['episode_dir'].name}  ({timings})")
+    for job in failed:
+        first_line = (job["error"] or "未处理").splitlines()[0]
+        print(f"  ✗ {job['episode_id'] or job['input']}  {first_line}")
+
+def add_pipeline_arguments(parser):
+    """添加流水线参数（pipeline.py 和 feed_watch.py 共用）"""
+    parser.add_argument(
+        "--output-root",
+        default=str(DEFAULT_OUTPUT_ROOT),
+        help=f"播客根目录（默认 {DEFAULT_OUTPUT_ROOT}）"
+    )
+
+    parser.add_argument("--download-workers", type=int, default=2, help="并发下载数（默认 2）")
+    parser.add_argument("--transcribe-workers", type=int, default=1, help="并发转录数（默认 1，每个进程单独加载模型）")
+    parser.add_argument("--merge-workers", type=int, default=1, help="并发合并数（默认 1）")
+    parser.add_argument("--sync-workers", type=int, default=1, help="并发 Notion 同步数（默认 1）")
+
+    parser.add_argument("--connections", type=int, default=4, help="单个音频最多连接数（默认 4）")
+    parser.add_argument("--max-connections", type=int, default=8, help="全局最大下载连接数（默认 8）")
+    parser.add_argument("--limit-rate", help="全局下载带宽上限，如 2M（字节/秒）")
+
+    parser.add_argument(
+        "--max-cached",
+        type=int,
+        default=3,
+        help="最多同时保留音频缓存的节目数（默认 3），用于限制磁盘占用"
+    )
+
+    parser.add_argument("--basic", action="store_true", help="使用 transcribe.py（不做说话人分离和分段）")
+    parser.add_argument("--hotword", default="", help="热词（用空格分隔）")
+    parser.add_argument("--batch-size", type=int, default=300, help="批处理大小（秒）")
+    parser.add_argument("--no-diarization", action="store_true", help="禁用说话人分离")
+    parser.add_argument(
+        "--pack",
+        type=int,
+        default=1,
+        help="转录时把已就绪的最多 N 期合并，跨节目打包 VAD 片段（batch_transcribe.py，不做说话人分离），适合大量短节目"
+    )
+    parser.add_argument("--no-index", action="store_true", help="不更新全文检索索引")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="转录时做性能剖析（CPU 调用栈采样、各阶段内存峰值），结果写入节目目录的 .profile"
+    )
+    parser.add_argument("--archive", action="store_true", help="合并清理前写入压缩归档（archive.py，需要 zstandard）")
+
+    parser.add_argument("--notion", action="store_true", help="同步到 Notion")
+    parser.add_argument("--token", help="Notion Integration Token (或环境变量 NOTION_TOKEN)")
+    parser.add_argument("--database-id", help="Notion Database ID (或环境变量 NOTION_DATABASE_ID)")
+
+def pipeline_from_args(args, retries=None):
+    """
+    根据 add_pipeline_arguments() 的参数创建流水线
+
+    Args:
+        args: 命令行参数
+        retries: 子脚本和音频下载的最多尝试次数（见 Pipeline），None 使用各自的默认值
+
+    Raises:
+        ValueError: 参数无效（限速格式错误、Notion 缺少凭据、音频存储环境变量无效）
+    """
+    transcribe_args = ["--batch-size", str(args.batch_size)]
+    if args.hotword:
+        transcribe_args += ["--hotword", args.hotword]
+    if args.pack > 1:
+        if not args.basic:
+            transcribe_args.append("--segmentation")
+        if args.max_cached < args.pack:
+            print(f"[WARN] --max-cached ({args.max_cached}) 小于 --pack ({args.pack})，每批最多只能合并 {args.max_cached} 期")
+    elif args.no_diarization and not args.basic:
+        transcribe_args.append("--no-diarization")
+
+    downloader = Downloader(
+        max_connections=args.max_connections,
+        connections_per_file=args.connections,
+        rate_limit=parse_size(args.limit_rate),
+        quiet=True,
+        **downloader_retries(retries),
+    )
+
+    notion = None
+    if args.notion:
+        token = args.token or os.getenv("NOTION_TOKEN")
+        database_id = args.database_id or os.getenv("NOTION_DATABASE_ID")
+        if not token or not database_id:
+            raise ValueError("Notion 同步需要 --token 和 --database-id（或对应环境变量）")
+        notion = (token, database_id)
+
+    return Pipeline(
+        output_root=args.output_root,
+        download_workers=args.download_workers,
+        transcribe_workers=args.transcribe_workers,
+        merge_workers=args.merge_workers,
+        sync_workers=args.sync_workers,
+        max_cached=args.max_cached,
+        transcribe_args=transcribe_args,
+        enhanced=not args.basic,
+        index_db=None if args.no_index else DEFAULT_DB,
+        notion=notion,
+        downloader=downloader,
+        audio_store=open_store(),
+        pack=args.pack,
+        retries=retries,
+        profile=args.profile,
+        archive=args.archive,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="小宇宙播客批量处理流水线（下载/转录/合并并行）"
+    )
+
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="URL、Episode ID 或已下载的播客目录"
+    )
+
+    parser.add_argument(
+        "--file",
+        help="输入列表文件（每行一个，- 表示标准输入）"
+    )
+
+    add_pipeline_arguments(parser)
+
+    args = parser.parse_args()
+
+    inputs = list(args.inputs)
+    if args.file:
+        inputs.extend(read_inputs(args.file))
+    if not inputs:
+        parser.error("需要至少一个 URL、Episode ID 或 --file")
+
+    try:
+        pipeline = pipeline_from_args(args)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    print("="*50)
+    print("小宇宙播客批量处理流水线")
+    print("="*50)
+    print(f"节目数量: {len(inputs)}")
+    print("并发: " + ", ".join(f"{name}={workers}" for name, _, workers in pipeline.stages))
+    print(f"缓存上限: {args.max_cached} 期")
+    print()
+
+    started = time.time()
+    try:
+        jobs = pipeline.run(inputs)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    print_summary(jobs, time.time() - started)
+    sys.exit(0 if all(job["status"] == "done" for job in jobs) else 1)
+
+if __name__ == "__main__":
+    main()
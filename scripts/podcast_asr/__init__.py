@@ -0,0 +1,69 @@
+"""
+小宇宙播客 ASR 转录 API（基于 FunASR paraformer-zh）
+
+进程内调用，返回结构化结果，失败时抛出 TranscriptionError：
+
+    from podcast_asr import load_model, transcribe, write_outputs
+
+    model = load_model()                      # 加载一次，多期复用
+    result = transcribe("episode.m4a", model=model, hotword="稳定币")
+    print(result.text, result.timestamps[:3], result.durations())
+    write_outputs(result, ".cache", formatted=True)
+
+进度通过 logging（logger 名 podcast_asr）输出；transcribe.py、transcribe_enhanced.py
+和 batch_transcribe.py 是这里的命令行封装。
+
+性能剖析：在 Profiler 中运行，各阶段的调用栈采样和内存峰值写入指定目录：
+
+    with Profiler() as profiler:
+        result = transcribe("episode.m4a", model=model)
+    profiler.write("episode_profile")
+"""
+
+import importlib
+
+# 公开名称 -> 所在子模块。按需导入：只用文本工具（如 search_index.py 使用
+# podcast_asr.text）时不会加载 torch / funasr
+_EXPORTS = {
+    "load_batch_models": "batch",
+    "merge_segment_results": "batch",
+    "pack_segments": "batch",
+    "transcribe_batch": "batch",
+    "finish_profile": "cli",
+    "print_summary": "cli",
+    "retry_options": "cli",
+    "check_device": "core",
+    "configure_logging": "core",
+    "load_model": "core",
+    "report_timings": "core",
+    "split_threads": "core",
+    "transcribe": "core",
+    "AudioNotFoundError": "errors",
+    "EmptyResultError": "errors",
+    "ModelLoadError": "errors",
+    "TranscriptionError": "errors",
+    "default_output_dir": "output",
+    "default_profile_dir": "output",
+    "write_outputs": "output",
+    "write_timestamps": "output",
+    "Profiler": "profiling",
+    "profile_stage": "profiling",
+    "SpeakerTurn": "result",
+    "TranscriptionResult": "result",
+    "format_speaker_dialogue": "text",
+    "format_timestamp": "text",
+    "smart_segment_text": "text",
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
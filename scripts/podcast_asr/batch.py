@@ -0,0 +1,190 @@
+"""
+跨节目打包转录
+多期节目先分别做 VAD，再把所有语音片段按长度排序、打包成满额的 batch_size_s 批次
+送入 paraformer-zh，最后按节目拆回文本和时间戳并分别恢复标点
+打包和拆分规则与 FunASR 单期推理（AutoModel 内置 VAD 流程）一致，输出与逐期运行相同
+"""
+
+import logging
+import time
+
+from funasr import AutoModel
+from funasr.utils.load_utils import load_audio_text_image_video
+
+from .core import ASR_MODEL, PUNC_MODEL, SAMPLE_RATE, VAD_MODEL, _retry, check_device, prepare_input
+from .errors import EmptyResultError, ModelLoadError, TranscriptionError
+from .profiling import profile_stage
+from .result import TranscriptionResult
+
+logger = logging.getLogger(__name__)
+
+def pack_segments(episodes_segments, batch_size_s=300, batch_size_threshold_s=60):
+    """
+    将多期节目的 VAD 片段按时长打包成批次
+
+    与 FunASR 单期推理相同：片段按时长升序排列，依次累加，
+    累计时长将超过 batch_size_s 或下一个片段超过 batch_size_threshold_s 时结束当前批次。
+    区别只是排序范围从单期扩大到所有节目，短节目的尾部片段不再单独成批。
+
+    Args:
+        episodes_segments: 每期节目的 VAD 片段列表 [[[beg_ms, end_ms], ...], ...]
+        batch_size_s: 每批最大累计时长（秒）
+        batch_size_threshold_s: 超过该时长的片段单独成批（秒）
+
+    Returns:
+        批次列表，每个批次为 [(节目序号, 片段序号, beg_ms, end_ms), ...]
+    """
+    segments = [
+        (episode, index, beg, end)
+        for episode, vad_segments in enumerate(episodes_segments)
+        for index, (beg, end) in enumerate(vad_segments)
+    ]
+    segments.sort(key=lambda seg: seg[3] - seg[2])
+
+    batch_size_ms = batch_size_s * 1000
+    threshold_ms = batch_size_threshold_s * 1000
+
+    batches = []
+    current = []
+    cumulative = 0
+    for position, segment in enumerate(segments):
+        current.append(segment)
+        cumulative += segment[3] - segment[2]
+        if position + 1 < len(segments):
+            next_duration = segments[position + 1][3] - segments[position + 1][2]
+            if cumulative + next_duration < batch_size_ms and next_duration < threshold_ms:
+                continue
+        batches.append(current)
+        current = []
+        cumulative = 0
+
+    return batches
+
+def merge_segment_results(vad_segments, segment_results):
+    """
+    将一期节目的片段识别结果按原始顺序拼接，时间戳加上片段起始偏移
+
+    Returns:
+        (未加标点的文本, [(start_ms, end_ms), ...])
+    """
+    texts = []
+    timestamps = []
+    for (beg, _), result in zip(vad_segments, segment_results):
+        if result is None:
+            continue
+        if result.get("text"):
+            texts.append(result["text"])
+        for start, end in result.get("timestamp", []):
+            timestamps.append((start + beg, end + beg))
+    return " ".join(texts), timestamps
+
+def load_batch_models(device=None, retries=3, retry_delay=2):
+    """
+    分别加载 VAD、ASR 和标点模型（打包转录需要单独调用每个模型）
+
+    Returns:
+        {"vad": ..., "asr": ..., "punc": ...}
+    """
+    device = device or check_device()
+    logger.info("正在加载 FunASR 模型（VAD / ASR / 标点分别加载）...")
+    try:
+        with profile_stage("asr_load"):
+            models = {
+                name: _retry(lambda: AutoModel(model=model, device=device), retries, retry_delay, "模型加载")
+                for name, model in (("vad", VAD_MODEL), ("asr", ASR_MODEL), ("punc", PUNC_MODEL))
+            }
+    except Exception as e:
+        raise ModelLoadError(f"模型加载失败: {e}") from e
+    logger.info("模型加载完成")
+    return models
+
+def transcribe_batch(audios, models=None, hotword="", batch_size_s=300, batch_size_threshold_s=60,
+                     device=None, model_retries=3):
+    """
+    跨节目打包转录多期音频
+
+    单期失败（文件不存在、结果为空）不影响其他节目，对应位置返回异常对象。
+
+    Args:
+        audios: 音频文件路径列表
+        models: load_batch_models() 的返回值，None 时加载新模型
+        hotword: 热词
+        batch_size_s: 每批最大累计时长（秒）
+        batch_size_threshold_s: 超过该时长的片段单独成批（秒）
+        device: 设备，默认自动检测
+        model_retries: 模型加载最多尝试次数
+
+    Returns:
+        (results, stats)：results 与 audios 一一对应，为 TranscriptionResult 或 TranscriptionError；
+        stats 包含 segments、batches、fill、audio_ms（音频总时长）、speech_ms（VAD 语音时长）、
+        elapsed、cpu_seconds
+    """
+    results = [None] * len(audios)
+    inputs = []
+    for position, audio in enumerate(audios):
+        try:
+            inputs.append((position,) + prepare_input(audio))
+        except TranscriptionError as e:
+            logger.error(str(e))
+            results[position] = e
+
+    stats = {"segments": 0, "batches": 0, "fill": 0, "audio_ms": 0, "speech_ms": 0, "elapsed": 0, "cpu_seconds": 0}
+    if not inputs:
+        return results, stats
+
+    if models is None:
+        models = load_batch_models(device, retries=model_retries)
+
+    started = time.time()
+    cpu_started = time.process_time()
+
+    # 1. 逐期 VAD 并加载音频
+    speeches = []
+    episodes_segments = []
+    for _, model_input, audio_name in inputs:
+        with profile_stage("vad"):
+            vad_result = models["vad"].generate(input=model_input)
+            episodes_segments.append(vad_result[0]["value"] if vad_result else [])
+            speeches.append(load_audio_text_image_video(model_input, fs=SAMPLE_RATE))
+        stats["audio_ms"] += len(speeches[-1]) * 1000 // SAMPLE_RATE
+        logger.info(f"VAD: {audio_name} -> {len(episodes_segments[-1])} 个语音片段")
+
+    # 2. 跨节目打包
+    batches = pack_segments(episodes_segments, batch_size_s, batch_size_threshold_s)
+    stats["segments"] = sum(map(len, episodes_segments))
+    stats["batches"] = len(batches)
+    stats["speech_ms"] = sum(end - beg for segments in episodes_segments for beg, end in segments)
+    stats["fill"] = stats["speech_ms"] / (len(batches) * batch_size_s * 1000) if batches else 0
+    logger.info(f"{len(inputs)} 期共 {stats['segments']} 个片段，"
+                f"打包为 {len(batches)} 个批次（平均填充率 {stats['fill'] * 100:.0f}%）")
+
+    # 3. 逐批识别，结果按 (节目, 片段) 路由回去
+    segment_results = [[None] * len(segments) for segments in episodes_segments]
+    for number, batch in enumerate(batches, 1):
+        batch_inputs = []
+        for episode, _, beg, end in batch:
+            batch_inputs.append(speeches[episode][beg * SAMPLE_RATE // 1000:end * SAMPLE_RATE // 1000])
+        with profile_stage("asr"):
+            batch_results = models["asr"].generate(input=batch_inputs, batch_size=len(batch_inputs), hotword=hotword)
+        for (episode, index, _, _), result in zip(batch, batch_results):
+            segment_results[episode][index] = result
+        logger.info(f"批次 {number}/{len(batches)}: {len(batch)} 个片段")
+
+    # 4. 逐期拼接、恢复标点
+    for (position, _, audio_name), segments, seg_results in zip(inputs, episodes_segments, segment_results):
+        text, timestamps = merge_segment_results(segments, seg_results)
+        if not text:
+            logger.error(f"转录结果为空: {audio_name}")
+            results[position] = EmptyResultError(f"转录结果为空: {audio_name}")
+            continue
+        with profile_stage("punc"):
+            punctuated = models["punc"].generate(input=text)[0]["text"]
+        results[position] = TranscriptionResult(
+            text=punctuated,
+            timestamps=timestamps,
+            audio_name=audio_name,
+        )
+
+    stats["elapsed"] = time.time() - started
+    stats["cpu_seconds"] = time.process_time() - cpu_started
+    return results, stats
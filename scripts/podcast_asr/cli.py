@@ -0,0 +1,40 @@
+"""
+命令行封装（transcribe.py、transcribe_enhanced.py、batch_transcribe.py）共用的辅助函数
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+def retry_options(retries):
+    """--retries 参数 -> transcribe() 的重试参数"""
+    if retries is None:
+        return {}
+    return {"retries": retries, "model_retries": retries}
+
+def finish_profile(profiler, profile_dir):
+    """停止剖析并写出 cpu.folded、memory.folded 和 summary.json（转录失败时也写出已采集的部分）"""
+    profiler.stop()
+    profiler.report()
+    paths = profiler.write(profile_dir)
+    logger.info(f"性能剖析已保存到: {paths['summary'].parent}（火焰图: flamegraph.pl {paths['cpu'].name} > cpu.svg）")
+
+def print_summary(result, paths):
+    """输出统计信息和文字稿预览"""
+    print("\n" + "="*50)
+    print("[SUCCESS] 转录完成！")
+    print("="*50)
+    print(f"文字数量: {len(result.text)}")
+    print(f"输出文件: {paths['text']}")
+    if "formatted" in paths:
+        print(f"格式化文件: {paths['formatted']}")
+    if "timestamp" in paths:
+        print(f"时间戳文件: {paths['timestamp']}")
+
+    # 显示预览
+    print("\n[文字稿预览] (前 500 字)")
+    print("-" * 50)
+    print(result.text[:500])
+    if len(result.text) > 500:
+        print("...")
+    print("-" * 50)
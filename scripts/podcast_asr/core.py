@@ -0,0 +1,390 @@
+"""
+转录核心：设备检测、模型加载、ASR 与说话人分离
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import torch
+from funasr import AutoModel
+
+from .errors import AudioNotFoundError, EmptyResultError, ModelLoadError, TranscriptionError
+from .profiling import Profiler, active_profiler, profile_stage
+from .result import SpeakerTurn, TranscriptionResult
+
+logger = logging.getLogger(__name__)
+
+ASR_MODEL = "paraformer-zh"
+VAD_MODEL = "fsmn-vad"
+PUNC_MODEL = "ct-punc"
+DIARIZATION_MODEL = "iic/speech_campplus_speaker_diarization_zh-cn"
+SAMPLE_RATE = 16000
+
+def configure_logging(level=logging.INFO):
+    """CLI 脚本使用：日志以 [INFO] / [WARN] / [ERROR] 前缀输出到标准输出"""
+    logging.addLevelName(logging.WARNING, "WARN")
+    logging.basicConfig(level=level, format="[%(levelname)s] %(message)s", stream=sys.stdout)
+
+def check_device():
+    """检测并返回最优设备"""
+    if torch.backends.mps.is_available():
+        logger.info("检测到 MPS (Metal) 加速，使用 GPU")
+        return "mps"
+    elif torch.cuda.is_available():
+        logger.info("检测到 CUDA，使用 GPU")
+        return "cuda"
+    else:
+        logger.info("使用 CPU 模式")
+        return "cpu"
+
+def _retry(func, retries, delay, label):
+    """
+    调用 func，失败时等待 delay 秒后重试，共尝试 retries 次
+
+    Returns:
+        func 的返回值；全部失败时抛出最后一次的异常
+    """
+    retries = max(1, retries)
+    for attempt in range(retries):
+        try:
+            return func()
+        except Exception as e:
+            if attempt < retries - 1:
+                logger.warning(f"{label}失败 (尝试 {attempt + 1}/{retries}): {e}")
+                time.sleep(delay)
+            else:
+                raise
+
+def load_model(device=None, retries=3, retry_delay=2, **kwargs):
+    """
+    加载 ASR 模型（paraformer-zh + VAD + 标点恢复）
+
+    返回的模型可以传给 transcribe() 重复使用，避免每期重新加载。
+
+    Args:
+        device: 设备，默认自动检测
+        retries: 最多尝试次数
+        retry_delay: 重试间隔（秒）
+        **kwargs: 传给 AutoModel 的其他参数（如 model、vad_model 覆盖默认模型）
+
+    Returns:
+        FunASR AutoModel
+    """
+    options = {
+        "model": ASR_MODEL,           # 中文非流式模型
+        "vad_model": VAD_MODEL,       # 语音活动检测（去静音）
+        "punc_model": PUNC_MODEL,     # 标点恢复
+        "device": device or check_device(),
+    }
+    options.update(kwargs)
+
+    logger.info("正在加载 FunASR 模型...")
+    logger.info("首次运行会自动下载模型（约 2GB），请耐心等待...")
+    try:
+        with profile_stage("asr_load"):
+            model = _retry(lambda: AutoModel(**options), retries, retry_delay, "模型加载")
+    except Exception as e:
+        raise ModelLoadError(f"模型加载失败: {e}") from e
+    logger.info("模型加载完成")
+    return model
+
+def split_threads(total_threads, diarization_threads=None, enable_diarization=True):
+    """
+    在 ASR 和说话人分离之间分配 CPU 线程
+
+    Returns:
+        (asr_threads, diarization_threads)
+    """
+    total_threads = max(1, total_threads or os.cpu_count() or 1)
+    if not enable_diarization:
+        return total_threads, 0
+    if diarization_threads is None:
+        diarization_threads = max(1, total_threads // 4)
+    diarization_threads = min(diarization_threads, max(1, total_threads - 1))
+    return max(1, total_threads - diarization_threads), diarization_threads
+
+def prepare_input(audio, sample_rate=SAMPLE_RATE):
+    """
+    将音频规范化为 FunASR 可接受的输入
+
+    Args:
+        audio: 音频文件路径；16kHz 单声道 PCM 缓冲区
+            （float32 numpy 数组 / torch 张量，或 16-bit 小端 bytes）
+
+    Returns:
+        (模型输入, 音频名)
+    """
+    if isinstance(audio, (str, Path)):
+        path = Path(audio)
+        if not path.exists():
+            raise AudioNotFoundError(f"音频文件不存在: {path}")
+        return str(path), path.stem
+
+    if sample_rate != SAMPLE_RATE:
+        raise TranscriptionError(f"PCM 缓冲区需要 {SAMPLE_RATE}Hz 采样率，实际为 {sample_rate}Hz")
+
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        import numpy as np
+        audio = np.frombuffer(audio, dtype="<i2").astype(np.float32) / 32768.0
+    return audio, "audio"
+
+def parse_diarization(diarization_result):
+    """将说话人分离模型的返回值转换为 SpeakerTurn 列表"""
+    speaker_turns = []
+    if diarization_result and len(diarization_result) > 0:
+        # 注意：实际格式可能需要根据 FunASR 返回调整
+        for seg in diarization_result[0].get('segments', []):
+            speaker_turns.append(SpeakerTurn(
+                speaker=seg.get('speaker', '说话人'),
+                start=seg.get('start', 0),
+                end=seg.get('end', 0),
+                text=seg.get('text', ''),
+            ))
+    return speaker_turns
+
+def run_diarization(model_input, device, threads, diarization_model=None, profile=False):
+    """
+    加载说话人分离模型（未提供时）并处理整段音频
+
+    默认在独立进程中运行，与 ASR 互不依赖，直到说话人对齐时才合并结果。
+
+    Args:
+        profile: 在子进程中剖析（主进程用 Profiler.merge() 合并返回的数据）
+
+    Returns:
+        (speaker_turns, timings, profile_data)，timings 中的时间为 time.time() 墙钟时间，
+        可与主进程的时间直接比较；profile_data 未剖析时为 None
+    """
+    if threads:
+        torch.set_num_threads(threads)
+    profiler = Profiler().start() if profile else None
+    timings = {"diarization_start": time.time()}
+
+    try:
+        if diarization_model is None:
+            with profile_stage("diarization_load"):
+                diarization_model = AutoModel(
+                    model=DIARIZATION_MODEL,  # 说话人分离
+                    device=device,
+                )
+        timings["diarization_loaded"] = time.time()
+
+        with profile_stage("diarization"):
+            speaker_turns = parse_diarization(diarization_model.generate(input=model_input))
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+    timings["diarization_end"] = time.time()
+    return speaker_turns, timings, profiler.export() if profiler is not None else None
+
+class _DiarizationTask:
+    """
+    后台说话人分离
+
+    使用调用方提供的模型时在线程中运行（模型常驻内存，PyTorch 计算会释放 GIL），
+    否则在 spawn 子进程中加载模型。ASR 失败不会取消说话人分离，只有中断（Ctrl-C）时终止子进程。
+    """
+
+    def __init__(self, model_input, device, threads, diarization_model=None):
+        self.pool = None
+        self.thread = None
+        self.outcome = None
+        if diarization_model is None:
+            self.pool = multiprocessing.get_context("spawn").Pool(processes=1)
+            # 子进程不继承主进程的 Profiler，剖析时在子进程中单独采样
+            profile = active_profiler() is not None
+            self.future = self.pool.apply_async(run_diarization, (model_input, device, threads, None, profile))
+        else:
+            self.thread = threading.Thread(
+                target=self._run_in_thread, args=(model_input, device, diarization_model), daemon=True
+            )
+            self.thread.start()
+
+    def _run_in_thread(self, model_input, device, diarization_model):
+        try:
+            self.outcome = (run_diarization(model_input, device, None, diarization_model), None)
+        except Exception as e:
+            self.outcome = (None, e)
+
+    def ready(self):
+        if self.pool is not None:
+            return self.future.ready()
+        return not self.thread.is_alive()
+
+    def get(self):
+        """等待并返回 (speaker_turns, timings, profile_data)，失败时抛出异常"""
+        if self.pool is not None:
+            try:
+                return self.future.get()
+            finally:
+                self.pool.close()
+                self.pool.join()
+        self.thread.join()
+        value, error = self.outcome
+        if error is not None:
+            raise error
+        return value
+
+    def cancel(self):
+        """中断时结束子进程（线程模式无法中断，只能等其自然结束）"""
+        if self.pool is not None:
+            self.pool.terminate()
+
+def _join_after_asr_failure(task):
+    """ASR 失败后等待说话人分离结束并报告其结果（没有文本可对齐，结果不会写出）"""
+    if not task.ready():
+        logger.info("ASR 失败，等待说话人分离结束...")
+    try:
+        with profile_stage("diarization_wait"):
+            speaker_turns, timings, profile_data = task.get()
+    except Exception as e:
+        logger.warning(f"说话人分离失败: {e}")
+        return
+    if profile_data is not None and active_profiler() is not None:
+        active_profiler().merge(profile_data, process="diarization")
+    speakers = set(turn.speaker for turn in speaker_turns)
+    seconds = timings["diarization_end"] - timings["diarization_start"]
+    logger.info(f"说话人分离已完成（{len(speakers)} 位说话人，用时 {seconds:.1f}s），但 ASR 失败，不写出结果")
+
+def transcribe(audio, model=None, hotword="", batch_size_s=300, device=None,
+               diarization=False, diarization_model=None, threads=None,
+               diarization_threads=None, retries=2, retry_delay=3, model_retries=3,
+               sample_rate=SAMPLE_RATE):
+    """
+    转录一期音频
+
+    Args:
+        audio: 音频文件路径或 16kHz 单声道 PCM 缓冲区（见 prepare_input）
+        model: 已加载的 ASR 模型（load_model() 的返回值），None 时加载新模型
+        hotword: 热词，提升特定词汇识别准确度
+        batch_size_s: 批处理长度（秒）
+        device: 设备，默认自动检测
+        diarization: 启用说话人分离（与 ASR 并行运行）
+        diarization_model: 已加载的说话人分离模型，None 时在子进程中加载
+        threads: CPU 线程总预算（默认不限制；启用说话人分离时默认为 CPU 核数）
+        diarization_threads: 分给说话人分离的线程数（默认总预算的 1/4）
+        retries: 转录最多尝试次数
+        retry_delay: 转录重试间隔（秒）
+        model_retries: 模型加载最多尝试次数
+        sample_rate: PCM 缓冲区的采样率（仅支持 16000）
+
+    Returns:
+        TranscriptionResult
+
+    Raises:
+        AudioNotFoundError: 音频文件不存在
+        ModelLoadError: 模型加载失败
+        EmptyResultError: 没有转录结果
+        TranscriptionError: 转录失败
+    """
+    model_input, audio_name = prepare_input(audio, sample_rate)
+    if device is None and (model is None or (diarization and diarization_model is None)):
+        device = check_device()
+
+    if threads is not None or diarization:
+        asr_threads, diarization_threads = split_threads(threads, diarization_threads, diarization)
+        torch.set_num_threads(asr_threads)
+
+    # 说话人分离与 ASR 并行运行，只在对齐阶段汇合
+    timings = {}
+    task = None
+    if diarization:
+        if diarization_model is None:
+            logger.info(f"说话人分离在后台进程运行（{diarization_threads} 线程），ASR 使用 {asr_threads} 线程")
+        else:
+            logger.info("说话人分离在后台线程运行")
+        task = _DiarizationTask(model_input, device, diarization_threads, diarization_model)
+
+    timings["asr_start"] = time.time()
+
+    try:
+        if model is None:
+            model = load_model(device, retries=model_retries)
+        timings["asr_loaded"] = time.time()
+
+        logger.info("开始转录...")
+        logger.info(f"批处理大小: {batch_size_s} 秒")
+        if hotword:
+            logger.info(f"热词: {hotword}")
+
+        try:
+            with profile_stage("asr"):
+                result = _retry(
+                    lambda: model.generate(input=model_input, batch_size_s=batch_size_s, hotword=hotword),
+                    retries, retry_delay, "转录",
+                )
+        except Exception as e:
+            raise TranscriptionError(f"转录失败: {e}") from e
+
+        timings["asr_end"] = time.time()
+
+        if not result:
+            raise EmptyResultError("转录失败，未返回结果")
+
+        text = result[0].get("text", "")
+        if not text:
+            raise EmptyResultError("转录结果为空")
+    except Exception:
+        # 两个阶段互不取消：等说话人分离结束并报告后，再抛出 ASR 的错误
+        if task is not None:
+            _join_after_asr_failure(task)
+        raise
+    except BaseException:
+        # Ctrl-C 等中断：直接结束后台的说话人分离
+        if task is not None:
+            task.cancel()
+        raise
+
+    transcription = TranscriptionResult(
+        text=text,
+        timestamps=[tuple(entry) if isinstance(entry, list) else entry
+                    for entry in result[0].get("timestamp", [])],
+        timings=timings,
+        audio_name=audio_name,
+    )
+
+    # 等待说话人分离结果（失败不影响基础转录）
+    if task is not None:
+        if not task.ready():
+            logger.info("ASR 已完成，等待说话人分离...")
+        try:
+            with profile_stage("diarization_wait"):
+                transcription.speaker_turns, diarization_timings, profile_data = task.get()
+            timings.update(diarization_timings)
+            if profile_data is not None and active_profiler() is not None:
+                active_profiler().merge(profile_data, process="diarization")
+            transcription.diarization = True
+            speakers = set(turn.speaker for turn in transcription.speaker_turns)
+            logger.info(f"识别到 {len(speakers)} 位说话人")
+        except Exception as e:
+            transcription.diarization_error = str(e)
+            logger.warning(f"说话人分离失败: {e}")
+            logger.info("将使用基础转录结果")
+
+    return transcription
+
+def report_timings(result):
+    """输出各阶段耗时以及 ASR 与说话人分离的重叠时间"""
+    names = {
+        "asr_load": "ASR 模型加载",
+        "asr": "ASR 转录",
+        "diarization_load": "说话人分离模型加载",
+        "diarization": "说话人分离",
+        "write": "写入输出",
+    }
+    logger.info("阶段耗时:")
+    for stage, seconds in result.durations().items():
+        logger.info(f"  {names[stage]}: {seconds:.1f}s")
+
+    overlap = result.diarization_overlap()
+    if overlap is not None:
+        serial = (result.timings["asr_end"] - result.timings["asr_start"]
+                  + result.timings["diarization_end"] - result.timings["diarization_start"])
+        logger.info(f"  ASR 与说话人分离重叠: {overlap:.1f}s（串行需 {serial:.1f}s，"
+                    f"节省 {overlap / serial * 100:.0f}%）")
@@ -0,0 +1,17 @@
+"""
+转录异常
+
+调用方捕获 TranscriptionError 即可处理所有转录失败；CLI 脚本捕获后输出错误并以退出码 1 结束。
+"""
+
+class TranscriptionError(Exception):
+    """转录失败"""
+
+class AudioNotFoundError(TranscriptionError):
+    """音频文件不存在"""
+
+class ModelLoadError(TranscriptionError):
+    """模型加载失败（多为网络或磁盘空间问题）"""
+
+class EmptyResultError(TranscriptionError):
+    """模型没有返回结果或转录文本为空"""
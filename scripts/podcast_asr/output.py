@@ -0,0 +1,116 @@
+"""
+输出文件：文字稿（.txt）、格式化版本（_formatted.md）和时间戳版本（_timestamp.txt）
+文件格式与 merge-and-clean.sh、search_index.py 的读取方式保持一致
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from .profiling import profile_stage
+from .text import format_speaker_dialogue, format_timestamp, smart_segment_text
+
+logger = logging.getLogger(__name__)
+
+def default_output_dir(audio_path):
+    """.cache 中的音频输出到同一目录，否则输出到同级 transcripts 目录（兼容旧结构）"""
+    audio_path = Path(audio_path)
+    if ".cache" in str(audio_path):
+        return audio_path.parent
+    return audio_path.parent / "transcripts"
+
+def default_profile_dir(output_dir, name):
+    """
+    --profile 未指定目录时的剖析输出目录
+
+    输出目录是节目的 .cache 时（合并清理后会删除）写入节目目录下的 .profile/<name>，
+    与 pipeline.py 的 .profile 一致；否则写入输出目录下的 <name>
+    """
+    output_dir = Path(output_dir)
+    if output_dir.name == ".cache":
+        return output_dir.parent / ".profile" / name
+    return output_dir / name
+
+def write_timestamps(path, timestamps):
+    """写出时间戳文件，每行 [HH:MM:SS.mmm -> HH:MM:SS.mmm] 或带词的同一格式"""
+    with open(path, "w", encoding="utf-8") as f:
+        for i, entry in enumerate(timestamps):
+            # FunASR timestamp 可能是 (start, end, word) 或 (start, end) 格式
+            if not isinstance(entry, (list, tuple)) or len(entry) not in (2, 3):
+                logger.warning(f"跳过格式不正确的时间戳条目 {i}: {entry}")
+                continue
+            start, end = entry[0], entry[1]
+            word = entry[2] if len(entry) == 3 else ""
+
+            start_time = format_timestamp(start)
+            end_time = format_timestamp(end)
+            if word:
+                f.write(f"[{start_time} -> {end_time}] {word}\n")
+            else:
+                f.write(f"[{start_time} -> {end_time}]\n")
+
+def write_outputs(result, output_dir, formatted=False, segmentation=True, source="FunASR paraformer-zh"):
+    """
+    写出转录结果
+
+    Args:
+        result: TranscriptionResult
+        output_dir: 输出目录
+        formatted: 同时写出 _formatted.md（说话人对话 + 分段文本）
+        segmentation: _formatted.md 中使用智能分段
+        source: _formatted.md 头部注释中的生成方式
+
+    Returns:
+        {"text": 文字稿路径, "formatted": ..., "timestamp": ...}，未生成的文件不包含在内
+    """
+    result.timings["write_start"] = time.time()
+    with profile_stage("write"):
+        paths = _write_files(result, output_dir, formatted, segmentation, source)
+    result.timings["write_end"] = time.time()
+    return paths
+
+def _write_files(result, output_dir, formatted, segmentation, source):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    audio_name = result.audio_name
+    paths = {}
+
+    # 保存纯文本
+    paths["text"] = output_dir / f"{audio_name}.txt"
+    logger.info(f"保存文字稿到: {paths['text']}")
+    with open(paths["text"], "w", encoding="utf-8") as f:
+        f.write(result.text)
+
+    # 保存格式化版本（智能分段 + 说话人对话）
+    if formatted:
+        paths["formatted"] = output_dir / f"{audio_name}_formatted.md"
+        logger.info(f"保存格式化版本到: {paths['formatted']}")
+        with open(paths["formatted"], "w", encoding="utf-8") as f:
+            f.write(f"# {audio_name} - 转录文本\n\n")
+            f.write(f"<!-- 使用 {source} 自动生成 -->\n")
+            f.write(f"<!-- 说话人分离: {'启用' if result.diarization else '禁用'} -->\n")
+            f.write(f"<!-- 智能分段: {'启用' if segmentation else '禁用'} -->\n\n")
+
+            # 如果有说话人分离结果，输出对话格式
+            if result.speaker_turns:
+                f.write("## 对话记录\n\n")
+                f.write(format_speaker_dialogue(result.speaker_turns))
+                f.write("\n\n---\n\n")
+
+            # 输出分段文本
+            if segmentation:
+                f.write("## 完整文本（智能分段）\n\n")
+                with profile_stage("segmentation"):
+                    segmented = smart_segment_text(result.text)
+                f.write(segmented)
+            else:
+                f.write("## 完整文本\n\n")
+                f.write(result.text)
+
+    # 保存时间戳版本
+    if result.timestamps:
+        paths["timestamp"] = output_dir / f"{audio_name}_timestamp.txt"
+        logger.info(f"保存时间戳版本: {paths['timestamp']}")
+        write_timestamps(paths["timestamp"], result.timestamps)
+
+    return paths
@@ -0,0 +1,331 @@
+"""
+性能剖析（--profile）：按阶段采样 CPU 调用栈、记录内存峰值
+
+    with Profiler() as profiler:
+        result = transcribe("episode.m4a")
+        write_outputs(result, ".cache")
+    profiler.write("episode_profile")
+
+阶段由 profile_stage() 标记（asr_load、asr、diarization、segmentation、write 等），
+没有启用 Profiler 时 profile_stage() 不做任何事。输出：
+- cpu.folded：采样到的调用栈，根节点为阶段名，可直接交给 flamegraph.pl / speedscope
+- memory.folded：各阶段新增 Python 内存（tracemalloc）的分配栈，权重为字节数
+- summary.json：各阶段耗时、CPU 时间、内存峰值（Python / CUDA / MPS / 进程 RSS）
+"""
+
+import json
+import logging
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_active = None
+
+def _frame_label(filename, lineno, name=None):
+    """调用栈帧的显示名：func (包/文件.py:行号)"""
+    location = "/".join(Path(filename).parts[-2:]) + f":{lineno}"
+    return f"{name} ({location})" if name else location
+
+def _maxrss_bytes():
+    """进程 RSS 峰值（Linux 上 ru_maxrss 单位为 KB，macOS 上为字节）"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+def _mps_memory():
+    """已导入 torch 且使用 MPS 时返回当前显存占用（MPS 没有峰值计数），否则为空"""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return {}
+    memory = {}
+    try:
+        if not torch.cuda.is_available() and hasattr(torch, "mps") and torch.backends.mps.is_available():
+            memory["mps_allocated_bytes"] = torch.mps.current_allocated_memory()
+            memory["mps_driver_bytes"] = torch.mps.driver_allocated_memory()
+    except Exception as e:
+        logger.debug(f"读取显存信息失败: {e}")
+    return memory
+
+def _take_cuda_peak():
+    """
+    读取并重置 CUDA 显存峰值
+
+    Returns:
+        上次重置以来的峰值（字节）；没有导入 torch 或没有 CUDA 时为 None
+    """
+    torch = sys.modules.get("torch")
+    try:
+        if torch is None or not torch.cuda.is_available():
+            return None
+        peak = torch.cuda.max_memory_allocated()
+        torch.cuda.reset_peak_memory_stats()
+        return peak
+    except Exception as e:
+        logger.debug(f"读取显存峰值失败: {e}")
+        return None
+
+class Profiler:
+    """
+    进程内性能剖析
+
+    后台线程每隔 interval 秒用 sys._current_frames() 采样处于阶段中的线程，
+    阶段进出时记录墙钟时间、进程 CPU 时间、tracemalloc 峰值和 tracemalloc 快照差异。
+    tracemalloc 只统计 Python 分配，模型权重等原生内存看 maxrss_bytes 和 GPU 显存；
+    并行运行的阶段（ASR 与线程模式的说话人分离）Python 和 CUDA 峰值会互相计入。
+    """
+
+    def __init__(self, interval=0.01, trace_memory=True, traceback_limit=25, top_allocations=10):
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.traceback_limit = traceback_limit
+        self.top_allocations = top_allocations
+        self.samples = Counter()
+        self.memory_stacks = Counter()
+        self.stages = {}
+        self.started = None
+        self.elapsed = None
+        self._open = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._owns_tracemalloc = False
+        self._overhead = [0.0, 0.0]
+        self._snapshotting = set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """开始采样并设为当前 Profiler（profile_stage() 记录到这里）"""
+        global _active
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_limit)
+            self._owns_tracemalloc = True
+        self.started = time.time()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+        _active = self
+        return self
+
+    def stop(self):
+        global _active
+        if _active is self:
+            _active = None
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        self.elapsed = time.time() - self.started
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                open_stages = {ident: [record["name"] for record in records]
+                               for ident, records in self._open.items() if records}
+            frames = sys._current_frames()
+            for ident, names in open_stages.items():
+                frame = frames.get(ident)
+                if ident == own or frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < 128:
+                    stack.append(_frame_label(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+                    frame = frame.f_back
+                self.samples[";".join(names + stack[::-1])] += 1
+            del frames
+
+    def _fold_peaks(self):
+        """
+        把 tracemalloc 和 CUDA 峰值计入所有进行中的阶段后重置
+
+        两个峰值计数器都是进程全局的：阶段进出时先结算再重置，
+        嵌套阶段不会抹掉外层阶段已经达到的峰值，每个阶段得到自己存续期间的峰值。
+        """
+        peaks = {}
+        if tracemalloc.is_tracing():
+            peaks["python_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+        cuda_peak = _take_cuda_peak()
+        if cuda_peak is not None:
+            peaks["cuda_peak_bytes"] = cuda_peak
+        for records in self._open.values():
+            for record in records:
+                for key, peak in peaks.items():
+                    record[key] = max(record.get(key, 0), peak)
+
+    @contextmanager
+    def stage(self, name):
+        """
+        标记一个阶段；同名阶段多次进入时累加耗时，峰值取最大
+
+        tracemalloc 快照比较很慢，只在每个阶段第一次进入时做（逐批调用的阶段只记录峰值），
+        这部分时间从所有进行中阶段的耗时中扣除。
+        """
+        ident = threading.get_ident()
+        started = time.time(), time.process_time()
+        with self._lock:
+            first_call = name not in self.stages and name not in self._snapshotting
+            if first_call:
+                self._snapshotting.add(name)
+        snapshot = tracemalloc.take_snapshot() if first_call and tracemalloc.is_tracing() else None
+        with self._lock:
+            self._overhead[0] += time.time() - started[0]
+            self._overhead[1] += time.process_time() - started[1]
+            self._fold_peaks()
+            record = {
+                "name": name,
+                "snapshot": snapshot,
+                "python_start": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0,
+                "python_peak_bytes": 0,
+                "overhead_start": list(self._overhead),
+                "wall_start": time.time(),
+                "cpu_start": time.process_time(),
+            }
+            self._open.setdefault(ident, []).append(record)
+        try:
+            yield
+        finally:
+            ended = time.time(), time.process_time()
+            with self._lock:
+                self._fold_peaks()
+                self._open[ident].pop()
+                record["wall_seconds"] = ended[0] - record["wall_start"] - (self._overhead[0] - record["overhead_start"][0])
+                record["cpu_seconds"] = ended[1] - record["cpu_start"] - (self._overhead[1] - record["overhead_start"][1])
+                record["python_end"] = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            # 比较快照不持有锁，采样线程照常工作
+            allocations = self._allocations(snapshot) if snapshot is not None else None
+            with self._lock:
+                self._snapshotting.discard(name)
+                self._close_stage(record, allocations)
+                self._overhead[0] += time.time() - ended[0]
+                self._overhead[1] += time.process_time() - ended[1]
+
+    def _allocations(self, start_snapshot):
+        """阶段内新增的 Python 内存，按分配调用栈分组：[(traceback, size_diff, count_diff), ...]"""
+        diff = tracemalloc.take_snapshot().compare_to(start_snapshot, "traceback")
+        # 剔除采样线程和快照本身的分配
+        return [(stat.traceback, stat.size_diff, stat.count_diff) for stat in diff
+                if stat.size_diff > 0 and not any(frame.filename in (__file__, tracemalloc.__file__)
+                                                  for frame in stat.traceback)]
+
+    def _close_stage(self, record, allocations):
+        name = record["name"]
+        stats = self.stages.setdefault(name, {
+            "calls": 0,
+            "wall_seconds": 0.0,
+            "cpu_seconds": 0.0,
+            "python_peak_bytes": 0,
+            "python_delta_bytes": 0,
+        })
+        stats["calls"] += 1
+        stats["wall_seconds"] += record["wall_seconds"]
+        stats["cpu_seconds"] += record["cpu_seconds"]
+        stats["maxrss_bytes"] = _maxrss_bytes()
+        if "cuda_peak_bytes" in record:
+            stats["cuda_peak_bytes"] = max(stats.get("cuda_peak_bytes", 0), record["cuda_peak_bytes"])
+        for key, value in _mps_memory().items():
+            stats[key] = max(stats.get(key, 0), value)
+
+        stats["python_peak_bytes"] = max(stats["python_peak_bytes"], record["python_peak_bytes"] - record["python_start"])
+        stats["python_delta_bytes"] += record["python_end"] - record["python_start"]
+        if allocations is None:
+            return
+
+        # memory.folded 用完整调用栈，top_allocations 按分配所在行汇总
+        by_line = Counter()
+        counts = Counter()
+        for traceback, size_diff, count_diff in allocations:
+            frames = [_frame_label(frame.filename, frame.lineno) for frame in traceback]
+            self.memory_stacks[";".join([name] + frames)] += size_diff
+            by_line[frames[-1]] += size_diff
+            counts[frames[-1]] += count_diff
+        stats["top_allocations"] = [
+            {"where": where, "size_diff_bytes": size, "count_diff": counts[where]}
+            for where, size in by_line.most_common(self.top_allocations)
+        ]
+
+    def export(self):
+        """可跨进程传递的剖析数据（子进程中的说话人分离用 merge() 合并回主进程）"""
+        return {
+            "samples": dict(self.samples),
+            "memory_stacks": dict(self.memory_stacks),
+            "stages": self.stages,
+        }
+
+    def merge(self, data, process="child"):
+        """合并其他进程 export() 的数据，阶段统计标记来源进程"""
+        self.samples.update(data["samples"])
+        self.memory_stacks.update(data["memory_stacks"])
+        for name, stats in data["stages"].items():
+            self.stages[name] = dict(stats, process=process)
+
+    def write(self, output_dir):
+        """
+        写出 cpu.folded、memory.folded 和 summary.json
+
+        Returns:
+            {"cpu": ..., "memory": ..., "summary": ...} 文件路径
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = {
+            "cpu": output_dir / "cpu.folded",
+            "memory": output_dir / "memory.folded",
+            "summary": output_dir / "summary.json",
+        }
+        for key, counter in (("cpu", self.samples), ("memory", self.memory_stacks)):
+            with open(paths[key], "w", encoding="utf-8") as f:
+                for stack, weight in sorted(counter.items()):
+                    f.write(f"{stack} {weight}\n")
+
+        summary = {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "elapsed_seconds": self.elapsed,
+            "sample_interval_seconds": self.interval,
+            "samples": sum(self.samples.values()),
+            "maxrss_bytes": _maxrss_bytes(),
+            "stages": self.stages,
+            "files": {key: path.name for key, path in paths.items() if key != "summary"},
+        }
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return paths
+
+    def report(self):
+        """输出各阶段的耗时和内存"""
+        logger.info("性能剖析:")
+        for name, stats in self.stages.items():
+            memory = f"Python 峰值 {stats['python_peak_bytes'] / 2**20:.1f}MB"
+            if "cuda_peak_bytes" in stats:
+                memory += f"，CUDA 峰值 {stats['cuda_peak_bytes'] / 2**20:.0f}MB"
+            if "mps_allocated_bytes" in stats:
+                memory += f"，MPS {stats['mps_allocated_bytes'] / 2**20:.0f}MB"
+            memory += f"，RSS 峰值 {stats['maxrss_bytes'] / 2**20:.0f}MB"
+            logger.info(f"  {name}: {stats['wall_seconds']:.1f}s（CPU {stats['cpu_seconds']:.1f}s），{memory}")
+
+def active_profiler():
+    """当前进程中运行的 Profiler，没有时为 None"""
+    return _active
+
+@contextmanager
+def profile_stage(name):
+    """在当前 Profiler 中标记一个阶段；未启用剖析时不做任何事"""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
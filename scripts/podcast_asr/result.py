@@ -0,0 +1,63 @@
+"""
+转录结果
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class SpeakerTurn:
+    """一段说话人发言（时间单位为毫秒）"""
+
+    speaker: str
+    start: float
+    end: float
+    text: str = ""
+
+@dataclass
+class TranscriptionResult:
+    """
+    一期音频的转录结果
+
+    timestamps 为 FunASR 返回的时间戳（毫秒），每项为 (start, end) 或 (start, end, word)；
+    timings 记录各阶段的墙钟时间点（time.time()），键见 STAGES。
+    """
+
+    text: str
+    timestamps: List[Tuple] = field(default_factory=list)
+    speaker_turns: List[SpeakerTurn] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    audio_name: str = "audio"
+    diarization: bool = False
+    diarization_error: Optional[str] = None
+
+    # 阶段名 -> (开始时间点, 结束时间点)
+    STAGES = {
+        "asr_load": ("asr_start", "asr_loaded"),
+        "asr": ("asr_loaded", "asr_end"),
+        "diarization_load": ("diarization_start", "diarization_loaded"),
+        "diarization": ("diarization_loaded", "diarization_end"),
+        "write": ("write_start", "write_end"),
+    }
+
+    def durations(self):
+        """
+        Returns:
+            {阶段名: 秒数}，只包含实际运行过的阶段
+        """
+        durations = {}
+        for stage, (start, end) in self.STAGES.items():
+            if start in self.timings and end in self.timings:
+                durations[stage] = self.timings[end] - self.timings[start]
+        return durations
+
+    def diarization_overlap(self):
+        """
+        Returns:
+            ASR 与说话人分离同时运行的秒数，未做说话人分离时为 None
+        """
+        keys = ("asr_start", "asr_end", "diarization_start", "diarization_end")
+        if not all(key in self.timings for key in keys):
+            return None
+        return max(0.0, min(self.timings["asr_end"], self.timings["diarization_end"])
+                   - max(self.timings["asr_start"], self.timings["diarization_start"]))
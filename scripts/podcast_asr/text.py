@@ -0,0 +1,110 @@
+"""
+文本处理：时间戳格式化、智能分段、说话人对话格式
+"""
+
+import re
+
+def format_timestamp(ms):
+    """将毫秒转换为 HH:MM:SS.mmm 格式"""
+    hours = int(ms // 3600000)
+    minutes = int((ms % 3600000) // 60000)
+    seconds = int((ms % 60000) // 1000)
+    milliseconds = int(ms % 1000)
+
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+
+def smart_segment_text(text, min_paragraph_length=100, max_paragraph_length=500):
+    """
+    智能分段文本
+
+    Args:
+        text: 输入文本
+        min_paragraph_length: 最小段落长度
+        max_paragraph_length: 最大段落长度
+
+    Returns:
+        分段后的文本
+    """
+    # 首先按照句号、问号、感叹号分段
+    sentences = re.split(r'([。！？])', text)
+    sentences = [''.join(i) for i in zip(sentences[0::2], sentences[1::2] + [''])]
+
+    paragraphs = []
+    current_para = []
+    current_length = 0
+
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+
+        sentence_len = len(sentence)
+
+        # 如果当前段落为空，直接添加
+        if not current_para:
+            current_para.append(sentence)
+            current_length = sentence_len
+        # 如果添加这个句子不会超过最大长度，且当前长度小于最小长度
+        elif current_length + sentence_len <= max_paragraph_length and current_length < min_paragraph_length:
+            current_para.append(sentence)
+            current_length += sentence_len
+        # 如果当前长度已经达到最小长度，且这个句子比较长（可能是新话题）
+        elif current_length >= min_paragraph_length and sentence_len > 20:
+            paragraphs.append(''.join(current_para))
+            current_para = [sentence]
+            current_length = sentence_len
+        # 否则继续添加
+        else:
+            current_para.append(sentence)
+            current_length += sentence_len
+
+        # 如果超过最大长度，强制分段
+        if current_length >= max_paragraph_length:
+            paragraphs.append(''.join(current_para))
+            current_para = []
+            current_length = 0
+
+    # 添加最后一个段落
+    if current_para:
+        paragraphs.append(''.join(current_para))
+
+    return '\n\n'.join(paragraphs)
+
+def format_speaker_dialogue(speaker_turns):
+    """
+    格式化说话人对话
+
+    Args:
+        speaker_turns: SpeakerTurn 列表
+
+    Returns:
+        格式化的对话文本
+    """
+    if not speaker_turns:
+        return ""
+
+    dialogue_lines = []
+    current_speaker = None
+    current_text = []
+
+    for turn in speaker_turns:
+        speaker = turn.speaker or '未知'
+        text = turn.text.strip()
+
+        if not text:
+            continue
+
+        # 如果说话人改变，保存之前的对话
+        if speaker != current_speaker:
+            if current_text:
+                dialogue_lines.append(f"\n**{current_speaker}**：\n{''.join(current_text)}")
+            current_speaker = speaker
+            current_text = [text]
+        else:
+            current_text.append(text)
+
+    # 添加最后一个说话人的对话
+    if current_text:
+        dialogue_lines.append(f"\n**{current_speaker}**：\n{''.join(current_text)}")
+
+    return '\n'.join(dialogue_lines)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+Show Notes 元数据解析
+一次读取 YAML Front Matter，得到标题、节目名、发布日期、Episode ID 和目录名
+供 Python 脚本导入，也供 Shell 脚本每期调用一次（替代逐行 cut/grep/sed）
+"""
+
+import argparse
+import json
+import os
+import re
+import shlex
+import sys
+
+# 解析结果缓存（进程内）：{绝对路径: ((mtime_ns, size), metadata)}
+_CACHE = {}
+
+# Shell 变量名 -> Front Matter 字段（extract-info.sh / format-dirname.sh 使用）
+SHELL_FIELDS = {
+    "TITLE": "title",
+    "PODCAST_NAME": "podcast_name",
+    "DURATION": "duration_text",
+    "AUDIO_URL": "audio_url",
+    "EPISODE_URL": "url",
+    "PUBLISHED_DATE": "published_date",
+    "EPISODE_ID": "episode_id",
+    "NEW_DIR_NAME": "dir_name",
+}
+
+def _unquote(value):
+    """去掉值两端成对的引号"""
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        value = value[1:-1]
+        if value and '\\' in value:
+            value = value.replace('\\"', '"').replace('\\\\', '\\')
+    return value
+
+def parse_front_matter(content):
+    """
+    解析 Markdown 文本的 YAML Front Matter
+
+    只处理单行 `key: value` 形式（xyz-dl 生成的 Show Notes 即是如此），
+    值两端的引号会被去掉。
+
+    Returns:
+        元数据字典
+    """
+    metadata = {}
+    in_front_matter = False
+
+    for line in content.split('\n'):
+        if line.strip() == '---':
+            if in_front_matter:
+                break
+            in_front_matter = True
+            continue
+
+        if in_front_matter and ':' in line:
+            key, value = line.split(':', 1)
+            metadata[key.strip()] = _unquote(value)
+
+    return metadata
+
+def format_dirname(metadata):
+    """
+    生成播客目录名：日期_节目名-E序号-主题
+
+    例如标题 "E080 稳定币与RWA：里世界向你敞开的一角"、
+    节目 "虚实之间"、日期 "2025年07月16日"
+    -> "20250716_虚实之间-E080-稳定币与RWA"
+
+    无法提取序号和主题时回退为 "日期_标题"。
+    """
+    title = metadata.get("title", "")
+    podcast_name = metadata.get("podcast_name", "")
+    published_date = metadata.get("published_date", "")
+
+    match = re.match(r'[A-Z]?[0-9]+', title)
+    episode_number = match.group(0) if match else ""
+
+    # 主题：序号后、第一个 " |"、"：" 、":" 或 " -" 之前的内容
+    topic = title
+    if topic.startswith(f"{episode_number} "):
+        topic = topic[len(episode_number) + 1:]
+    for separator in (" |", "：", ":", " -"):
+        topic = topic.split(separator, 1)[0]
+
+    # 日期：从 "2025年07月16日" 到 "20250716"
+    match = re.search(r'([0-9]{4})年([0-9]{2})月([0-9]{2})日', published_date)
+    formatted_date = ''.join(match.groups()) if match else ""
+
+    clean_podcast_name = re.sub(r'[|():]', '', podcast_name.replace(" | ", "-").replace(" ", "-"))
+    clean_topic = re.sub(r'[|():]', '', topic.replace(" ", "-")).strip("-")
+
+    if episode_number and clean_topic:
+        # 确保序号有 E 前缀
+        if not episode_number.startswith("E"):
+            episode_number = f"E{episode_number}"
+        return f"{formatted_date}_{clean_podcast_name}-{episode_number}-{clean_topic}"
+
+    clean_title = re.sub(r'[|():]', '', title.replace(" ", "-"))
+    return f"{formatted_date}_{clean_title}"
+
+def load_metadata(md_file):
+    """
+    读取 Show Notes 文件并返回元数据（含派生的 dir_name）
+
+    结果按文件 mtime 和大小缓存，同一进程内重复读取同一文件不会重新解析。
+
+    Returns:
+        元数据字典；至少包含 title、podcast_name、published_date、
+        episode_id（可能为空字符串）和 dir_name
+    """
+    path = os.path.abspath(md_file)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _CACHE.get(path)
+    if cached and cached[0] == key:
+        return dict(cached[1])
+
+    with open(path, 'r', encoding='utf-8') as f:
+        metadata = parse_front_matter(f.read())
+
+    for field in ("title", "podcast_name", "published_date", "episode_id"):
+        metadata.setdefault(field, "")
+    metadata["dir_name"] = format_dirname(metadata)
+
+    _CACHE[path] = (key, metadata)
+    return dict(metadata)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="解析 Show Notes 元数据"
+    )
+
+    parser.add_argument(
+        "file",
+        help="Show Notes Markdown 文件路径"
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=["shell", "json", "dirname"],
+        default="shell",
+        help="输出格式：shell（可 eval 的变量赋值）、json 或 dirname（仅目录名）"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        metadata = load_metadata(args.file)
+    except OSError as e:
+        print(f"[ERROR] 文件不存在: {args.file} ({e})", file=sys.stderr)
+        sys.exit(1)
+
+    if args.format == "dirname":
+        print(metadata["dir_name"])
+    elif args.format == "json":
+        print(json.dumps(metadata, ensure_ascii=False, indent=2))
+    else:
+        for variable, field in SHELL_FIELDS.items():
+            if metadata.get(field):
+                print(f"{variable}={shlex.quote(metadata[field])}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-# 完整播客处理流程：下载 → 转录 → 合并 → 清理 → (可选) 同步到 Notion
+# 完整播客处理流程：下载 → 转录 → 索引 → 合并 → 清理 → (可选) 同步到 Notion
 
 set -e
 
@@ -79,9 +79,9 @@ main() {
         exit 1
     fi
 
-    local total_steps=4
+    local total_steps=5
     if [ "$sync_to_notion" = true ]; then
-        total_steps=5
+        total_steps=6
     fi
 
     echo "========================================"
@@ -122,7 +122,7 @@ main() {
     fi
 
     # 查找音频文件
-    AUDIO_FILE=$(find "$CACHE_DIR" -name "*.m4a" -o -name "*.mp3" 2>/dev/null | head -1)
+    AUDIO_FILE=$(find "$CACHE_DIR" -name "*.m4a" -o -name "*.mp3" -o -name "*.opus" 2>/dev/null | head -1)
 
     if [ -z "$AUDIO_FILE" ]; then
         echo "[ERROR] 未找到音频文件"
@@ -142,8 +142,16 @@ main() {
 
     echo ""
 
-    # 步骤 3: 合并
-    echo_step "步骤 3/$total_steps: 合并 Show Notes 和转录文本"
+    # 步骤 3: 索引（合并清理前，时间戳文件仍在 .cache 中）
+    echo_step "步骤 3/$total_steps: 更新全文检索索引"
+    if ! python3 "$SCRIPTS_DIR/search_index.py" add "$EPISODE_DIR"; then
+        echo_warn "索引更新失败，不影响后续处理"
+    fi
+
+    echo ""
+
+    # 步骤 4: 合并
+    echo_step "步骤 4/$total_steps: 合并 Show Notes 和转录文本"
     if ! "$SCRIPTS_DIR/merge-and-clean.sh" "$EPISODE_DIR"; then
         echo_warn "合并步骤出现问题..."
     fi
@@ -152,9 +160,9 @@ main() {
 
     FINAL_FILE="$EPISODE_DIR/README.md"
 
-    # 步骤 4: Notion 同步（可选）
+    # 步骤 5: Notion 同步（可选）
     if [ "$sync_to_notion" = true ]; then
-        echo_step "步骤 4/$total_steps: 同步到 Notion"
+        echo_step "步骤 5/$total_steps: 同步到 Notion"
 
         # 检查 notion-client 是否安装
         if ! python3 -c "import notion_client" 2>/dev/null; then
@@ -186,7 +194,7 @@ main() {
         echo ""
     fi
 
-    # 步骤 5/4: 完成
+    # 步骤 6/5: 完成
     echo_step "步骤 $total_steps/$total_steps: 处理完成"
 
     echo ""
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+"""
+播客转录全文检索索引
+使用 SQLite FTS5 + 中文二元切分（bigram）建立句子级索引
+每个句子记录所属 Episode 和起始时间戳，检索结果可直接跳转回音频位置
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from podcast_asr.text import format_timestamp
+from podcast_meta import load_metadata
+
+DEFAULT_DB = Path.home() / "Research" / "Podcast" / ".search" / "index.db"
+
+# 句末标点：按句切分
+SENTENCE_END = re.compile(r'([。！？!?\n])')
+
+# 与 FunASR 时间戳一一对应的 token：英文/数字按词，其余文字按字（标点无时间戳）
+ASR_TOKEN = re.compile(r"[A-Za-z0-9']+|[^\W_A-Za-z0-9]")
+
+# 建索引用的切分：连续中日韩文字做二元切分，英文/数字按词
+INDEX_RUN = re.compile(r"[A-Za-z0-9]+|[^\W_A-Za-z0-9]+")
+
+TIMESTAMP_LINE = re.compile(r'^\[(\d+):(\d{2}):(\d{2})\.(\d{3}) -> (\d+):(\d{2}):(\d{2})\.(\d{3})\]')
+
+TRANSCRIPT_MARKER = "# 完整转录文本"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    episode_id TEXT PRIMARY KEY,
+    title TEXT,
+    podcast_name TEXT,
+    published_date TEXT,
+    episode_dir TEXT,
+    sentence_count INTEGER,
+    indexed_at TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS sentences USING fts5(
+    tokens,
+    text UNINDEXED,
+    episode_id UNINDEXED,
+    start_ms UNINDEXED,
+    end_ms UNINDEXED,
+    tokenize = 'unicode61'
+);
+"""
+
+def bigram_tokens(text):
+    """
+    将文本切分为索引 token
+
+    中文连续片段切成重叠的二元组，并补上末字一元组
+    （"稳定币" -> "稳定 定币 币"），这样每个汉字都是某个 token 的首字，
+    单字查询用前缀匹配即可命中；英文和数字按词小写。
+
+    Returns:
+        token 列表
+    """
+    tokens = []
+    for run in INDEX_RUN.findall(text):
+        if run.isascii():
+            tokens.append(run.lower())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+    return tokens
+
+def build_match_query(query):
+    """
+    将用户查询转换为 FTS5 MATCH 表达式
+
+    查询使用与索引相同的二元切分，所有 token 需同时命中（AND）；
+    单个汉字以前缀方式匹配二元组。
+    """
+    terms = []
+    for run in INDEX_RUN.findall(query):
+        if run.isascii():
+            terms.append(f'"{run.lower()}"')
+        elif len(run) == 1:
+            terms.append(f'"{run}"*')
+        else:
+            terms.extend(f'"{run[i:i + 2]}"' for i in range(len(run) - 1))
+    return " ".join(terms)
+
+def split_sentences(text):
+    """按句末标点切分句子，保留标点"""
+    parts = SENTENCE_END.split(text)
+    sentences = [''.join(i) for i in zip(parts[0::2], parts[1::2] + [''])]
+    return [s.strip() for s in sentences if s.strip()]
+
+def load_timestamps(timestamp_file):
+    """
+    读取转录脚本输出的 *_timestamp.txt
+
+    Returns:
+        [(start_ms, end_ms), ...]
+    """
+    spans = []
+    with open(timestamp_file, "r", encoding="utf-8") as f:
+        for line in f:
+            match = TIMESTAMP_LINE.match(line)
+            if not match:
+                continue
+            h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(g) for g in match.groups())
+            start = ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1
+            end = ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2
+            spans.append((start, end))
+    return spans
+
+def align_sentences(text, spans):
+    """
+    将句子与 FunASR 逐字时间戳对齐
+
+    FunASR 为每个汉字/英文词输出一个时间戳，标点没有时间戳，
+    因此按 token 计数顺序消费时间戳即可得到每句的起止时间。
+
+    Returns:
+        [(sentence, start_ms, end_ms), ...]，没有时间戳时起止为 None
+    """
+    aligned = []
+    cursor = 0
+    for sentence in split_sentences(text):
+        count = len(ASR_TOKEN.findall(sentence))
+        if spans and count:
+            first = min(cursor, len(spans) - 1)
+            last = min(cursor + count - 1, len(spans) - 1)
+            aligned.append((sentence, spans[first][0], spans[last][1]))
+        else:
+            aligned.append((sentence, None, None))
+        cursor += count
+    return aligned
+
+def collect_episode(episode_dir):
+    """
+    收集一个播客目录的待索引内容
+
+    优先使用 .cache 中的原始文字稿和时间戳；
+    已合并清理的目录回退到 README.md 中的转录部分（无时间戳）。
+
+    Returns:
+        (metadata, text, spans)
+    """
+    episode_dir = Path(episode_dir)
+    cache_dir = episode_dir / ".cache"
+    readme = episode_dir / "README.md"
+
+    metadata = {}
+    text = ""
+    spans = []
+
+    if cache_dir.is_dir():
+        show_notes = [p for p in cache_dir.glob("*.md") if not p.name.endswith("_formatted.md")]
+        transcripts = [p for p in cache_dir.glob("*.txt") if not p.name.endswith("_timestamp.txt")]
+        timestamps = list(cache_dir.glob("*_timestamp.txt"))
+
+        if show_notes:
+            metadata = load_metadata(show_notes[0])
+        if transcripts:
+            text = transcripts[0].read_text(encoding="utf-8")
+        if timestamps:
+            spans = load_timestamps(timestamps[0])
+
+    if not text and readme.exists():
+        content = readme.read_text(encoding="utf-8")
+        metadata = metadata or load_metadata(readme)
+        if TRANSCRIPT_MARKER in content:
+            text = content.split(TRANSCRIPT_MARKER, 1)[1]
+            # 去掉 HTML 注释和 Markdown 标题/说话人标记
+            text = re.sub(r'<!--.*?-->', '', text, flags=re.S)
+            text = re.sub(r'^#+ .*$|^\*\*.*?\*\*：$|^---$', '', text, flags=re.M)
+
+    if not metadata.get("episode_id"):
+        match = re.search(r'[0-9a-f]{24}', episode_dir.name)
+        if match:
+            metadata["episode_id"] = match.group(0)
+
+    return metadata, text, spans
+
+def connect(db_path):
+    """打开（必要时创建）索引数据库"""
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript(SCHEMA)
+    return conn
+
+def index_episode(conn, episode_dir):
+    """
+    增量索引单个播客目录
+
+    同一 Episode 重复索引时先删除旧记录，其他 Episode 不受影响。
+
+    Returns:
+        (episode_id, 索引的句子数)
+    """
+    metadata, text, spans = collect_episode(episode_dir)
+
+    episode_id = metadata.get("episode_id")
+    if not episode_id:
+        raise ValueError(f"无法确定 Episode ID: {episode_dir}")
+    if not text.strip():
+        raise ValueError(f"未找到转录文本: {episode_dir}")
+
+    rows = []
+    for sentence, start_ms, end_ms in align_sentences(text, spans):
+        tokens = bigram_tokens(sentence)
+        if tokens:
+            rows.append((" ".join(tokens), sentence, episode_id, start_ms, end_ms))
+
+    with conn:
+        conn.execute("DELETE FROM sentences WHERE episode_id = ?", (episode_id,))
+        conn.executemany(
+            "INSERT INTO sentences (tokens, text, episode_id, start_ms, end_ms) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                episode_id,
+                metadata.get("title", ""),
+                metadata.get("podcast_name", ""),
+                metadata.get("published_date", ""),
+                str(Path(episode_dir).resolve()),
+                len(rows),
+                time.strftime("%Y-%m-%d %H:%M:%S"),
+            ),
+        )
+
+    return episode_id, len(rows)
+
+def search(conn, query, limit=20, episode_id=None):
+    """
+    检索句子，按 BM25 相关度排序
+
+    Returns:
+        命中列表，每项包含 episode 信息、句子文本和起止毫秒
+    """
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    sql = """
+        SELECT s.episode_id, s.text, s.start_ms, s.end_ms, bm25(sentences) AS score,
+               e.title, e.podcast_name, e.episode_dir
+        FROM sentences s JOIN episodes e ON e.episode_id = s.episode_id
+        WHERE sentences MATCH ?
+    """
+    params = [match]
+    if episode_id:
+        sql += " AND s.episode_id = ?"
+        params.append(episode_id)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+
+    hits = []
+    for row in conn.execute(sql, params):
+        hits.append({
+            "episode_id": row[0],
+            "text": row[1],
+            "start_ms": row[2],
+            "end_ms": row[3],
+            "score": row[4],
+            "title": row[5],
+            "podcast_name": row[6],
+            "episode_dir": row[7],
+        })
+    return hits
+
+def cmd_add(args):
+    conn = connect(args.db)
+    failed = 0
+    for episode_dir in args.episode_dirs:
+        try:
+            episode_id, count = index_episode(conn, episode_dir)
+            print(f"[INFO] 已索引 {episode_id}: {count} 句")
+        except (ValueError, OSError) as e:
+            print(f"[ERROR] 索引失败: {e}")
+            failed += 1
+    conn.close()
+    return 1 if failed else 0
+
+def cmd_search(args):
+    conn = connect(args.db)
+    hits = search(conn, args.query, limit=args.limit, episode_id=args.episode)
+    conn.close()
+
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return 0
+
+    if not hits:
+        print("[INFO] 没有匹配结果")
+        return 0
+
+    for hit in hits:
+        if hit["start_ms"] is None:
+            position = "--:--:--.---"
+        else:
+            position = format_timestamp(hit["start_ms"])
+        print(f"[{position}] {hit['title']} ({hit['podcast_name']})")
+        print(f"    {hit['text']}")
+        print(f"    {hit['episode_dir']}")
+    return 0
+
+def cmd_remove(args):
+    conn = connect(args.db)
+    with conn:
+        conn.execute("DELETE FROM sentences WHERE episode_id = ?", (args.episode_id,))
+        conn.execute("DELETE FROM episodes WHERE episode_id = ?", (args.episode_id,))
+    conn.close()
+    print(f"[INFO] 已从索引移除: {args.episode_id}")
+    return 0
+
+def cmd_stats(args):
+    conn = connect(args.db)
+    episodes, sentences = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(sentence_count), 0) FROM episodes"
+    ).fetchone()
+    conn.close()
+    print(f"索引文件: {args.db}")
+    print(f"Episode 数量: {episodes}")
+    print(f"句子数量: {sentences}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="播客转录全文检索（SQLite FTS5）"
+    )
+
+    parser.add_argument(
+        "--db",
+        default=str(DEFAULT_DB),
+        help=f"索引数据库路径（默认 {DEFAULT_DB}）"
+    )
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="索引播客目录（可多个）")
+    add_parser.add_argument("episode_dirs", nargs="+", help="播客目录路径")
+    add_parser.set_defaults(func=cmd_add)
+
+    search_parser = subparsers.add_parser("search", help="检索转录文本")
+    search_parser.add_argument("query", help="检索词")
+    search_parser.add_argument("--limit", type=int, default=20, help="最多返回条数（默认 20）")
+    search_parser.add_argument("--episode", help="仅检索指定 Episode ID")
+    search_parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    search_parser.set_defaults(func=cmd_search)
+
+    remove_parser = subparsers.add_parser("remove", help="从索引中移除 Episode")
+    remove_parser.add_argument("episode_id", help="Episode ID")
+    remove_parser.set_defaults(func=cmd_remove)
+
+    stats_parser = subparsers.add_parser("stats", help="显示索引统计")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ import sys
 from pathlib import Path
 from datetime import datetime
 
+from podcast_meta import parse_front_matter
+
 try:
     from notion_client import Client
 except ImportError:
@@ -18,27 +20,6 @@ except ImportError:
     print("[INFO] 请运行: pip3 install notion-client")
     sys.exit(1)
 
-def parse_front_matter(content):
-    """解析 Markdown 文件的 YAML Front Matter"""
-    metadata = {}
-
-    lines = content.split('\n')
-    in_front_matter = False
-
-    for line in lines:
-        if line.strip() == '---':
-            if in_front_matter:
-                break
-            else:
-                in_front_matter = True
-                continue
-
-        if in_front_matter and ':' in line:
-            key, value = line.split(':', 1)
-            metadata[key.strip()] = value.strip()
-
-    return metadata
-
 def markdown_to_notion_blocks(content):
     """将 Markdown 内容转换为 Notion block 格式"""
     blocks = []
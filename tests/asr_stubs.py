@@ -0,0 +1,30 @@
+"""
+没有安装 torch / funasr 时注入最小的替身模块，使 podcast_asr 可以导入
+
+测试只使用传入的替身模型，不会通过这些模块加载真实模型或读取音频。
+"""
+
+import importlib.util
+import sys
+import types
+
+def _unavailable(*args, **kwargs):
+    raise RuntimeError("测试环境没有安装 funasr")
+
+def install():
+    if "torch" not in sys.modules and importlib.util.find_spec("torch") is None:
+        torch = types.ModuleType("torch")
+        torch.set_num_threads = lambda threads: None
+        torch.cuda = types.SimpleNamespace(is_available=lambda: False)
+        torch.backends = types.SimpleNamespace(mps=types.SimpleNamespace(is_available=lambda: False))
+        sys.modules["torch"] = torch
+
+    if "funasr" not in sys.modules and importlib.util.find_spec("funasr") is None:
+        funasr = types.ModuleType("funasr")
+        funasr.AutoModel = _unavailable
+        utils = types.ModuleType("funasr.utils")
+        load_utils = types.ModuleType("funasr.utils.load_utils")
+        load_utils.load_audio_text_image_video = _unavailable
+        funasr.utils = utils
+        utils.load_utils = load_utils
+        sys.modules.update({"funasr": funasr, "funasr.utils": utils, "funasr.utils.load_utils": load_utils})
@@ -0,0 +1,61 @@
+"""scripts/ 下的脚本以同级导入互相引用，测试时把该目录加入 sys.path"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+# xyz-dl 生成的 Show Notes：引号、值中的冒号、转义，以及正文里不应被解析的 key: value
+SHOW_NOTES = """---
+title: "E080 稳定币与RWA：里世界向你敞开的一角"
+podcast_name: '虚实之间'
+published_date: 2025年07月16日
+episode_id: 6875f2b2a12f2fb7bdf0b3a1
+audio_url: "https://media.xyzcdn.net/abc.m4a?a=1:2"
+summary: "他说 \\"你好\\""
+---
+
+# 正文
+
+title: 正文里的冒号不应被解析
+"""
+
+EPISODE_ID = "6875f2b2a12f2fb7bdf0b3a1"
+
+@pytest.fixture(autouse=True)
+def meta_cache(monkeypatch):
+    """每个测试使用空的元数据缓存（进程内缓存按路径和 mtime 命中，测试之间互不影响）"""
+    import podcast_meta
+    monkeypatch.setattr(podcast_meta, "_CACHE", {})
+
+@pytest.fixture
+def make_episode(tmp_path):
+    """
+    在 tmp_path 下创建合并前的播客目录（.cache 中为 download.sh 和转录脚本的输出）
+
+    返回的函数参数：
+        text: 原始文字稿（<名>.txt），None 表示没有转录
+        spans: 逐字时间戳 [(start_ms, end_ms), ...]，为空时不写 _timestamp.txt
+        formatted: 智能分段版本（_formatted.md），None 表示不写
+    """
+    from podcast_asr.text import format_timestamp
+
+    def make(text=None, spans=(), formatted=None):
+        episode_dir = tmp_path / "20250716_虚实之间-E080-稳定币与RWA"
+        cache_dir = episode_dir / ".cache"
+        cache_dir.mkdir(parents=True)
+        (cache_dir / "episode.md").write_text(SHOW_NOTES, encoding="utf-8")
+        if text is not None:
+            (cache_dir / "episode.txt").write_text(text, encoding="utf-8")
+        if spans:
+            lines = [f"[{format_timestamp(start)} -> {format_timestamp(end)}] x" for start, end in spans]
+            (cache_dir / "episode_timestamp.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        if formatted is not None:
+            (cache_dir / "episode_formatted.md").write_text(formatted, encoding="utf-8")
+        return episode_dir
+
+    return make
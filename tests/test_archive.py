@@ -0,0 +1,166 @@
+"""archive：文字稿切块、时间戳编码、按时间段读取，README.md 与 merge-and-clean.sh 逐字节一致"""
+
+import os
+import random
+import subprocess
+
+import pytest
+
+import archive
+from archive import (
+    chunk_transcript,
+    decode_spans,
+    encode_spans,
+    read_documents,
+    render_readme,
+    split_pieces,
+)
+from conftest import SCRIPTS_DIR, SHOW_NOTES
+from search_index import ASR_TOKEN
+
+SENTENCES = ["今天聊稳定币。", "RWA是什么？", "链上资产的故事！", "我们下期再见。"]
+
+def make_text(repeat):
+    return "".join(SENTENCES[i % len(SENTENCES)] for i in range(repeat))
+
+def make_random_text(sentences, seed=1):
+    """不重复的文字稿：随机汉字组成的句子"""
+    rng = random.Random(seed)
+    return "".join("".join(chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(rng.randint(6, 20))) + "。"
+                   for _ in range(sentences))
+
+def make_spans(text, step=1000):
+    return [(i * step, i * step + step // 2) for i in range(len(ASR_TOKEN.findall(text)))]
+
+def make_formatted(text):
+    paragraphs = [text[i:i + 200] for i in range(0, len(text), 200)]
+    return "## 文字稿\n\n" + "\n\n".join(f"**说话人 {i % 2 + 1}**：\n{p}" for i, p in enumerate(paragraphs)) + "\n"
+
+def test_split_pieces_keeps_every_character():
+    text = "你好。RWA 是什么？\n\n没有句号的结尾"
+    pieces = split_pieces(text)
+    assert "".join(pieces) == text
+    assert pieces[0] == "你好。"
+
+def test_chunks_end_at_sentences_and_cover_text():
+    text = make_text(40)
+    spans = make_spans(text)
+    chunks = chunk_transcript(text, spans, chunk_ms=20000)
+
+    assert len(chunks) > 1
+    assert "".join(chunk for chunk, _ in chunks) == text
+    assert [span for _, chunk_spans in chunks for span in chunk_spans] == spans
+    for chunk, _ in chunks[:-1]:
+        assert chunk[-1] in "。？！"
+
+def test_chunks_without_timestamps_split_by_length():
+    text = make_text(40)
+    chunks = chunk_transcript(text, [], chunk_chars=100)
+    assert len(chunks) > 1
+    assert all(not chunk_spans for _, chunk_spans in chunks)
+    assert "".join(chunk for chunk, _ in chunks) == text
+
+def test_span_encoding_roundtrip():
+    spans = [(1200, 1400), (1400, 1900), (2500, 2600), (2600, 2600)]
+    assert decode_spans(encode_spans(spans), spans[0][0]) == spans
+    assert encode_spans([]) == b""
+
+def test_chunk_encode_decode_roundtrip():
+    text = make_text(30)
+    spans = make_spans(text, step=700)
+    for chunk, chunk_spans in chunk_transcript(text, spans, chunk_ms=10000):
+        assert decode_spans(encode_spans(chunk_spans), chunk_spans[0][0]) == chunk_spans
+
+def merge_with_script(episode_dir, tmp_path):
+    """运行 merge-and-clean.sh（HOME 指向临时目录，不碰真实的音频存储）"""
+    env = dict(os.environ, HOME=str(tmp_path / "home"))
+    subprocess.run(["bash", str(SCRIPTS_DIR / "merge-and-clean.sh"), str(episode_dir)],
+                   check=True, capture_output=True, env=env)
+    return (episode_dir / "README.md").read_bytes()
+
+@pytest.mark.parametrize("formatted", [None, "## 文字稿\n\n**说话人 1**：\n今天聊稳定币。\n"])
+def test_render_matches_merge_and_clean(tmp_path, make_episode, formatted):
+    text = make_text(8)
+    episode_dir = make_episode(text, make_spans(text), formatted)
+    rendered = render_readme(*read_documents(episode_dir)).encode("utf-8")
+
+    assert merge_with_script(episode_dir, tmp_path) == rendered
+    # 合并清理之后从 README.md 拆分，再拼回来也完全一致
+    assert render_readme(*read_documents(episode_dir)).encode("utf-8") == rendered
+
+def test_render_without_transcript_is_show_notes(tmp_path, make_episode):
+    episode_dir = make_episode()
+    assert read_documents(episode_dir) == (SHOW_NOTES, None)
+    assert merge_with_script(episode_dir, tmp_path) == SHOW_NOTES.encode("utf-8")
+
+@pytest.fixture
+def zstd():
+    return pytest.importorskip("zstandard")
+
+def archived(tmp_path, episode_dir):
+    episode_id, path, _, _ = archive.archive_episode(tmp_path / "archive", episode_dir, auto_train=False)
+    return episode_dir, archive.ShowArchive(path), episode_id
+
+def test_archive_roundtrip_and_range_read(zstd, tmp_path, make_episode):
+    text = make_text(60)
+    # 每个字 5 秒，共约 25 分钟，按 CHUNK_MS 切成多块
+    spans = make_spans(text, step=5000)
+    formatted = make_formatted(text)
+    episode_dir, show, episode_id = archived(tmp_path, make_episode(text, spans, formatted))
+    try:
+        rendered = render_readme(*read_documents(episode_dir))
+        episode = show.episode(episode_id)
+        assert render_readme(episode["show_notes"], episode["transcript"]) == rendered
+        assert episode["duration_ms"] == spans[-1][1]
+
+        pieces = show.read(episode_id)
+        assert "".join(piece for piece, _, _ in pieces) == text
+
+        start_ms, end_ms = 450000, 700000
+        selected = show.read(episode_id, start_ms, end_ms)
+        assert selected
+        expected = [(piece, start, end) for piece, start, end in pieces if end >= start_ms and start <= end_ms]
+        assert selected == expected
+        assert show.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0] > 2
+    finally:
+        show.close()
+
+def test_transcript_is_stored_as_difference_from_chunks(zstd, tmp_path, make_episode):
+    text = make_random_text(300)
+    episode_dir, show, episode_id = archived(tmp_path, make_episode(text, make_spans(text), make_formatted(text)))
+    try:
+        sizes = show.sizes()
+        # 转录文本与文字稿块内容几乎相同，只存储分段和说话人标记
+        assert sizes["transcript"] * 5 < sizes["chunk_text"]
+        assert show.episode(episode_id)["transcript"] == make_formatted(text)
+    finally:
+        show.close()
+
+def test_readd_without_timestamps_keeps_chunks(zstd, tmp_path, make_episode):
+    text = make_text(20)
+    spans = make_spans(text)
+    episode_dir, show, episode_id = archived(tmp_path, make_episode(text, spans, make_formatted(text)))
+    show.close()
+
+    merge_with_script(episode_dir, tmp_path)
+    archive.archive_episode(tmp_path / "archive", episode_dir, auto_train=False)
+    show = archive.find_episode(tmp_path / "archive", episode_id)
+    try:
+        assert show.read(episode_id, 0, 3000)[0][1] == 0
+        episode = show.episode(episode_id)
+        assert render_readme(episode["show_notes"], episode["transcript"]).encode("utf-8") == \
+            (episode_dir / "README.md").read_bytes()
+    finally:
+        show.close()
+
+def test_train_recompresses_every_part(zstd, tmp_path, make_episode):
+    text = make_text(3000)
+    episode_dir, show, episode_id = archived(tmp_path, make_episode(text, make_spans(text), make_formatted(text)))
+    try:
+        expected = show.episode(episode_id)
+        show.train(dict_size=8192)
+        assert show.current_dict_id() is not None
+        assert show.episode(episode_id) == expected
+        assert "".join(piece for piece, _, _ in show.read(episode_id)) == text
+    finally:
+        show.close()
@@ -0,0 +1,74 @@
+"""podcast_asr.core：ASR 与说话人分离并行时互不取消"""
+
+import logging
+import threading
+import time
+
+import pytest
+
+import asr_stubs
+
+asr_stubs.install()
+
+from podcast_asr import TranscriptionError, transcribe  # noqa: E402
+
+class FakeASR:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def generate(self, input, **kwargs):
+        if self.fail:
+            raise RuntimeError("显存不足")
+        return [{"text": "大家好。", "timestamp": [[0, 100], [100, 200], [200, 300]]}]
+
+class FakeDiarization:
+    def __init__(self, delay=0.3, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.finished = threading.Event()
+
+    def generate(self, input, **kwargs):
+        time.sleep(self.delay)
+        self.finished.set()
+        if self.fail:
+            raise RuntimeError("说话人分离出错")
+        return [{"segments": [{"speaker": "A", "start": 0, "end": 0.3, "text": "大家好。"}]}]
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "episode.m4a"
+    path.write_bytes(b"audio")
+    return path
+
+def test_diarization_runs_alongside_asr(audio):
+    diarization = FakeDiarization()
+    result = transcribe(audio, model=FakeASR(), device="cpu", diarization=True,
+                        diarization_model=diarization, retries=1)
+    assert result.diarization
+    assert [turn.speaker for turn in result.speaker_turns] == ["A"]
+    assert result.diarization_overlap() is not None
+
+def test_asr_failure_waits_for_diarization(audio, caplog):
+    diarization = FakeDiarization()
+    with caplog.at_level(logging.INFO, logger="podcast_asr"):
+        with pytest.raises(TranscriptionError, match="显存不足"):
+            transcribe(audio, model=FakeASR(fail=True), device="cpu", diarization=True,
+                       diarization_model=diarization, retries=1, retry_delay=0)
+    # ASR 的错误在说话人分离结束之后才抛出，且报告了分离结果
+    assert diarization.finished.is_set()
+    assert "说话人分离已完成（1 位说话人" in caplog.text
+
+def test_both_stages_failing_raises_asr_error(audio, caplog):
+    diarization = FakeDiarization(fail=True)
+    with pytest.raises(TranscriptionError, match="显存不足"):
+        transcribe(audio, model=FakeASR(fail=True), device="cpu", diarization=True,
+                   diarization_model=diarization, retries=1, retry_delay=0)
+    assert diarization.finished.is_set()
+    assert "说话人分离失败" in caplog.text
+
+def test_diarization_failure_keeps_asr_result(audio):
+    result = transcribe(audio, model=FakeASR(), device="cpu", diarization=True,
+                        diarization_model=FakeDiarization(delay=0, fail=True), retries=1)
+    assert result.text == "大家好。"
+    assert not result.diarization
+    assert "说话人分离出错" in result.diarization_error
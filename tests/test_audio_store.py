@@ -0,0 +1,113 @@
+"""audio_store：LRU 预算淘汰、按天数淘汰和配置解析"""
+
+import os
+import time
+
+import pytest
+
+import audio_store
+from audio_store import AudioStore, open_store
+
+EPISODES = [f"{i:024x}" for i in range(1, 6)]
+
+def add(store, tmp_path, episode_id, size, days_ago=0):
+    """存入 size 字节的音频，并把最近使用时间设为 days_ago 天前"""
+    source = tmp_path / "source" / f"{episode_id}.m4a"
+    source.parent.mkdir(exist_ok=True)
+    source.write_bytes(b"\0" * size)
+    path = store.put(episode_id, source)
+    used = time.time() - days_ago * 86400
+    os.utime(path, (used, used))
+    return path
+
+def stored(store):
+    return sorted(path.stem for path, _, _ in store.entries())
+
+def test_lru_evicts_least_recently_used(tmp_path):
+    store = AudioStore(root=tmp_path / "store", budget=None)
+    for days_ago, episode_id in zip((4, 3, 2, 1), EPISODES):
+        add(store, tmp_path, episode_id, 100, days_ago)
+
+    # 取出最旧的一期，使其成为最近使用
+    store.get(EPISODES[0], tmp_path / "cache")
+    store.budget = 250
+    removed = store.evict()
+
+    assert sorted(path.stem for path in removed) == [EPISODES[1], EPISODES[2]]
+    assert stored(store) == [EPISODES[0], EPISODES[3]]
+
+def test_put_keeps_new_audio_even_over_budget(tmp_path):
+    store = AudioStore(root=tmp_path / "store", budget=150)
+    add(store, tmp_path, EPISODES[0], 100, days_ago=1)
+    add(store, tmp_path, EPISODES[1], 200)
+    assert stored(store) == [EPISODES[1]]
+
+def test_zero_budget_keeps_nothing(tmp_path):
+    store = AudioStore(root=tmp_path / "store", budget=0)
+    source = tmp_path / "a.m4a"
+    source.write_bytes(b"\0" * 10)
+    assert store.put(EPISODES[0], source) is None
+    assert stored(store) == []
+
+def test_age_eviction_on_put(tmp_path):
+    store = AudioStore(root=tmp_path / "store", budget=None, max_age_days=30)
+    add(store, tmp_path, EPISODES[0], 10, days_ago=45)
+    add(store, tmp_path, EPISODES[1], 10, days_ago=10)
+    add(store, tmp_path, EPISODES[2], 10)
+    assert stored(store) == [EPISODES[1], EPISODES[2]]
+
+def test_age_eviction_on_get(tmp_path):
+    store = AudioStore(root=tmp_path / "store", budget=None)
+    add(store, tmp_path, EPISODES[0], 10, days_ago=45)
+    add(store, tmp_path, EPISODES[1], 10, days_ago=40)
+
+    store.max_age_days = 30
+    # 取出的音频刷新使用时间，不被淘汰；其他过期音频被淘汰
+    dest = store.get(EPISODES[1], tmp_path / "cache", name="show_notes")
+    assert dest.name == "show_notes.m4a"
+    assert dest.read_bytes() == b"\0" * 10
+    assert stored(store) == [EPISODES[1]]
+
+def test_get_missing_episode(tmp_path):
+    store = AudioStore(root=tmp_path / "store", budget=None)
+    assert store.get(EPISODES[0], tmp_path / "cache") is None
+
+def test_stash_reads_episode_id_from_show_notes(tmp_path):
+    cache_dir = tmp_path / "20250716_节目-E1-主题" / ".cache"
+    cache_dir.mkdir(parents=True)
+    (cache_dir / "notes.md").write_text(f"---\nepisode_id: {EPISODES[2]}\n---\n", encoding="utf-8")
+    (cache_dir / "notes.m4a").write_bytes(b"audio")
+    store = AudioStore(root=tmp_path / "store", budget=None)
+    assert store.stash(cache_dir).name == f"{EPISODES[2]}.m4a"
+
+def test_open_store_reads_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("XYZ_AUDIO_STORE", str(tmp_path / "store"))
+    monkeypatch.setenv("XYZ_AUDIO_BUDGET", "1G")
+    monkeypatch.setenv("XYZ_AUDIO_MAX_AGE", "30")
+    store = open_store()
+    assert (store.root, store.budget, store.max_age_days) == (tmp_path / "store", 1024 ** 3, 30.0)
+
+    monkeypatch.delenv("XYZ_AUDIO_MAX_AGE")
+    monkeypatch.setenv("XYZ_AUDIO_BUDGET", "unlimited")
+    store = open_store()
+    assert (store.budget, store.max_age_days) == (None, None)
+    # 命令行参数优先于环境变量
+    assert open_store(budget="0", max_age="7").max_age_days == 7.0
+
+@pytest.mark.parametrize("variable, value", [
+    ("XYZ_AUDIO_BUDGET", "lots"),
+    ("XYZ_AUDIO_MAX_AGE", "a month"),
+    ("XYZ_AUDIO_MAX_AGE", "-1"),
+])
+def test_invalid_config_is_reported(monkeypatch, variable, value):
+    monkeypatch.setenv(variable, value)
+    with pytest.raises(ValueError, match=variable):
+        open_store()
+
+def test_cli_reports_invalid_budget(monkeypatch, capsys):
+    monkeypatch.setenv("XYZ_AUDIO_BUDGET", "lots")
+    monkeypatch.setattr("sys.argv", ["audio_store.py", "list"])
+    with pytest.raises(SystemExit) as exit_info:
+        audio_store.main()
+    assert exit_info.value.code == 1
+    assert "XYZ_AUDIO_BUDGET" in capsys.readouterr().out
@@ -0,0 +1,192 @@
+"""
+跨节目打包转录：打包规则、结果拆分，以及打包结果与逐期运行一致
+
+使用替身模型：VAD 返回预设片段，ASR 的输出只取决于片段的音频内容，
+因此打包方式不同（逐期 vs 跨节目）时结果应完全相同。
+"""
+
+import json
+import sys
+
+import pytest
+
+import asr_stubs
+
+asr_stubs.install()
+
+import batch_transcribe  # noqa: E402
+import pipeline  # noqa: E402
+from podcast_asr import EmptyResultError, TranscriptionResult, batch  # noqa: E402
+from podcast_asr.batch import merge_segment_results, pack_segments, transcribe_batch  # noqa: E402
+
+SAMPLE_RATE = 16000
+
+# 每期音频的时长（毫秒）和 VAD 片段
+EPISODES = {
+    "a": (62000, [[500, 9000], [9500, 12000], [13000, 40000], [41000, 61000]]),
+    "b": (20000, [[0, 1500], [2000, 7000], [8000, 19500]]),
+    "c": (95000, [[1000, 3000], [4000, 70000], [70500, 72000], [73000, 94000]]),
+}
+
+class FakeVAD:
+    def generate(self, input, **kwargs):
+        return [{"key": "vad", "value": EPISODES[name_of(input)][1]}]
+
+class FakeASR:
+    """每个片段的输出只由其采样内容决定：文本标出片段来源，时间戳为片段内偏移"""
+
+    def __init__(self):
+        self.batches = []
+
+    def generate(self, input, batch_size=None, hotword="", **kwargs):
+        assert batch_size == len(input)
+        self.batches.append(len(input))
+        results = []
+        for samples in input:
+            episode, first = divmod(samples[0], 10 ** 9)
+            duration = len(samples) * 1000 // SAMPLE_RATE
+            results.append({
+                "text": f"e{episode}-s{first}",
+                "timestamp": [[0, duration // 2], [duration // 2, duration]],
+            })
+        return results
+
+class FakePunc:
+    def generate(self, input, **kwargs):
+        return [{"text": input.replace(" ", "，") + "。"}]
+
+def name_of(path):
+    return str(path).rsplit("/", 1)[-1].split(".")[0]
+
+def fake_load_audio(path, fs):
+    # 采样值编码节目序号和采样位置，切片后仍能看出来源
+    episode = "abc".index(name_of(path)) + 1
+    duration_ms = EPISODES[name_of(path)][0]
+    return range(episode * 10 ** 9, episode * 10 ** 9 + duration_ms * fs // 1000)
+
+@pytest.fixture
+def audios(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "load_audio_text_image_video", fake_load_audio)
+    paths = []
+    for name in EPISODES:
+        path = tmp_path / f"{name}.m4a"
+        path.write_bytes(b"audio")
+        paths.append(path)
+    return paths
+
+def models():
+    return {"vad": FakeVAD(), "asr": FakeASR(), "punc": FakePunc()}
+
+def test_pack_segments_single_episode_rule():
+    segments = [[0, 20000], [20000, 25000], [30000, 100000], [100000, 110000], [110000, 112000]]
+    batches = pack_segments([segments], batch_size_s=30, batch_size_threshold_s=60)
+    durations = [[end - beg for _, _, beg, end in b] for b in batches]
+    # 按时长升序累加，超过 30s 前结束批次，超过 60s 的片段单独成批
+    assert durations == [[2000, 5000, 10000], [20000], [70000]]
+
+def test_pack_segments_covers_every_segment_once():
+    episodes = [segments for _, segments in EPISODES.values()]
+    batches = pack_segments(episodes, batch_size_s=30, batch_size_threshold_s=20)
+    packed = sorted((episode, index) for b in batches for episode, index, _, _ in b)
+    assert packed == [(e, i) for e, segments in enumerate(episodes) for i in range(len(segments))]
+
+    flat = [end - beg for b in batches for _, _, beg, end in b]
+    assert flat == sorted(flat)
+    for b in batches:
+        total = sum(end - beg for _, _, beg, end in b)
+        assert len(b) == 1 or total < 30000
+        assert len(b) == 1 or all(end - beg < 20000 for _, _, beg, end in b)
+
+def test_pack_segments_mixes_episodes():
+    episodes = [segments for _, segments in EPISODES.values()]
+    batches = pack_segments(episodes, batch_size_s=60)
+    separately = sum(len(pack_segments([segments], batch_size_s=60)) for segments in episodes)
+    assert len(batches) < separately
+    assert any(len({episode for episode, _, _, _ in b}) > 1 for b in batches)
+
+def test_merge_segment_results_offsets_and_order():
+    segments = [[1000, 2000], [5000, 6000], [9000, 9500]]
+    results = [
+        {"text": "你好", "timestamp": [[0, 200], [200, 400]]},
+        None,
+        {"text": "", "timestamp": []},
+    ]
+    assert merge_segment_results(segments, results) == ("你好", [(1000, 1200), (1200, 1400)])
+
+    results[1] = {"text": "世界", "timestamp": [[100, 300]]}
+    assert merge_segment_results(segments, results) == ("你好 世界", [(1000, 1200), (1200, 1400), (5100, 5300)])
+
+def test_packed_output_matches_one_at_a_time(audios):
+    packed_models = models()
+    packed, stats = transcribe_batch(audios, models=packed_models, batch_size_s=60)
+
+    single_batches = 0
+    for audio, result in zip(audios, packed):
+        single_models = models()
+        (single,), _ = transcribe_batch([audio], models=single_models, batch_size_s=60)
+        single_batches += len(single_models["asr"].batches)
+        assert isinstance(result, TranscriptionResult)
+        assert result.text == single.text
+        assert result.timestamps == single.timestamps
+
+    assert packed[0].text == "e1-s8000，e1-s152000，e1-s208000，e1-s656000。"
+    assert len(packed_models["asr"].batches) < single_batches
+
+def test_stats_report_audio_duration(audios):
+    _, stats = transcribe_batch(audios, models=models(), batch_size_s=30)
+    assert stats["audio_ms"] == sum(duration for duration, _ in EPISODES.values())
+    assert stats["speech_ms"] == sum(end - beg for _, segments in EPISODES.values() for beg, end in segments)
+    assert stats["speech_ms"] < stats["audio_ms"]
+
+def test_missing_audio_does_not_affect_others(audios, tmp_path):
+    results, _ = transcribe_batch([audios[0], tmp_path / "missing.m4a"], models=models(), batch_size_s=30)
+    assert isinstance(results[0], TranscriptionResult)
+    assert "不存在" in str(results[1])
+
+def test_batch_transcribe_writes_status_json(tmp_path, monkeypatch):
+    ok = tmp_path / "ok" / ".cache" / "ok.m4a"
+    empty = tmp_path / "empty" / ".cache" / "empty.m4a"
+    for path in (ok, empty):
+        path.parent.mkdir(parents=True)
+        path.write_bytes(b"audio")
+
+    def fake_transcribe_batch(audios, **kwargs):
+        results = [TranscriptionResult(text="你好。", timestamps=[(0, 100), (100, 200)], audio_name="ok"),
+                   EmptyResultError("转录结果为空: empty")]
+        return results, {"audio_ms": 3600000, "speech_ms": 1800000, "elapsed": 1, "cpu_seconds": 2}
+
+    status_file = tmp_path / "status.json"
+    monkeypatch.setattr(batch_transcribe, "transcribe_batch", fake_transcribe_batch)
+    monkeypatch.setattr(sys, "argv", ["batch_transcribe.py", "--audio", str(ok), str(empty),
+                                      "--status-json", str(status_file)])
+    with pytest.raises(SystemExit) as exit_info:
+        batch_transcribe.main()
+    assert exit_info.value.code == 1
+
+    statuses = json.loads(status_file.read_text(encoding="utf-8"))
+    assert [(s["audio"], s["status"]) for s in statuses] == [(str(ok), "done"), (str(empty), "failed")]
+    assert statuses[1]["error"] == "转录结果为空: empty"
+    assert (ok.parent / "ok.txt").read_text(encoding="utf-8").strip() == "你好。"
+
+def test_pipeline_reads_per_episode_status(tmp_path, monkeypatch):
+    jobs = [{"audio": tmp_path / f"{name}.m4a"} for name in ("ok", "failed", "missing")]
+    for job in jobs[:2]:
+        # 过时的文字稿不能被当作本次成功
+        job["audio"].with_suffix(".txt").write_text("旧文字稿", encoding="utf-8")
+
+    def fake_run_script(args, label, env=None, cancel=None):
+        status_file = args[args.index("--status-json") + 1]
+        with open(status_file, "w", encoding="utf-8") as f:
+            json.dump([
+                {"audio": str(jobs[0]["audio"]), "status": "done", "error": None},
+                {"audio": str(jobs[1]["audio"]), "status": "failed", "error": "转录结果为空"},
+            ], f)
+        raise pipeline.StageError("batch_transcribe.py 失败")
+
+    monkeypatch.setattr(pipeline, "run_script", fake_run_script)
+    runner = pipeline.Pipeline(output_root=tmp_path, pack=3, audio_store=object(), downloader=object())
+    errors = runner.transcribe_packed(jobs)
+
+    assert errors[0] is None
+    assert str(errors[1]) == "转录结果为空"
+    assert str(errors[2]) == "batch_transcribe.py 失败"
@@ -0,0 +1,71 @@
+"""download.sh：Show Notes 下载到已有播客目录时不丢文件"""
+
+import os
+import subprocess
+
+import pytest
+
+from conftest import EPISODE_ID, SCRIPTS_DIR, SHOW_NOTES
+
+@pytest.fixture
+def env(tmp_path):
+    """HOME 指向临时目录：技能目录链接到 scripts/，xyz-dl 由假的 uv 代替（写出 SHOW_NOTES）"""
+    home = tmp_path / "home"
+    skill = home / ".claude" / "skills" / "xiaoyuzhou-podcast"
+    skill.mkdir(parents=True)
+    (skill / "scripts").symlink_to(SCRIPTS_DIR)
+    (home / ".claude" / "tools" / "xyz-dl" / ".venv").mkdir(parents=True)
+
+    notes = tmp_path / "notes.md"
+    notes.write_text(SHOW_NOTES, encoding="utf-8")
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    uv = bin_dir / "uv"
+    # uv run xyz-dl --mode md --dir <目录> <URL>
+    uv.write_text(f'#!/bin/bash\ncp "$FAKE_NOTES" "$6/episode.md"\n', encoding="utf-8")
+    uv.chmod(0o755)
+    return dict(os.environ, HOME=str(home), PATH=f"{bin_dir}:{os.environ['PATH']}", FAKE_NOTES=str(notes))
+
+def download_notes(env, root):
+    result = subprocess.run(
+        ["bash", str(SCRIPTS_DIR / "download.sh"), "--notes-only", EPISODE_ID, str(root)],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    return result.stdout
+
+def existing_episode(root, show_notes=SHOW_NOTES):
+    cache_dir = root / "20250716_虚实之间-E080-稳定币与RWA" / ".cache"
+    cache_dir.mkdir(parents=True)
+    (cache_dir / "episode.md").write_text(show_notes, encoding="utf-8")
+    (cache_dir / "episode.txt").write_text("已有的转录", encoding="utf-8")
+    return cache_dir.parent
+
+def test_new_episode_dir_is_renamed(env, tmp_path):
+    root = tmp_path / "podcasts"
+    output = download_notes(env, root)
+    episode_dir = root / "20250716_虚实之间-E080-稳定币与RWA"
+    assert f"===EPISODE_DIR:{episode_dir}===" in output
+    assert (episode_dir / ".cache" / "episode.md").read_text(encoding="utf-8") == SHOW_NOTES
+    assert not (root / EPISODE_ID).exists()
+
+def test_existing_dir_reused_and_identical_files_dropped(env, tmp_path):
+    root = tmp_path / "podcasts"
+    episode_dir = existing_episode(root)
+    output = download_notes(env, root)
+
+    assert f"===EPISODE_DIR:{episode_dir}===" in output
+    assert (episode_dir / ".cache" / "episode.txt").read_text(encoding="utf-8") == "已有的转录"
+    assert not (root / EPISODE_ID).exists()
+    assert "[WARN]" not in output
+
+def test_existing_dir_keeps_files_that_were_not_moved(env, tmp_path):
+    root = tmp_path / "podcasts"
+    old_notes = SHOW_NOTES.replace("# 正文", "# 旧版正文")
+    episode_dir = existing_episode(root, old_notes)
+    output = download_notes(env, root)
+
+    # 已有文件不被覆盖，新下载的不同版本保留在临时目录并报告
+    assert (episode_dir / ".cache" / "episode.md").read_text(encoding="utf-8") == old_notes
+    leftover = root / EPISODE_ID / ".cache" / "episode.md"
+    assert leftover.read_text(encoding="utf-8") == SHOW_NOTES
+    assert "[WARN]" in output and str(leftover) in output
@@ -0,0 +1,231 @@
+"""downloader：本地 Range 服务器上测试断点续传、多连接拼装、远端变化重下和内容校验"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import downloader
+from downloader import DownloadCancelled, DownloadError, Downloader
+
+def make_audio(size, seed):
+    rng = random.Random(seed)
+    return b"\x00\x00\x00\x20ftypM4A " + bytes(rng.getrandbits(8) for _ in range(size - 12))
+
+class RangeServer(ThreadingHTTPServer):
+    """
+    支持 Range / If-Range 的音频服务器，可注入故障
+
+    - cut_requests：前 N 个 Range 请求只发送 cut_bytes 字节就断开连接
+    - change_after：收到第 N 个 Range 请求后换成 next_payload（ETag 随之变化）
+    - etag_md5：ETag 是否为内容 MD5（对象存储的常见形式）
+    """
+
+    daemon_threads = True
+
+    def __init__(self, payload):
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.lock = threading.Lock()
+        self.payload = payload
+        self.next_payload = None
+        self.change_after = None
+        self.cut_requests = 0
+        self.cut_bytes = 0
+        self.etag_md5 = True
+        self.version = 1
+        self.ranges = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/episode.m4a"
+
+    def etag(self):
+        if self.etag_md5:
+            return f'"{hashlib.md5(self.payload).hexdigest()}"'
+        return f'"v{self.version}"'
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            range_header = self.headers.get("Range")
+            if range_header and range_header != "bytes=0-0":
+                server.ranges.append(range_header)
+                if server.change_after is not None and len(server.ranges) > server.change_after:
+                    server.payload, server.next_payload = server.next_payload, None
+                    server.version += 1
+                    server.change_after = None
+                cut = None
+                if server.cut_requests > 0:
+                    server.cut_requests -= 1
+                    cut = server.cut_bytes
+            else:
+                cut = None
+            payload, etag = server.payload, server.etag()
+
+        if_range = self.headers.get("If-Range")
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', range_header or "")
+        if match and (if_range is None or if_range == etag):
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(payload) - 1
+            body = payload[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        else:
+            body = payload
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        if cut is not None:
+            # 声明完整长度但只发送一部分后断开，模拟连接中途被切断
+            self.wfile.write(body[:cut])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    server = RangeServer(make_audio(64 * 1024, seed=1))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    # 重试间隔和进度保存间隔缩到测试规模
+    monkeypatch.setattr(downloader.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(downloader, "STATE_INTERVAL", 4096)
+    monkeypatch.setattr(downloader, "CHUNK_SIZE", 1024)
+
+def make_downloader(connections=1, retries=3):
+    return Downloader(connections_per_file=connections, retries=retries,
+                      min_split_size=16 * 1024, timeout=5, quiet=True, decode_check=False)
+
+def range_starts(server):
+    return [int(re.match(r'bytes=(\d+)-', header).group(1)) for header in server.ranges]
+
+def test_single_connection_download(server, tmp_path):
+    dest = make_downloader().fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+    assert not (tmp_path / "episode.m4a.part").exists()
+    assert not (tmp_path / "episode.m4a.part.json").exists()
+
+def test_multi_connection_assembly(server, tmp_path):
+    dest = make_downloader(connections=4).fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+    assert sorted(range_starts(server)) == [0, 16384, 32768, 49152]
+
+def test_retry_resumes_from_cut_off_point(server, tmp_path):
+    server.cut_requests = 1
+    server.cut_bytes = 10000
+    dest = make_downloader().fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+    # 第二次请求从断开的位置继续，而不是从头开始
+    assert range_starts(server) == [0, 10000]
+
+def test_resume_after_failed_run(server, tmp_path):
+    server.cut_requests = 4
+    server.cut_bytes = 6000
+    with pytest.raises(DownloadError):
+        make_downloader(connections=4, retries=0).fetch(server.url, tmp_path / "episode.m4a")
+
+    part = tmp_path / "episode.m4a.part"
+    state = json.loads((tmp_path / "episode.m4a.part.json").read_text())
+    data = part.read_bytes()
+    # 进度文件只记录已落盘的字节：记录范围内的内容与源文件一致，没有空洞
+    for start, end, offset in state["segments"]:
+        assert offset == start + 6000
+        assert data[start:offset] == server.payload[start:offset]
+
+    server.ranges.clear()
+    dest = make_downloader(connections=4).fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+    assert sorted(range_starts(server)) == [6000, 22384, 38768, 55152]
+
+def test_cancel_keeps_progress_for_resume(server, tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(DownloadCancelled):
+        make_downloader(connections=4).fetch(server.url, tmp_path / "episode.m4a", cancel=cancel)
+    assert not (tmp_path / "episode.m4a").exists()
+    assert (tmp_path / "episode.m4a.part.json").exists()
+
+    dest = make_downloader(connections=4).fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+
+def test_remote_change_restarts_download(server, tmp_path):
+    original = server.payload
+    server.etag_md5 = False
+    server.next_payload = make_audio(48 * 1024, seed=2)
+    server.change_after = 1
+    dest = make_downloader(connections=4).fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+    assert server.payload != original
+
+def test_changed_validator_discards_saved_progress(server, tmp_path):
+    server.etag_md5 = False
+    server.cut_requests = 1
+    server.cut_bytes = 6000
+    with pytest.raises(DownloadError):
+        make_downloader(retries=0).fetch(server.url, tmp_path / "episode.m4a")
+
+    server.payload = make_audio(40 * 1024, seed=3)
+    server.version += 1
+    server.ranges.clear()
+    dest = make_downloader().fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+    assert range_starts(server) == [0]
+
+def test_md5_mismatch_rejects_corrupted_part(server, tmp_path):
+    server.cut_requests = 1
+    server.cut_bytes = 20000
+    with pytest.raises(DownloadError):
+        make_downloader(retries=0).fetch(server.url, tmp_path / "episode.m4a")
+
+    # 模拟旧版进度文件记录了未落盘数据：已记录的范围里有一段全零空洞
+    part = tmp_path / "episode.m4a.part"
+    with open(part, "r+b") as f:
+        f.seek(12000)
+        f.write(bytes(4000))
+
+    with pytest.raises(DownloadError, match="MD5"):
+        make_downloader().fetch(server.url, tmp_path / "episode.m4a")
+    assert not part.exists()
+    assert not (tmp_path / "episode.m4a").exists()
+
+    # 损坏的断点已丢弃，再次下载从头开始并成功
+    dest = make_downloader().fetch(server.url, tmp_path / "episode.m4a")
+    assert dest.read_bytes() == server.payload
+
+def test_remote_md5_from_headers():
+    digest = hashlib.md5(b"audio").digest()
+    assert downloader.remote_md5({"ETag": f'"{digest.hex().upper()}"'}, whole_body=False) == digest.hex()
+    # 分片上传的 ETag 和弱 ETag 不是文件 MD5
+    assert downloader.remote_md5({"ETag": f'"{digest.hex()}-3"'}, whole_body=False) is None
+    assert downloader.remote_md5({"ETag": f'W/"{digest.hex()}"'}, whole_body=False) is None
+    content_md5 = {"Content-MD5": "pr8bXrhsjnGjz4kaVeb+wg=="}
+    assert downloader.remote_md5(content_md5, whole_body=True) == "a6bf1b5eb86c8e71a3cf891a55e6fec2"
+    # Range 响应的 Content-MD5 只是该段的摘要
+    assert downloader.remote_md5(content_md5, whole_body=False) is None
+
+def test_verify_audio_rejects_non_audio(tmp_path):
+    path = tmp_path / "page.m4a"
+    path.write_bytes(b"<!DOCTYPE html><html></html>")
+    with pytest.raises(DownloadError, match="文件头"):
+        downloader.verify_audio(path)
+    with pytest.raises(DownloadError, match="大小"):
+        downloader.verify_audio(path, expected_size=10)
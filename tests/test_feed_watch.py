@@ -0,0 +1,178 @@
+"""feed_watch：在本地订阅源服务器上测试条件请求、内容哈希回退、首次轮询和入队"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import feed_watch
+from feed_watch import FeedWatcher, enqueue_jobs
+from job_queue import PRIORITY_BACKFILL, PRIORITY_NEW, JobQueue
+
+EPISODES = [f"{i:024x}" for i in range(0xa1, 0xa6)]
+
+class FeedServer(ThreadingHTTPServer):
+    """
+    模拟节目页：episodes 为页面中的 Episode 列表
+
+    conditional 为 False 时不返回 ETag/Last-Modified，也不处理条件请求
+    （只能靠内容哈希判断是否变化）。
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FeedHandler)
+        self.episodes = list(EPISODES[:3])
+        self.conditional = True
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/podcast"
+
+    def body(self):
+        links = "".join(f'<a href="/episode/{episode_id}">第 {i} 期</a>\n'
+                        for i, episode_id in enumerate(self.episodes))
+        return f"<html><body>\n{links}</body></html>\n".encode("utf-8")
+
+    def etag(self):
+        return f'"{len(self.episodes)}-{self.episodes[-1][-4:] if self.episodes else ""}"'
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if_none_match = self.headers.get("If-None-Match")
+        server.requests.append(if_none_match)
+        if server.conditional and if_none_match == server.etag():
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = server.body()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if server.conditional:
+            self.send_header("ETag", server.etag())
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def server():
+    server = FeedServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def watcher(tmp_path, server):
+    watcher = FeedWatcher(tmp_path / "feeds.db", timeout=5)
+    watcher.add(server.url, name="测试节目")
+    yield watcher
+    watcher.close()
+
+def feed_row(watcher):
+    return watcher.feeds()[0]
+
+def test_first_poll_seeds_without_processing(server, watcher):
+    assert watcher.poll() == []
+    assert [watcher.status(episode_id) for episode_id in EPISODES[:3]] == ["seen"] * 3
+    assert feed_row(watcher)["etag"] == server.etag()
+
+    server.episodes.append(EPISODES[3])
+    assert watcher.poll() == [EPISODES[3]]
+    assert watcher.status(EPISODES[3]) == "new"
+
+def test_backfill_first_poll_queues_history(server, watcher):
+    assert watcher.poll(backfill=True) == EPISODES[:3]
+    assert {watcher.status(episode_id) for episode_id in EPISODES[:3]} == {"backfill"}
+
+    # --backfill 只影响首次轮询
+    server.episodes.append(EPISODES[3])
+    assert watcher.poll(backfill=True) == EPISODES[:4]
+    assert watcher.status(EPISODES[3]) == "new"
+
+def test_unchanged_feed_is_a_304(server, watcher, monkeypatch):
+    watcher.poll()
+    parsed = []
+    monkeypatch.setattr(feed_watch, "extract_episode_ids", lambda body: parsed.append(body) or [])
+
+    assert watcher.poll() == []
+    assert server.requests[-1] == server.etag()
+    assert feed_row(watcher)["last_status"] == "304"
+    assert parsed == []
+
+def test_content_hash_fallback_without_conditional_requests(server, watcher, monkeypatch):
+    server.conditional = False
+    watcher.poll()
+    assert feed_row(watcher)["etag"] is None
+    first_hash = feed_row(watcher)["content_hash"]
+
+    real_extract = feed_watch.extract_episode_ids
+    parsed = []
+
+    def spy(body):
+        parsed.append(body)
+        return real_extract(body)
+
+    monkeypatch.setattr(feed_watch, "extract_episode_ids", spy)
+    # 服务器每次都返回 200，内容未变时不重新解析
+    assert watcher.poll() == []
+    assert server.requests[-1] is None
+    assert feed_row(watcher)["last_status"] == "200"
+    assert parsed == []
+
+    server.episodes.append(EPISODES[4])
+    assert watcher.poll() == [EPISODES[4]]
+    assert len(parsed) == 1
+    assert feed_row(watcher)["content_hash"] != first_hash
+
+def test_dry_run_does_not_record(server, watcher):
+    assert watcher.poll(backfill=True, record=False) == EPISODES[:3]
+    assert watcher.status(EPISODES[0]) is None
+    assert feed_row(watcher)["content_hash"] is None
+
+def test_failed_request_does_not_count_as_first_poll(server, watcher):
+    watcher.conn.execute("UPDATE feeds SET url = ?", ("http://127.0.0.1:1/podcast",))
+    assert watcher.poll() == []
+    assert feed_row(watcher)["last_status"].startswith("请求失败")
+
+    watcher.conn.execute("UPDATE feeds SET url = ?", (server.url,))
+    assert watcher.poll(backfill=True) == EPISODES[:3]
+
+def test_failed_episodes_are_retried_up_to_max_attempts(server, watcher):
+    server.episodes = []
+    watcher.poll()
+    server.episodes = [EPISODES[0]]
+    assert watcher.poll() == [EPISODES[0]]
+    for attempt in range(1, watcher.max_attempts + 1):
+        watcher.mark(EPISODES[0], "failed")
+        assert watcher.pending() == ([EPISODES[0]] if attempt < watcher.max_attempts else [])
+
+def test_enqueue_new_and_backfill_priorities(server, watcher, tmp_path):
+    watcher.poll(backfill=True)
+    server.episodes.append(EPISODES[3])
+    pending = watcher.poll()
+    assert pending == EPISODES[:4]
+
+    job_queue = JobQueue(tmp_path / "jobs.db")
+    try:
+        enqueue_jobs(watcher, job_queue, pending)
+        priorities = dict(job_queue.execute("SELECT key, priority FROM jobs").fetchall())
+    finally:
+        job_queue.close()
+
+    assert priorities == {
+        EPISODES[0]: PRIORITY_BACKFILL,
+        EPISODES[1]: PRIORITY_BACKFILL,
+        EPISODES[2]: PRIORITY_BACKFILL,
+        EPISODES[3]: PRIORITY_NEW,
+    }
+    assert {watcher.status(episode_id) for episode_id in pending} == {"queued"}
+    # 已入队的节目由队列负责，之后的轮询不再返回
+    assert watcher.poll() == []
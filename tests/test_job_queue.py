@@ -0,0 +1,228 @@
+"""job_queue / pipeline：领取顺序、租约过期回收、退避重试、租约丢失时中止阶段"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from job_queue import PRIORITY_BACKFILL, PRIORITY_NEW, JobQueue, QueueWorker, cmd_worker
+from pipeline import StageCancelled, StageError, add_pipeline_arguments, downloader_retries, run_script
+
+EPISODES = [f"{i:024x}" for i in range(0xb1, 0xb5)]
+
+@pytest.fixture
+def job_queue(tmp_path):
+    job_queue = JobQueue(tmp_path / "jobs.db", lease_seconds=60)
+    yield job_queue
+    job_queue.close()
+
+def row(job_queue, key):
+    return dict(job_queue.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone())
+
+def expire_lease(job_queue, key):
+    job_queue.execute("UPDATE jobs SET lease_expires = ? WHERE key = ?", (time.time() - 1, key))
+
+def test_claim_order_priority_then_age(job_queue):
+    job_queue.enqueue(EPISODES[:2], priority=PRIORITY_BACKFILL)
+    job_queue.enqueue(EPISODES[2:3], priority=PRIORITY_NEW)
+    # 历史节目又作为新节目出现时提前
+    job_queue.enqueue(EPISODES[1:2], priority=PRIORITY_NEW)
+
+    claimed = [job_queue.claim("w1")["key"] for _ in range(3)]
+    assert claimed == [EPISODES[1], EPISODES[2], EPISODES[0]]
+    assert job_queue.claim("w1") is None
+
+def test_running_job_is_not_claimed_twice(job_queue):
+    job_queue.enqueue(EPISODES[:1])
+    job = job_queue.claim("w1")
+    assert job["stage"] == "download" and job["attempts"] == 0
+    assert job_queue.claim("w2") is None
+    assert row(job_queue, EPISODES[0])["lease_owner"] == "w1"
+
+def test_expired_lease_is_reclaimed_and_old_owner_is_fenced(job_queue):
+    job_queue.enqueue(EPISODES[:1])
+    old = job_queue.claim("w1")
+    expire_lease(job_queue, EPISODES[0])
+
+    new = job_queue.claim("w2")
+    assert new["key"] == EPISODES[0]
+    assert new["attempts"] == 1
+
+    # 原 worker 的所有写操作都不再生效
+    old["payload"]["episode_dir"] = "/stale"
+    assert not job_queue.heartbeat(old, "w1")
+    assert not job_queue.advance(old, "w1", "transcribe")
+    assert job_queue.fail(old, "w1", "download: boom") == (False, True)
+    assert not job_queue.complete(old, "w1")
+    old["stage"] = "merge"
+    assert not job_queue.release(old, "w1")
+
+    current = row(job_queue, EPISODES[0])
+    assert (current["state"], current["stage"], current["lease_owner"]) == ("running", "download", "w2")
+    assert current["payload"] == "{}"
+    assert job_queue.heartbeat(new, "w2")
+
+def test_repeatedly_expired_lease_fails_the_job(job_queue):
+    job_queue.enqueue(EPISODES[:1], max_attempts=2)
+    job_queue.claim("w1")
+    expire_lease(job_queue, EPISODES[0])
+    job_queue.claim("w2")
+    expire_lease(job_queue, EPISODES[0])
+
+    assert job_queue.claim("w3") is None
+    failed = row(job_queue, EPISODES[0])
+    assert failed["state"] == "failed"
+    assert "租约过期 2 次" in failed["error"]
+
+def test_fail_backs_off_exponentially(job_queue, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    job_queue.enqueue(EPISODES[:1], max_attempts=3)
+
+    for attempt, delay in ((1, 60), (2, 120)):
+        job = job_queue.claim("w1")
+        assert job_queue.fail(job, "w1", "transcribe: boom", backoff=60) == (True, True)
+        current = row(job_queue, EPISODES[0])
+        assert (current["state"], current["attempts"]) == ("pending", attempt)
+        assert current["not_before"] == now[0] + delay
+        assert current["lease_owner"] is None
+
+        now[0] += delay - 1
+        assert job_queue.claim("w1") is None
+        now[0] += 1
+
+    job = job_queue.claim("w1")
+    assert job_queue.fail(job, "w1", "transcribe: boom", backoff=60) == (True, False)
+    current = row(job_queue, EPISODES[0])
+    assert (current["state"], current["attempts"], current["error"]) == ("failed", 3, "transcribe: boom")
+
+    assert job_queue.retry_failed() == 1
+    assert job_queue.claim("w1")["attempts"] == 0
+
+def test_advance_resets_attempts_and_keeps_payload(job_queue):
+    job_queue.enqueue(EPISODES[:1])
+    job = job_queue.claim("w1")
+    job_queue.fail(job, "w1", "download: boom", backoff=0)
+    job = job_queue.claim("w1")
+    job["payload"]["episode_dir"] = "/podcasts/ep"
+    assert job_queue.advance(job, "w1", "transcribe")
+
+    current = row(job_queue, EPISODES[0])
+    assert (current["stage"], current["attempts"], current["error"]) == ("transcribe", 0, None)
+    assert '"/podcasts/ep"' in current["payload"]
+
+class FakePipeline:
+    """只记录调用的流水线，各阶段行为由测试替换"""
+
+    stages = [("download", None, 1), ("transcribe", None, 1), ("merge", None, 1)]
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.calls = []
+
+    def download(self, work):
+        self.calls.append("download")
+        work["episode_dir"] = self.tmp_path
+        work["audio"] = self.tmp_path / "episode.m4a"
+        work["audio"].write_bytes(b"audio")
+
+    def transcribe(self, work):
+        self.calls.append("transcribe")
+
+    def merge(self, work):
+        self.calls.append("merge")
+
+    def sync(self, work):
+        self.calls.append("sync")
+
+def test_worker_runs_all_stages(job_queue, tmp_path):
+    pipeline = FakePipeline(tmp_path)
+    job_queue.enqueue(EPISODES[:1])
+    assert QueueWorker(job_queue, pipeline, owner="w1").run(drain=True) == 1
+
+    assert pipeline.calls == ["download", "transcribe", "merge"]
+    done = row(job_queue, EPISODES[0])
+    assert (done["state"], done["stage"], done["lease_owner"]) == ("done", "done", None)
+
+def test_failed_stage_saves_paths_before_fail(job_queue, tmp_path):
+    pipeline = FakePipeline(tmp_path)
+    job_queue.enqueue(EPISODES[:1])
+
+    def download(work):
+        work["episode_dir"] = tmp_path
+        raise StageError("音频下载失败")
+
+    pipeline.download = download
+    QueueWorker(job_queue, pipeline, owner="w1", backoff=0).run(drain=True, max_jobs=1)
+
+    failed = row(job_queue, EPISODES[0])
+    assert failed["state"] == "pending" and failed["attempts"] == 1
+    assert str(tmp_path) in failed["payload"]
+
+def test_lost_lease_aborts_running_stage(tmp_path):
+    job_queue = JobQueue(tmp_path / "jobs.db", lease_seconds=0.3)
+    try:
+        pipeline = FakePipeline(tmp_path)
+        job_queue.enqueue(EPISODES[:1])
+        aborted = []
+
+        def transcribe(work):
+            # 另一个 worker 接管了租约：心跳发现后设置 cancel
+            job_queue.execute("UPDATE jobs SET lease_owner = 'w2' WHERE key = ?", (EPISODES[0],))
+            aborted.append(work["cancel"].wait(5))
+            raise StageCancelled("transcribe_enhanced.py 已中止")
+
+        pipeline.transcribe = transcribe
+        QueueWorker(job_queue, pipeline, owner="w1").run(drain=True, max_jobs=1)
+
+        assert aborted == [True]
+        current = row(job_queue, EPISODES[0])
+        # 未计失败、未推进阶段，任务仍归 w2
+        assert (current["state"], current["stage"], current["attempts"], current["lease_owner"]) == \
+            ("running", "transcribe", 0, "w2")
+        assert pipeline.calls == ["download"]
+    finally:
+        job_queue.close()
+
+def test_release_records_stage_on_shutdown(job_queue, tmp_path):
+    pipeline = FakePipeline(tmp_path)
+    job_queue.enqueue(EPISODES[:1])
+    worker = QueueWorker(job_queue, pipeline, owner="w1")
+
+    def download(work):
+        FakePipeline.download(pipeline, work)
+        worker.stopping.set()
+
+    worker.functions["download"] = download
+    worker.process(job_queue.claim("w1"))
+
+    released = row(job_queue, EPISODES[0])
+    assert (released["state"], released["stage"], released["lease_owner"]) == ("pending", "transcribe", None)
+
+def test_run_script_cancel_terminates_subprocess():
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    started = time.time()
+    with pytest.raises(StageCancelled):
+        run_script([sys.executable, "-c", "import time; time.sleep(30)"], "sleep", cancel=cancel)
+    assert time.time() - started < 10
+
+def test_run_script_reports_output_tail():
+    assert run_script([sys.executable, "-c", "print('ok')"], "ok", cancel=threading.Event()) == "ok\n"
+    with pytest.raises(StageError, match="退出码 3\nboom"):
+        run_script([sys.executable, "-c", "import sys; print('boom'); sys.exit(3)"], "fail")
+
+def test_downloader_retries_are_attempts():
+    assert downloader_retries(None) == {}
+    assert downloader_retries(1) == {"retries": 0}
+    assert downloader_retries(3) == {"retries": 2}
+
+def test_worker_rejects_pack(job_queue):
+    parser = argparse.ArgumentParser()
+    add_pipeline_arguments(parser)
+    args = parser.parse_args(["--pack", "4"])
+    with pytest.raises(ValueError, match="--pack"):
+        cmd_worker(job_queue, args)
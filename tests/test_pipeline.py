@@ -0,0 +1,144 @@
+"""pipeline：缓存名额上限、失败阶段归还名额、工作线程全部退出"""
+
+import threading
+import time
+
+import pytest
+
+import pipeline as pipeline_module
+from pipeline import Pipeline, StageCancelled, StageError
+
+EPISODES = [f"{i:024x}" for i in range(0xc1, 0xc9)]
+
+class FakePipeline(Pipeline):
+    """各阶段只记录调用并短暂休眠，fail 中的 (阶段, Episode ID) 抛出 StageError"""
+
+    def __init__(self, tmp_path, fail=(), **kwargs):
+        super().__init__(output_root=tmp_path, index_db=None, downloader=object(), audio_store=object(), **kwargs)
+        self.fail = set(fail)
+        self.counter = threading.Lock()
+        self.holding = 0
+        self.peak = 0
+        self.calls = []
+        self.workers = []
+        self.exited = []
+
+    def stage(self, name, job, hold=False):
+        with self.counter:
+            self.calls.append((name, job["episode_id"], time.time()))
+            if hold:
+                self.holding += 1
+                self.peak = max(self.peak, self.holding)
+        time.sleep(0.02)
+        if (name, job["episode_id"]) in self.fail:
+            raise StageError(f"{name} 失败")
+
+    def download(self, job):
+        job["episode_dir"] = self.output_root / job["episode_id"]
+        job["audio"] = job["episode_dir"] / ".cache" / "episode.m4a"
+        self.stage("download", job, hold=True)
+
+    def transcribe(self, job):
+        self.stage("transcribe", job)
+
+    def transcribe_packed(self, jobs):
+        errors = []
+        for job in jobs:
+            try:
+                self.stage("transcribe", job)
+                errors.append(None)
+            except StageError as e:
+                errors.append(e)
+        return errors
+
+    def merge(self, job):
+        self.stage("merge", job)
+        self.release(job)
+
+    def release(self, job):
+        if job.get("cache_slot"):
+            with self.counter:
+                self.holding -= 1
+        super().release(job)
+
+    def worker(self, name, func, inbox, outbox):
+        with self.counter:
+            self.workers.append(threading.current_thread())
+        try:
+            super().worker(name, func, inbox, outbox)
+        finally:
+            with self.counter:
+                self.exited.append(name)
+
+def run_with_timeout(pipeline, inputs, timeout=10):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(jobs=pipeline.run(inputs)), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "run() 未在超时内返回（名额未归还导致死锁？）"
+    return result["jobs"]
+
+def expected_workers(pipeline):
+    return sum(workers for _, _, workers in pipeline.stages)
+
+def test_stages_overlap_within_cache_limit(tmp_path):
+    pipeline = FakePipeline(tmp_path, max_cached=2, download_workers=3)
+    jobs = run_with_timeout(pipeline, EPISODES)
+
+    assert [job["status"] for job in jobs] == ["done"] * len(EPISODES)
+    assert pipeline.peak == 2
+    assert pipeline.holding == 0
+    # 后面节目的下载与前面节目的转录/合并并行进行
+    last_download = max(t for name, _, t in pipeline.calls if name == "download")
+    first_merge = min(t for name, _, t in pipeline.calls if name == "merge")
+    assert first_merge < last_download
+
+@pytest.mark.parametrize("stage", ["download", "transcribe"])
+def test_failed_stage_returns_cache_slot(tmp_path, stage):
+    # 失败数超过名额：若失败不归还名额，后续下载会永久阻塞
+    failing = EPISODES[:3]
+    pipeline = FakePipeline(tmp_path, fail=[(stage, key) for key in failing], max_cached=2)
+    jobs = run_with_timeout(pipeline, EPISODES)
+
+    statuses = {job["episode_id"]: job["status"] for job in jobs}
+    assert [key for key, status in statuses.items() if status == "failed"] == failing
+    assert all(statuses[key] == "done" for key in EPISODES[3:])
+    assert all(job["error"].startswith(f"{stage}: ") for job in jobs if job["status"] == "failed")
+    assert pipeline.peak <= 2
+    assert pipeline.holding == 0
+    assert pipeline.cache_slots.acquire(blocking=False) and pipeline.cache_slots.acquire(blocking=False)
+
+def test_packed_transcribe_failure_returns_cache_slot(tmp_path):
+    pipeline = FakePipeline(tmp_path, fail=[("transcribe", EPISODES[0])], max_cached=3, pack=3)
+    jobs = run_with_timeout(pipeline, EPISODES)
+
+    assert [job["status"] for job in jobs] == ["failed"] + ["done"] * (len(EPISODES) - 1)
+    assert pipeline.peak <= 3
+    assert pipeline.holding == 0
+
+def test_all_workers_exit_on_stop(tmp_path):
+    pipeline = FakePipeline(tmp_path, fail=[("download", EPISODES[0])], max_cached=2,
+                            download_workers=3, merge_workers=2)
+    run_with_timeout(pipeline, EPISODES)
+    # run() 可多次调用，每次启动并关闭一组工作线程
+    run_with_timeout(pipeline, EPISODES[:2])
+
+    assert len(pipeline.workers) == 2 * expected_workers(pipeline)
+    assert len(pipeline.exited) == len(pipeline.workers)
+    assert not any(thread.is_alive() for thread in pipeline.workers)
+
+def test_packed_transcribe_passes_cancel(tmp_path, monkeypatch):
+    cancel = threading.Event()
+    seen = {}
+
+    def fake_run_script(args, label, env=None, cancel=None):
+        seen["cancel"] = cancel
+        raise StageCancelled("已中止")
+
+    monkeypatch.setattr(pipeline_module, "run_script", fake_run_script)
+    pipeline = Pipeline(output_root=tmp_path, index_db=None, downloader=object(), audio_store=object(), pack=2)
+    jobs = [{"audio": tmp_path / f"{key}.m4a", "cancel": cancel} for key in EPISODES[:2]]
+    errors = pipeline.transcribe_packed(jobs)
+
+    assert seen["cancel"] is cancel
+    assert all(isinstance(error, StageCancelled) for error in errors)
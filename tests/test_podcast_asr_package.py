@@ -0,0 +1,42 @@
+"""podcast_asr 包：公开名称按需导入，只用文本工具时不加载 torch / funasr"""
+
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SCRIPTS_DIR
+
+import asr_stubs
+
+def test_text_helpers_do_not_import_models():
+    code = (
+        "import sys, search_index\n"
+        "from podcast_asr import format_timestamp\n"
+        "loaded = [m for m in ('torch', 'funasr', 'podcast_asr.core') if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+        "assert search_index.format_timestamp is format_timestamp\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=SCRIPTS_DIR, check=True)
+
+def test_all_exports_resolve():
+    asr_stubs.install()
+    import podcast_asr
+
+    for name in podcast_asr.__all__:
+        assert getattr(podcast_asr, name) is not None
+    assert podcast_asr.retry_options(2) == {"retries": 2, "model_retries": 2}
+    assert podcast_asr.retry_options(None) == {}
+
+def test_unknown_name_raises_attribute_error():
+    import podcast_asr
+
+    with pytest.raises(AttributeError):
+        podcast_asr.does_not_exist
+
+def test_format_timestamp():
+    from podcast_asr.text import format_timestamp
+
+    assert format_timestamp(0) == "00:00:00.000"
+    assert format_timestamp(3723004) == "01:02:03.004"
+    assert format_timestamp(59999.6) == "00:00:59.999"
@@ -0,0 +1,76 @@
+"""podcast_meta：Front Matter 解析、目录名与旧版 Shell 实现一致、按 mtime 缓存"""
+
+import os
+
+import pytest
+
+import podcast_meta
+from conftest import EPISODE_ID, SHOW_NOTES
+from podcast_meta import format_dirname, load_metadata, parse_front_matter
+
+# 期望值由重构前的 format-dirname.sh（grep/sed 实现）对同样的元数据生成
+DIRNAME_CASES = [
+    ("E080 稳定币与RWA：里世界向你敞开的一角", "虚实之间", "2025年07月16日",
+     "20250716_虚实之间-E080-稳定币与RWA"),
+    ("27 | 主题 - 副标题", "忽左忽右", "2024年01月02日",
+     "20240102_忽左忽右-E27-主题"),
+    ("EP12 AI: the future", "Tech Talk", "2023年12月31日",
+     "20231231_EP12-AI-the-future"),
+    ("没有序号的标题", "节目 | 副标题", "2025年01月01日",
+     "20250101_没有序号的标题"),
+    ("102 (特别篇) 对谈", "张三 (主播)", "2025年02月03日",
+     "20250203_张三-主播-E102-特别篇-对谈"),
+    ("E5  双空格：标题", "节目", "2025年03月04日",
+     "20250304_节目-E5-双空格"),
+    ("E81 - 开头是分隔符", "节目", "2025年07月16日",
+     "20250716_节目-E81-开头是分隔符"),
+    ("Vol.3 | 特别节目", "声东击西 | Podcast", "2022年11月11日 12:00",
+     "20221111_Vol.3--特别节目"),
+    ("纯标题 with spaces: 冒号", "播客名", "",
+     "_纯标题-with-spaces-冒号"),
+]
+
+def test_parse_front_matter_fields_and_quotes():
+    metadata = parse_front_matter(SHOW_NOTES)
+    assert metadata["title"] == "E080 稳定币与RWA：里世界向你敞开的一角"
+    assert metadata["podcast_name"] == "虚实之间"
+    assert metadata["published_date"] == "2025年07月16日"
+    assert metadata["episode_id"] == EPISODE_ID
+    # 值中的冒号保留，转义的引号还原
+    assert metadata["audio_url"] == "https://media.xyzcdn.net/abc.m4a?a=1:2"
+    assert metadata["summary"] == '他说 "你好"'
+
+def test_parse_front_matter_stops_at_closing_marker():
+    assert parse_front_matter(SHOW_NOTES)["title"].startswith("E080")
+    assert parse_front_matter("no front matter\ntitle: x\n") == {}
+
+@pytest.mark.parametrize("title, podcast_name, published_date, expected", DIRNAME_CASES)
+def test_format_dirname_matches_shell(title, podcast_name, published_date, expected):
+    metadata = {"title": title, "podcast_name": podcast_name, "published_date": published_date}
+    assert format_dirname(metadata) == expected
+
+def test_load_metadata_defaults_and_dirname(tmp_path):
+    md_file = tmp_path / "notes.md"
+    md_file.write_text("---\ntitle: 标题\n---\n", encoding="utf-8")
+    metadata = load_metadata(md_file)
+    assert metadata["episode_id"] == ""
+    assert metadata["podcast_name"] == ""
+    assert metadata["dir_name"] == "_标题"
+
+def test_cache_hits_until_file_changes(tmp_path, monkeypatch):
+    md_file = tmp_path / "notes.md"
+    md_file.write_text(SHOW_NOTES, encoding="utf-8")
+    first = load_metadata(md_file)
+
+    real_parse = podcast_meta.parse_front_matter
+    monkeypatch.setattr(podcast_meta, "parse_front_matter", lambda content: pytest.fail("缓存未命中"))
+    assert load_metadata(md_file) == first
+    # 返回副本，调用方修改不影响缓存
+    first["title"] = "改过"
+    assert load_metadata(md_file)["title"].startswith("E080")
+
+    monkeypatch.setattr(podcast_meta, "parse_front_matter", real_parse)
+    md_file.write_text(SHOW_NOTES.replace("虚实之间", "忽左忽右"), encoding="utf-8")
+    stat = md_file.stat()
+    os.utime(md_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_metadata(md_file)["podcast_name"] == "忽左忽右"
@@ -0,0 +1,74 @@
+"""podcast_asr.profiling：嵌套阶段的显存峰值、剖析结果的默认目录"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from podcast_asr.output import default_profile_dir
+from podcast_asr.profiling import Profiler
+
+class FakeCuda:
+    """模拟 torch.cuda 的全局显存峰值计数器"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+
+    def is_available(self):
+        return True
+
+    def allocate(self, size):
+        self.current = size
+        self.peak = max(self.peak, size)
+
+    def max_memory_allocated(self):
+        return self.peak
+
+    def reset_peak_memory_stats(self):
+        self.peak = self.current
+
+@pytest.fixture
+def cuda(monkeypatch):
+    cuda = FakeCuda()
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(cuda=cuda))
+    return cuda
+
+def test_nested_stage_keeps_outer_cuda_peak(cuda):
+    with Profiler(trace_memory=False) as profiler:
+        with profiler.stage("outer"):
+            cuda.allocate(100)
+            cuda.allocate(10)
+            with profiler.stage("inner"):
+                cuda.allocate(50)
+                cuda.allocate(10)
+            cuda.allocate(20)
+        with profiler.stage("after"):
+            cuda.allocate(30)
+
+    assert profiler.stages["outer"]["cuda_peak_bytes"] == 100
+    assert profiler.stages["inner"]["cuda_peak_bytes"] == 50
+    assert profiler.stages["after"]["cuda_peak_bytes"] == 30
+
+def test_repeated_stage_takes_max_peak(cuda):
+    with Profiler(trace_memory=False) as profiler:
+        for size in (40, 70, 20):
+            with profiler.stage("asr"):
+                cuda.allocate(size)
+            cuda.allocate(0)
+
+    assert profiler.stages["asr"]["calls"] == 3
+    assert profiler.stages["asr"]["cuda_peak_bytes"] == 70
+
+def test_no_cuda_peak_without_torch(monkeypatch):
+    monkeypatch.delitem(sys.modules, "torch", raising=False)
+    with Profiler(trace_memory=False) as profiler:
+        with profiler.stage("write"):
+            pass
+    assert "cuda_peak_bytes" not in profiler.stages["write"]
+
+def test_default_profile_dir_avoids_cache(tmp_path):
+    episode = tmp_path / "2024-01-01_节目"
+    assert default_profile_dir(episode / ".cache", "ep_profile") == episode / ".profile" / "ep_profile"
+    assert default_profile_dir(tmp_path / "transcripts", "ep_profile") == tmp_path / "transcripts" / "ep_profile"
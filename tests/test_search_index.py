@@ -0,0 +1,53 @@
+"""search_index：二元切分、查询构造与增量索引"""
+
+import search_index
+from conftest import EPISODE_ID
+from search_index import bigram_tokens, build_match_query
+
+def test_bigram_tokens_chinese_run():
+    assert bigram_tokens("稳定币") == ["稳定", "定币", "币"]
+
+def test_bigram_tokens_mixed_text():
+    assert bigram_tokens("聊聊RWA和AI 2025，好") == ["聊聊", "聊", "rwa", "和", "ai", "2025", "好"]
+
+def test_bigram_tokens_ignores_punctuation():
+    assert bigram_tokens("。！？ ,") == []
+
+def test_build_match_query_uses_bigrams():
+    assert build_match_query("稳定币") == '"稳定" "定币"'
+
+def test_build_match_query_single_character_is_prefix():
+    assert build_match_query("币") == '"币"*'
+
+def test_build_match_query_mixed_terms():
+    assert build_match_query("RWA 稳定币") == '"rwa" "稳定" "定币"'
+
+def test_build_match_query_quotes_are_dropped():
+    assert build_match_query('"OR') == '"or"'
+    assert build_match_query("！？") == ""
+
+def test_align_sentences_consumes_one_timestamp_per_token():
+    spans = [(i * 100, i * 100 + 80) for i in range(6)]
+    aligned = search_index.align_sentences("你好。RWA 是什么？", spans)
+    assert aligned == [("你好。", 0, 180), ("RWA 是什么？", 200, 580)]
+
+def test_index_and_search_roundtrip(tmp_path, make_episode):
+    text = "今天聊稳定币。RWA是什么？币圈的故事。"
+    spans = [(i * 1000, i * 1000 + 500) for i in range(len(search_index.ASR_TOKEN.findall(text)))]
+    episode_dir = make_episode(text, spans)
+    conn = search_index.connect(tmp_path / "index.db")
+
+    assert search_index.index_episode(conn, episode_dir) == (EPISODE_ID, 3)
+    # 重复索引不产生重复记录
+    assert search_index.index_episode(conn, episode_dir)[1] == 3
+
+    hits = search_index.search(conn, "稳定币")
+    assert [hit["text"] for hit in hits] == ["今天聊稳定币。"]
+    assert (hits[0]["start_ms"], hits[0]["end_ms"]) == (0, 5500)
+    assert hits[0]["podcast_name"] == "虚实之间"
+
+    assert [hit["text"] for hit in search_index.search(conn, "rwa")] == ["RWA是什么？"]
+    # 单字前缀匹配：两句都含 "币"
+    assert len(search_index.search(conn, "币")) == 2
+    assert search_index.search(conn, "不存在") == []
+    conn.close()